@@ -32,9 +32,54 @@ and find novel and creative solutions to an engineering task.
 #-----------------------------------------------------------------------------
 __author__ = 'Nikolas Tezak'
 
-from cirq.core import (init_js, clone_ports,
-                  inputs, outputs, inouts,
-                  Domain, Port,
-                  ComponentType, ComponentInstance,
-                  Connection,
-                  Circuit, CircuitBuilder)
\ No newline at end of file
+import sys
+from importlib import import_module
+from types import ModuleType
+
+# public names and the modules defining them, imported on first access such that `import cirq`
+# does not load IPython's widget machinery before it is needed
+_LAZY_NAMES = {
+    "init_js": "cirq.core",
+    "clone_ports": "cirq.core",
+    "inputs": "cirq.core",
+    "outputs": "cirq.core",
+    "inouts": "cirq.core",
+    "Domain": "cirq.core",
+    "Port": "cirq.core",
+    "ComponentType": "cirq.core",
+    "ComponentInstance": "cirq.core",
+    "Connection": "cirq.core",
+    "Lane": "cirq.core",
+    "InstanceArray": "cirq.core",
+    "Circuit": "cirq.core",
+    "CircuitBuilder": "cirq.core",
+    "instrument": "cirq.core",
+    "HandlerStats": "cirq.core",
+}
+
+__all__ = sorted(_LAZY_NAMES)
+
+
+class _LazyModule(ModuleType):
+    """
+    Package module that imports the defining module of a public name on first access.
+    """
+
+    def __getattr__(self, name):
+        module_name = _LAZY_NAMES.get(name)
+        if module_name is None:
+            raise AttributeError("'module' object has no attribute '{}'".format(name))
+        value = getattr(import_module(module_name), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_LAZY_NAMES))
+
+
+_module = _LazyModule(__name__, __doc__)
+_module.__dict__.update({k: v for k, v in globals().items() if k not in ("_module", "_LazyModule")})
+_module._LazyModule = _LazyModule
+# keep the original module alive, Python 2 clears the globals of collected modules
+_module._original_module = sys.modules[__name__]
+sys.modules[__name__] = _module
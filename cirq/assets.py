@@ -0,0 +1,192 @@
+# coding=utf-8
+"""
+Bundling of the javascript front-end for the notebook.
+
+The front-end consists of d3 and `static/cirq.js`. They are combined into a single minified bundle
+whose version is derived from the content of its sources. The package ships a copy of d3 as
+`static/vendor/d3-<D3_VERSION>.min.js`, such that the bundle works without network access;
+only if that file is missing is d3 loaded from a CDN. `vendor_d3()` puts a downloaded release of d3 in place
+after checking its version.
+
+The bundle records its version in the page and does nothing if that version is already loaded.
+If the bundle has been installed as a notebook extension via `install()`, `init_script()` only returns
+a short loader that lets the browser fetch (and cache) the bundle from the notebook server,
+instead of sending the full script with every call of `init_js`.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import hashlib
+import os
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+D3_VERSION = "3.5.12"
+D3_VENDOR_PATH = os.path.join(STATIC_DIR, "vendor", "d3-{}.min.js".format(D3_VERSION))
+D3_CDN_URL = "//cdnjs.cloudflare.com/ajax/libs/d3/{}/d3.min".format(D3_VERSION)
+NBEXTENSION_NAME = "cirq"
+
+_bundles = {}
+
+
+def minify(source):
+    """
+    Conservatively minify javascript source: drop comment lines, indentation and blank lines.
+    Code is never rewritten and line breaks are kept, such that the result behaves identically.
+
+    :param source: javascript source
+    """
+    lines = []
+    in_comment = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_comment:
+            if "*/" in stripped:
+                in_comment = False
+                stripped = stripped[stripped.index("*/") + 2:].strip()
+            else:
+                continue
+        elif stripped.startswith("/*"):
+            end = stripped.find("*/", 2)
+            if end < 0:
+                in_comment = True
+                continue
+            stripped = stripped[end + 2:].strip()
+        if not stripped or stripped.startswith("//"):
+            continue
+        lines.append(stripped)
+    return "\n".join(lines)
+
+
+def _read(path):
+    with open(path, "r") as jsfile:
+        return jsfile.read()
+
+
+def vendor_d3(source, target=D3_VENDOR_PATH):
+    """
+    Copy a minified release of d3 to the vendor directory, such that the bundle includes it.
+
+    :param source: Path of d3.min.js of release `D3_VERSION`
+    :param target: Destination, default `D3_VENDOR_PATH`.
+    :return: Path of the vendored copy
+    """
+    d3_js = _read(source)
+    if "version:\"{}\"".format(D3_VERSION) not in d3_js:
+        raise ValueError("{} is not a minified release of d3 {}".format(source, D3_VERSION))
+    if "cdnjs" in d3_js:
+        raise ValueError("{} refers to a CDN".format(source))
+    tmp = target + ".tmp"
+    with open(tmp, "w") as jsfile:
+        jsfile.write(d3_js)
+    os.rename(tmp, target)
+    return target
+
+
+def build_bundle(d3_path=D3_VENDOR_PATH):
+    """
+    Build the minified front-end bundle.
+
+    :param d3_path: Path of a minified copy of d3, default `D3_VENDOR_PATH`.
+        If the file does not exist, the bundle loads d3 from `D3_CDN_URL` instead.
+    :return: tuple `(version, script)`
+    """
+    cirq_js = _read(os.path.join(STATIC_DIR, "cirq.js"))
+    d3_js = _read(d3_path) if d3_path and os.path.isfile(d3_path) else None
+    key = (cirq_js, d3_js)
+    cached = _bundles.get(key)
+    if cached is not None:
+        return cached
+
+    sha = hashlib.sha1(cirq_js.encode("utf-8"))
+    if d3_js is not None:
+        sha.update(d3_js.encode("utf-8"))
+    version = sha.hexdigest()[:12]
+
+    if d3_js is not None:
+        # hide the AMD loader from d3, such that it only sets window.d3, and register it under our own name
+        d3_module = ("(function (define, module) {{\n{}\n}}).call(window);\n"
+                     "define(\"cirq/d3\", [], function () {{ return window.d3; }});").format(d3_js)
+    else:
+        d3_module = "require.config({{paths: {{\"cirq/d3\": \"{}\"}}}});".format(D3_CDN_URL)
+
+    script = "\n".join([
+        "/* cirq {} | Modified BSD License | includes d3 {} (BSD License) */".format(version, D3_VERSION),
+        "(function () {",
+        "if (window.cirq_js_version === \"{}\") {{".format(version),
+        "return;",
+        "}",
+        "window.cirq_js_version = \"{}\";".format(version),
+        d3_module,
+        minify(cirq_js),
+        "}());",
+    ])
+    _bundles[key] = version, script
+    return version, script
+
+
+def bundle_filename(version):
+    return "cirq-{}.min.js".format(version)
+
+
+def nbextensions_dir():
+    """
+    Return the directory from which the notebook server serves `/nbextensions/`.
+    """
+    from IPython.utils.path import get_ipython_dir
+
+    return os.path.join(get_ipython_dir(), "nbextensions")
+
+
+def install(directory=None):
+    """
+    Install the current bundle as a notebook extension, such that `init_js` only needs to send a short loader.
+    Older bundles are kept for notebooks that still reference them.
+
+    :param directory: nbextensions directory, default `None` for `nbextensions_dir()`.
+    :return: Path of the installed bundle
+    """
+    version, script = build_bundle()
+    target_dir = os.path.join(directory or nbextensions_dir(), NBEXTENSION_NAME)
+    if not os.path.isdir(target_dir):
+        os.makedirs(target_dir)
+    path = os.path.join(target_dir, bundle_filename(version))
+    if not os.path.isfile(path):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as jsfile:
+            jsfile.write(script)
+        os.rename(tmp, path)
+    return path
+
+
+def loader_script(version):
+    """
+    Return a short script that loads an installed bundle unless its version is already loaded in the page.
+    """
+    url = "nbextensions/{}/{}".format(NBEXTENSION_NAME, bundle_filename(version))
+    return ("if (window.cirq_js_version !== \"{0}\") {{\n"
+            "require([IPython.notebook.base_url + \"{1}\"]);\n"
+            "}}").format(version, url)
+
+
+def init_script(inline=None, directory=None):
+    """
+    Return the script to load the front-end into a notebook.
+
+    :param inline: Whether to send the full bundle, default `None` to send only a loader
+        if the current bundle has been installed via `install()`.
+    :param directory: nbextensions directory, default `None` for `nbextensions_dir()`.
+    """
+    version, script = build_bundle()
+    if inline is None:
+        installed = os.path.join(directory or nbextensions_dir(), NBEXTENSION_NAME, bundle_filename(version))
+        inline = not os.path.isfile(installed)
+    if inline:
+        return script
+    return loader_script(version)
@@ -0,0 +1,362 @@
+# coding=utf-8
+"""
+Benchmark suite for circuit construction, mutation, net computation and serialization.
+
+Run it from the command line (no notebook required)::
+
+    python -m cirq.benchmarks --sizes 10 50 100 --output results.json
+
+and compare against the results of a previous version::
+
+    python -m cirq.benchmarks --compare old_results.json
+
+Pass `--startup` to also measure the import and first-use times in fresh processes.
+
+Two families of synthetic circuits are generated:
+
+    1. `mesh`: a grid of causal, one-to-one Beamsplitter components
+    2. `resistors`: a random network of two-terminal Resistor components in an acausal domain
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from timeit import default_timer
+
+
+def make_mesh_types():
+    """
+    Create the field mode domain and a Beamsplitter ComponentType.
+
+    :return: tuple `(domain, bs_type)`
+    """
+    from cirq.core import Domain, ComponentType, inputs, outputs
+
+    fm = Domain(name="fieldmode", causal=True, one2one=True)
+    bs_type = ComponentType(name="Beamsplitter", ports=inputs(["In1", "In2"], fm) + outputs(["Out1", "Out2"], fm))
+    return fm, bs_type
+
+
+def make_resistor_types():
+    """
+    Create the electrical domain and a Resistor ComponentType.
+
+    :return: tuple `(domain, resistor_type)`
+    """
+    from cirq.core import Domain, ComponentType, inouts
+
+    net = Domain(name="net", causal=False)
+    resistor_type = ComponentType(name="Resistor", ports=inouts(["p", "n"], net), params=["value"])
+    return net, resistor_type
+
+
+def mesh_connections(instances, rows):
+    """
+    Compute the port pairs of a Beamsplitter mesh with `rows` rows.
+    Output 1 feeds the next column of the same row, output 2 the next column of the next row.
+
+    :param instances: Beamsplitter instances in column-major order
+    :param rows: Number of rows
+    :return: list of `(source, target)` port tuples
+    """
+    cols = len(instances) // rows
+    pairs = []
+    for j in range(cols - 1):
+        for i in range(rows):
+            b = instances[j * rows + i]
+            pairs.append((b.p.Out1, instances[(j + 1) * rows + i].p.In1))
+            pairs.append((b.p.Out2, instances[(j + 1) * rows + (i + 1) % rows].p.In2))
+    return pairs
+
+
+def resistor_connections(instances, n_connections, seed=0):
+    """
+    Compute random port pairs for a resistor network.
+
+    :param instances: Resistor instances
+    :param n_connections: Number of connections
+    :param seed: Random seed
+    :return: list of `(source, target)` port tuples
+    """
+    rng = random.Random(seed)
+    ports = [p for r in instances for p in r.ports]
+    n_connections = min(n_connections, len(ports) * (len(ports) - 1) // 2)
+    pairs = set()
+    while len(pairs) < n_connections:
+        k1, k2 = rng.sample(xrange(len(ports)), 2)
+        if (k2, k1) not in pairs:
+            pairs.add((k1, k2))
+    return [(ports[k1], ports[k2]) for k1, k2 in sorted(pairs)]
+
+
+def build_circuit(kind, size, seed=0):
+    """
+    Build a synthetic circuit.
+
+    :param kind: Either `"mesh"` or `"resistors"`
+    :param size: Number of component instances
+    :param seed: Random seed for the resistor network
+    :return: tuple `(circuit, domain, connection_pairs)`, where the connections are not yet made
+    """
+    from cirq.core import Circuit
+
+    if kind == "mesh":
+        domain, ctype = make_mesh_types()
+    elif kind == "resistors":
+        domain, ctype = make_resistor_types()
+    else:
+        raise ValueError(kind)
+
+    instances = [ctype.make_instance("{}{}".format(ctype.name[0].lower(), k)) for k in range(size)]
+    circuit = Circuit(name=kind, component_instances=instances)
+    if kind == "mesh":
+        pairs = mesh_connections(instances, max(1, int(size ** .5)))
+    else:
+        pairs = resistor_connections(instances, size, seed)
+    return circuit, domain, pairs
+
+
+def _connect_all(circuit, pairs):
+    for s, t in pairs:
+        circuit.connect(s, t, verify=False)
+
+
+def _bench_make_instance(kind, size):
+    domain, ctype = make_mesh_types() if kind == "mesh" else make_resistor_types()
+    t0 = default_timer()
+    for k in range(size):
+        ctype.make_instance("c{}".format(k))
+    return default_timer() - t0
+
+
+def _bench_connect(kind, size):
+    circuit, domain, pairs = build_circuit(kind, size)
+    t0 = default_timer()
+    _connect_all(circuit, pairs)
+    return default_timer() - t0
+
+
+def _bench_remove(kind, size):
+    circuit, domain, pairs = build_circuit(kind, size)
+    _connect_all(circuit, pairs)
+    connections = list(circuit.connections)
+    t0 = default_timer()
+    for c in connections:
+        c.remove()
+    return default_timer() - t0
+
+
+def _connected(kind, size):
+    circuit, domain, pairs = build_circuit(kind, size)
+    _connect_all(circuit, pairs)
+    return circuit, domain
+
+
+def _bench_get_nets(kind, size):
+    circuit, domain = _connected(kind, size)
+    t0 = default_timer()
+    circuit.get_nets(domain)
+    return default_timer() - t0
+
+
+def _bench_to_jsonifiable(kind, size):
+    circuit, domain = _connected(kind, size)
+    t0 = default_timer()
+    circuit.to_jsonifiable()
+    return default_timer() - t0
+
+
+def _bench_from_jsonifiable(kind, size):
+    from cirq.core import Circuit
+
+    obj = _connected(kind, size)[0].to_jsonifiable()
+    t0 = default_timer()
+    Circuit.from_jsonifiable(obj)
+    return default_timer() - t0
+
+
+def _bench_to_json(kind, size):
+    circuit, domain = _connected(kind, size)
+    t0 = default_timer()
+    circuit.to_json()
+    return default_timer() - t0
+
+
+BENCHMARKS = [
+    ("make_instance", _bench_make_instance),
+    ("connect", _bench_connect),
+    ("remove", _bench_remove),
+    ("get_nets", _bench_get_nets),
+    ("to_jsonifiable", _bench_to_jsonifiable),
+    ("from_jsonifiable", _bench_from_jsonifiable),
+    ("to_json", _bench_to_json),
+]
+
+KINDS = ["mesh", "resistors"]
+
+STARTUP_BENCHMARKS = [
+    ("startup_import", "import cirq"),
+    ("startup_from_json", "import cirq.headless; cirq.headless.ensure_kernel(); "
+                          "import cirq; cirq.Circuit.load_json(path)"),
+    ("startup_json_nets", "import cirq.jsonmodel; cirq.jsonmodel.get_nets(cirq.jsonmodel.load(path), 'net')"),
+]
+
+_STARTUP_SCRIPT = """
+import sys
+from timeit import default_timer
+path = sys.argv[1]
+t0 = default_timer()
+{}
+sys.stdout.write(repr(default_timer() - t0))
+"""
+
+
+def run_benchmarks(sizes=(10, 50, 100), kinds=KINDS, names=None, repeat=3):
+    """
+    Run the benchmark suite. Each measurement builds a fresh circuit that is not included in the timing.
+
+    :param sizes: Numbers of component instances
+    :param kinds: Circuit families to benchmark, see `build_circuit`
+    :param names: Benchmark names to run, default `None` for all of `BENCHMARKS`
+    :param repeat: Number of repetitions per measurement
+    :return: list of dicts with keys `benchmark`, `kind`, `size`, `best`, `mean` (times in seconds)
+    """
+    from cirq.headless import ensure_kernel
+
+    ensure_kernel()
+    results = []
+    for name, bench in BENCHMARKS:
+        if names and name not in names:
+            continue
+        for kind in kinds:
+            for size in sizes:
+                times = [bench(kind, size) for _ in range(repeat)]
+                results.append({
+                    "benchmark": name,
+                    "kind": kind,
+                    "size": size,
+                    "best": min(times),
+                    "mean": sum(times) / len(times),
+                })
+    return results
+
+
+def run_startup_benchmarks(size=50, names=None, repeat=3):
+    """
+    Measure the time of importing cirq and of first uses in fresh interpreter processes.
+    The interpreter's own startup is not included.
+
+    :param size: Number of component instances of the resistor circuit loaded from JSON
+    :param names: Benchmark names to run, default `None` for all of `STARTUP_BENCHMARKS`
+    :param repeat: Number of repetitions per measurement
+    :return: list of result dicts as for `run_benchmarks`, with kind `"startup"`
+    """
+    from cirq.headless import ensure_kernel
+
+    ensure_kernel()
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    env = dict(os.environ)
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_dir, env.get("PYTHONPATH")]))
+    results = []
+    try:
+        _connected("resistors", size)[0].save_json(path)
+        for name, statement in STARTUP_BENCHMARKS:
+            if names and name not in names:
+                continue
+            script = _STARTUP_SCRIPT.format(statement)
+            times = [float(subprocess.check_output([sys.executable, "-c", script, path], env=env))
+                     for _ in range(repeat)]
+            results.append({
+                "benchmark": name,
+                "kind": "startup",
+                "size": size,
+                "best": min(times),
+                "mean": sum(times) / len(times),
+            })
+    finally:
+        os.remove(path)
+    return results
+
+
+def compare(old_results, new_results, tolerance=.2):
+    """
+    Find regressions between two benchmark runs, based on the best times.
+
+    :param old_results: Result list of the reference run
+    :param new_results: Result list of the current run
+    :param tolerance: Relative slowdown that is still acceptable
+    :return: list of `(benchmark, kind, size, old_best, new_best)` tuples of regressed measurements
+    """
+    key = lambda r: (r["benchmark"], r["kind"], r["size"])
+    old = {key(r): r["best"] for r in old_results}
+    regressions = []
+    for r in new_results:
+        k = key(r)
+        if k in old and r["best"] > old[k] * (1. + tolerance):
+            regressions.append(k + (old[k], r["best"]))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Command line entry point. See the module docstring.
+
+    :param argv: Command line arguments, default `None` for `sys.argv[1:]`.
+    :return: Exit code, non-zero if regressions were found.
+    """
+    parser = argparse.ArgumentParser(description="Run the cirq benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=KINDS)
+    parser.add_argument("--benchmarks", nargs="+", choices=[n for n, _ in BENCHMARKS])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file instead of stdout.")
+    parser.add_argument("--compare", help="JSON results of a previous run to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=.2)
+    parser.add_argument("--startup", action="store_true", help="Also measure import and first-use times.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.kinds, args.benchmarks, args.repeat)
+    if args.startup:
+        results.extend(run_startup_benchmarks(max(args.sizes), repeat=args.repeat))
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(report, outfile, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+
+    if args.compare:
+        with open(args.compare, "r") as infile:
+            regressions = compare(json.load(infile)["results"], results, args.tolerance)
+        for name, kind, size, old_best, new_best in regressions:
+            sys.stderr.write("REGRESSION {} {} {}: {:.6f}s -> {:.6f}s\n".format(name, kind, size, old_best, new_best))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
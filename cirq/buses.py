@@ -0,0 +1,124 @@
+# coding=utf-8
+"""
+Helpers for circuits with bus ports, i.e., ports with a `width` greater than one.
+
+A bus port bundles `width` lanes into a single Port widget, and a single Connection between two buses
+of the same width connects their lanes pairwise. Lanes are only materialized on demand, either as
+lightweight `Lane` views (see `Port.lanes`, `Connection.lanes` and `lane_nets`) or, for backends that
+only understand simple ports, by `expand_buses`, which creates an equivalent circuit without buses.
+
+Instance arrays (see `ComponentType.make_array`) are built on bus ports: each of their ports has one lane
+per element, so `expand_buses` also replaces every array by its individual elements.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from cirq.core import Circuit, ComponentType, Connection, Port, Lane, InstanceArray
+
+LANE_NAME_FORMAT = "{}[{}]"
+
+
+def has_buses(circuit):
+    """
+    Return whether the circuit or any of its component instances has bus ports, or is an instance array.
+
+    :param circuit: Circuit object
+    """
+    return any(p.is_bus for p in circuit.ports) or any(isinstance(ci, InstanceArray) or any(p.is_bus for p in ci.ports)
+                                                       for ci in circuit.component_instances)
+
+
+def lane_nets(circuit, domain):
+    """
+    Compute the nets of a non-causal domain per lane. Since buses only connect to buses of the same width,
+    every net of bus ports returned by `Circuit.get_nets` stands for one net per lane.
+
+    :param circuit: Circuit object
+    :param domain: The domain for which to compute the nets
+    :return: list of nets, each a list of Lane views
+    """
+    return [[Lane(p, k) for p in net] for net in circuit.get_nets(domain) for k in range(net[0].width)]
+
+
+def expand_ports(ports, name_format=LANE_NAME_FORMAT):
+    """
+    Replace each bus port by one simple port per lane.
+
+    :param ports: Sequence of ports
+    :param name_format: Format string for the names of the lane ports, applied to the bus name and lane index.
+    :return: list of new ports
+    """
+    ret = []
+    for p in ports:
+        if p.is_bus:
+            ret.extend(Port(name=name_format.format(p.name, k), domain=p.domain, direction=p.direction)
+                       for k in range(p.width))
+        else:
+            ret.append(p.clone())
+    return ret
+
+
+# noinspection PyProtectedMember
+def expand_buses(circuit, name_format=LANE_NAME_FORMAT):
+    """
+    Create an equivalent circuit in which every bus port is replaced by one simple port per lane,
+    e.g., for exporting to a backend. Each bus connection becomes one connection per lane.
+    ComponentTypes with bus ports are replaced by expanded ComponentTypes of the same name.
+    Instance arrays are replaced by their elements, named like `name_format.format(array_name, index)`,
+    with their positions and parameters.
+
+    :param circuit: Circuit object
+    :param name_format: Format string for the names of the lane ports, applied to the bus name and lane index.
+    :return: A new Circuit object, or `circuit` itself if it has no bus ports.
+    """
+    if not has_buses(circuit):
+        return circuit
+
+    ctypes = {}
+    lanes = {}
+
+    def _register(old_ports, new_ports, widths, offset=0):
+        # lanes offset * w ... (offset + 1) * w - 1 of each old port are the next w new ports
+        new_ports = iter(new_ports)
+        for p, w in zip(old_ports, widths):
+            for k in range(w):
+                lanes[p, offset * w + k] = next(new_ports)
+
+    instances = []
+    for ci in circuit.component_instances:
+        ctype = ctypes.get(ci.ctype)
+        if ctype is None:
+            if any(p.is_bus for p in ci.ctype.ports):
+                ctype = ComponentType(name=ci.ctype.name, ports=expand_ports(ci.ctype.ports, name_format),
+                                      params=list(ci.ctype.params))
+            else:
+                ctype = ci.ctype
+            ctypes[ci.ctype] = ctype
+        widths = [p.width for p in ci.ctype.ports]
+        if isinstance(ci, InstanceArray):
+            for element in ci:
+                new = ctype.make_instance(name_format.format(ci.name, element.index))
+                new.param_assignments = element.param_assignments
+                _register(ci.ports, new.ports, widths, element.index)
+                instances.append((new,) + element.position)
+        else:
+            new = ctype.make_instance(ci.name)
+            new.param_assignments = dict(ci.param_assignments)
+            _register(ci.ports, new.ports, widths)
+            instances.append((new, ci._x, ci._y))
+
+    ports = expand_ports(circuit.ports, name_format)
+    _register(circuit.ports, ports, [p.width for p in circuit.ports])
+    ret = Circuit(name=circuit.name, ports=ports, component_instances=[new for new, _, _ in instances])
+    for new, x, y in instances:
+        new._x, new._y = x, y
+    ret.connections = [Connection(source=lanes[c.source, k], target=lanes[c.target, k])
+                       for c in circuit.connections for k in range(c.source.width)]
+    return ret
@@ -0,0 +1,107 @@
+# coding=utf-8
+"""
+Cache for compiled backend models keyed by the structural hash of a circuit.
+
+Backend adapters (e.g., converters to ahkab or QNET models) register a compile function under a name.
+Compiling an unchanged topology a second time then returns the cached model without re-conversion.
+Cached models only depend on the circuit structure, so parameter values should be applied
+separately, e.g., via a `cirq.params.ParameterStore`.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from collections import OrderedDict
+
+
+class CompileCache(object):
+    """
+    Least-recently-used cache of compiled backend models.
+
+    Entries are keyed by `(backend_name, circuit.structural_hash())`.
+    When more than `maxsize` entries are stored, the least recently used one is evicted.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._compilers = {}
+        self._entries = OrderedDict()
+
+    def register(self, backend, compile_model):
+        """
+        Register a backend compile function. Re-registering a backend drops its cached models.
+
+        :param backend: Name of the backend
+        :param compile_model: Function converting a Circuit into a backend model.
+        """
+        self._compilers[backend] = compile_model
+        self.invalidate(backend)
+
+    def compile(self, circuit, backend):
+        """
+        Return the compiled model for `circuit` from the cache, or compile and store it.
+
+        :param circuit: Circuit object
+        :param backend: Name of a registered backend
+        :return: compiled backend model
+        """
+        compile_model = self._compilers[backend]
+        key = (backend, circuit.structural_hash())
+        if key in self._entries:
+            self.hits += 1
+            model = self._entries.pop(key)
+        else:
+            self.misses += 1
+            model = compile_model(circuit)
+            while len(self._entries) >= self.maxsize > 0:
+                self._entries.popitem(last=False)
+        if self.maxsize > 0:
+            self._entries[key] = model
+        return model
+
+    def invalidate(self, backend=None):
+        """
+        Drop cached models.
+
+        :param backend: Only drop the models of this backend, default `None` for all backends.
+        """
+        if backend is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == backend]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+compile_cache = CompileCache()
+
+
+def register_backend(backend, compile_model):
+    """
+    Register a backend compile function with the default `compile_cache`.
+
+    :param backend: Name of the backend
+    :param compile_model: Function converting a Circuit into a backend model.
+    """
+    compile_cache.register(backend, compile_model)
+
+
+def compile_circuit(circuit, backend):
+    """
+    Compile `circuit` for `backend` using the default `compile_cache`.
+
+    :param circuit: Circuit object
+    :param backend: Name of a registered backend
+    :return: compiled backend model
+    """
+    return compile_cache.compile(circuit, backend)
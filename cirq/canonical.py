@@ -0,0 +1,329 @@
+# coding=utf-8
+"""
+Name-independent hashing and canonical forms of circuits, for deduplicating collections of circuits
+and caching results by topology.
+
+A circuit is viewed as a graph whose nodes are its component instances, labeled by their ComponentType
+(name, ports and array size), and its external ports, labeled by domain and direction. Each connection is an
+edge tagged with the names of the two ports it connects (and its direction, for causal domains).
+Instance names play no role, nor do the names of external ports unless `external_names=True`.
+Like `Circuit.structural_hash`, the hash ignores positions and parameter assignments.
+
+`canonical_hash` runs Weisfeiler-Lehman color refinement on this graph. Each round costs O(E log E) and the
+number of rounds is usually small. Isomorphic circuits always get the same hash. Circuits with different
+hashes are never isomorphic, but rare non-isomorphic circuits can share a hash. `canonical_form` settles such
+collisions exactly: it handles the connected parts of a circuit separately, refines the colors further by
+individualizing nodes and prunes symmetric branches via the automorphisms it discovers, e.g., between
+parallel instances. It returns a representation that is equal for two circuits if and only if they are
+isomorphic.
+
+All functions work on the JSON representation (see `Circuit.to_jsonifiable`), so stored circuits can be
+compared without creating widgets.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import hashlib
+import json
+import struct
+
+
+def _port_signature(info):
+    return info["name"], info["domain"], info["direction"], info.get("width", 1)
+
+
+def circuit_graph(obj, external_names=False):
+    """
+    Build the labeled graph of a circuit.
+
+    :param obj: Circuit in the `Circuit.to_jsonifiable` format
+    :param external_names: Whether the names of the external ports enter their labels
+    :return: tuple `(labels, adjacency, edges)` of the node labels, the lists of `(tag, neighbor)` pairs of each
+        node and the list of `(source, tag, target)` edges, with nodes given by index.
+    """
+    domains = obj.get("domains", {})
+    ctypes = obj.get("component_types", {})
+    arrays = obj.get("arrays", {})
+    labels = []
+    index = {}
+    port_domains = {}
+
+    for info in obj.get("ports", []):
+        domain = domains.get(info["domain"], {})
+        index[None, info["name"]] = len(labels)
+        port_domains[None, info["name"]] = info["domain"]
+        labels.append(("port", info["domain"], domain.get("causal", False), domain.get("one2one", False),
+                       info["direction"], info.get("width", 1), info["name"] if external_names else ""))
+    for name, ctype_name in sorted(obj.get("component_instances", {}).items()):
+        ports = ctypes[ctype_name]["ports"]
+        node = len(labels)
+        for info in ports:
+            index[name, info["name"]] = node
+            port_domains[name, info["name"]] = info["domain"]
+        labels.append(("instance", ctype_name, arrays.get(name, 0), tuple(map(_port_signature, ports))))
+
+    adjacency = [[] for _ in labels]
+    edges = []
+    circuit_name = obj.get("name")
+    for sn, spn, tn, tpn in obj.get("connections", []):
+        s = None if sn == circuit_name else sn, spn
+        t = None if tn == circuit_name else tn, tpn
+        u, v = index[s], index[t]
+        # external ports are already identified by their node
+        sp = "" if s[0] is None else spn
+        tp = "" if t[0] is None else tpn
+        if domains.get(port_domains[s], {}).get("causal", False):
+            adjacency[u].append((("out", sp, tp), v))
+            adjacency[v].append((("in", tp, sp), u))
+            edges.append((u, ("causal", sp, tp), v))
+        else:
+            adjacency[u].append((("net", sp, tp), v))
+            adjacency[v].append((("net", tp, sp), u))
+            edges.append((u, ("net", sp, tp), v))
+    return labels, adjacency, edges
+
+
+def _ranks(keys):
+    # dense ranks of keys in sorted order, and the sorted distinct keys with their counts
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    distinct = sorted(counts)
+    rank = {key: k for k, key in enumerate(distinct)}
+    return [rank[key] for key in keys], [(key, counts[key]) for key in distinct]
+
+
+def refine(colors, adjacency, tables=None):
+    """
+    Refine a coloring of the nodes until it is stable, i.e., until nodes of the same color have
+    the same multisets of tagged neighbor colors (1-dimensional Weisfeiler-Lehman refinement).
+
+    :param colors: List of integer colors per node
+    :param adjacency: List of `(tag, neighbor)` pairs per node
+    :param tables: Optional list to which the sorted signatures and their counts are appended for every round
+    :return: list of colors, dense ranks that only depend on the colored graph up to isomorphism
+    """
+    n_colors = len(set(colors))
+    while True:
+        signatures = [(colors[u], tuple(sorted((tag, colors[v]) for tag, v in adjacency[u])))
+                      for u in range(len(colors))]
+        new, table = _ranks(signatures)
+        if tables is not None:
+            tables.append(table)
+        if len(table) == n_colors:
+            return new
+        colors, n_colors = new, len(table)
+
+
+def canonical_hash(obj, external_names=False):
+    """
+    Return a 64-bit hash of a circuit that is invariant under renaming its component instances
+    (and its external ports, unless `external_names=True`). See the module documentation.
+
+    :param obj: Circuit in the `Circuit.to_jsonifiable` format
+    :param external_names: Whether the names of the external ports enter the hash
+    """
+    labels, adjacency, _ = circuit_graph(obj, external_names)
+    colors, label_table = _ranks(labels)
+    tables = [label_table]
+    refine(colors, adjacency, tables)
+    sha = hashlib.sha1()
+    for table in tables:
+        sha.update(json.dumps(table, separators=(",", ":")).encode("utf-8"))
+    return struct.unpack("<Q", sha.digest()[:8])[0]
+
+
+def _target_cell(colors):
+    # the first smallest cell with more than one node, or None if all colors are distinct
+    cells = {}
+    for u, c in enumerate(colors):
+        cells.setdefault(c, []).append(u)
+    candidates = [(len(cell), c) for c, cell in cells.items() if len(cell) > 1]
+    if not candidates:
+        return None
+    return cells[min(candidates)[1]]
+
+
+def _orbit_root(parent, u):
+    while parent.get(u, u) != u:
+        u = parent[u]
+    return u
+
+
+def _twins(labels, adjacency):
+    # transpositions of nodes with equal labels and equal tagged neighbors, which are automorphisms
+    groups = {}
+    for u, label in enumerate(labels):
+        if all(v != u for _, v in adjacency[u]):
+            groups.setdefault((label, tuple(sorted(adjacency[u]))), []).append(u)
+    return [{a: b, b: a} for group in groups.values() for a, b in zip(group, group[1:])]
+
+
+def _search_form(labels, adjacency, edges):
+    # canonical form of a connected graph by individualization and refinement
+    n = len(labels)
+    colors, _ = _ranks(labels)
+    colors = refine(colors, adjacency)
+    first = {}
+    best = {}
+    # automorphisms as dicts of the nodes they move
+    generators = _twins(labels, adjacency)
+
+    def _edge(leaf, u, tag, v):
+        kind, sp, tp = tag
+        # the direction of non-causal connections is arbitrary
+        if kind == "net" and (sp, leaf[u]) > (tp, leaf[v]):
+            return leaf[v], (kind, tp, sp), leaf[u]
+        return leaf[u], tag, leaf[v]
+
+    def _form(leaf):
+        order = [None] * n
+        for u, c in enumerate(leaf):
+            order[c] = labels[u]
+        return tuple(order), tuple(sorted(_edge(leaf, u, tag, v) for u, tag, v in edges))
+
+    def _automorphism(leaf, other):
+        # maps each node to the node with the same canonical index in the other leaf
+        node_of = [None] * n
+        for u, c in enumerate(other):
+            node_of[c] = u
+        return {u: node_of[c] for u, c in enumerate(leaf) if node_of[c] != u}
+
+    def _search(colors, path):
+        cell = _target_cell(colors)
+        if cell is None:
+            form = _form(colors)
+            if not first:
+                first.update(form=form, leaf=colors, path=path)
+                best.update(form=form, leaf=colors)
+                return None
+            if form == first["form"]:
+                generators.append(_automorphism(colors, first["leaf"]))
+                # the subtree of the first divergent choice is an image of the explored one
+                return next(k for k, (u, v) in enumerate(zip(path, first["path"])) if u != v)
+            if form == best["form"]:
+                generators.append(_automorphism(colors, best["leaf"]))
+            elif form < best["form"]:
+                best.update(form=form, leaf=colors)
+            return None
+
+        level = len(path)
+        on_path = set(path)
+        in_cell = set(cell)
+        tried = []
+        parent = {}
+        n_used = 0
+        for u in cell:
+            # skip nodes in the orbit of a tried node under the known automorphisms that fix the path
+            for g in generators[n_used:]:
+                if on_path.isdisjoint(g):
+                    for w, gw in g.items():
+                        if w in in_cell:
+                            ra, rb = _orbit_root(parent, w), _orbit_root(parent, gw)
+                            if ra != rb:
+                                parent[max(ra, rb)] = min(ra, rb)
+            n_used = len(generators)
+            root = _orbit_root(parent, u)
+            if any(_orbit_root(parent, w) == root for w in tried):
+                continue
+            tried.append(u)
+            individualized = [2 * c + (1 if w == u else 0) for w, c in enumerate(colors)]
+            jump = _search(refine(individualized, adjacency), path + [u])
+            if jump is not None and jump < level:
+                return jump
+        return None
+
+    _search(colors, [])
+    return best["form"]
+
+
+def canonical_form(obj, external_names=False):
+    """
+    Return a canonical form of a circuit: two circuits have equal canonical forms if and only if they are
+    isomorphic, i.e., equal up to renaming their component instances (and external ports, unless
+    `external_names=True`). Computing it can take much longer than `canonical_hash` for very symmetric circuits,
+    so it is best used to confirm that circuits with equal hashes are indeed equal.
+
+    :param obj: Circuit in the `Circuit.to_jsonifiable` format
+    :param external_names: Whether the names of the external ports are part of the form
+    :return: tuple `(labels, edges)` of the node labels in canonical order and the sorted list of
+        `(source, tag, target)` edges between canonical node indices
+    """
+    labels, adjacency, edges = circuit_graph(obj, external_names)
+
+    # the form of the circuit is the sorted list of the forms of its connected parts
+    part_of = [None] * len(labels)
+    parts = []
+    for root in range(len(labels)):
+        if part_of[root] is not None:
+            continue
+        part_of[root] = len(parts)
+        nodes = [root]
+        for u in nodes:
+            for _, v in adjacency[u]:
+                if part_of[v] is None:
+                    part_of[v] = part_of[root]
+                    nodes.append(v)
+        parts.append(nodes)
+
+    local = {}
+    for nodes in parts:
+        for k, u in enumerate(nodes):
+            local[u] = k
+    part_edges = [[] for _ in parts]
+    for u, tag, v in edges:
+        part_edges[part_of[u]].append((local[u], tag, local[v]))
+
+    forms = sorted(_search_form([labels[u] for u in nodes],
+                                [[(tag, local[v]) for tag, v in adjacency[u]] for u in nodes],
+                                part_edges[k])
+                   for k, nodes in enumerate(parts))
+    ret_labels = []
+    ret_edges = []
+    for part_labels, part_edge_list in forms:
+        offset = len(ret_labels)
+        ret_labels.extend(part_labels)
+        ret_edges.extend((u + offset, tag, v + offset) for u, tag, v in part_edge_list)
+    return tuple(ret_labels), tuple(ret_edges)
+
+
+def deduplicate(objs, external_names=False):
+    """
+    Group circuits into classes of isomorphic circuits. Canonical forms are only computed for circuits
+    whose hashes collide.
+
+    :param objs: Sequence of circuits in the `Circuit.to_jsonifiable` format
+    :param external_names: Whether the names of the external ports matter
+    :return: list of classes, each a list of indices into `objs`, in the order of their first members
+    """
+    buckets = {}
+    order = []
+    for k, obj in enumerate(objs):
+        h = canonical_hash(obj, external_names)
+        if h not in buckets:
+            buckets[h] = []
+            order.append(h)
+        buckets[h].append(k)
+
+    classes = []
+    for h in order:
+        bucket = buckets[h]
+        if len(bucket) == 1:
+            classes.append(bucket)
+            continue
+        by_form = {}
+        for k in bucket:
+            form = canonical_form(objs[k], external_names)
+            if form not in by_form:
+                by_form[form] = []
+                classes.append(by_form[form])
+            by_form[form].append(k)
+    classes.sort(key=lambda members: members[0])
+    return classes
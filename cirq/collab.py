@@ -0,0 +1,409 @@
+# coding=utf-8
+"""
+Change sequencing for several views editing the same circuit.
+
+A `ChangeSequencer` assigns consecutive version numbers to all changes of a circuit (as reported by
+`Circuit.on_operations`) and broadcasts each change as a compact `Delta` to all attached views.
+A view submits its edits together with the version it has last seen. Edits based on an outdated
+version are rebased over the changes the view has missed: references to renamed elements are
+updated, while operations on removed elements or operations that have become invalid (e.g., adding
+a component under a name that was taken in the meantime) are dropped. As all changes are applied
+in the order in which they arrive, every view ends up with the same state and the first of two
+conflicting edits wins.
+
+Selections are tracked per view, so views no longer compete for the single `selected_element` trait.
+
+Each notebook view of a circuit widget is attached to the circuit's sequencer (see `Circuit.sequencer` and
+`Circuit.front_end_view`): its clicks select elements in that view only, the connections it makes or deletes
+are submitted through its View, and it receives every change as a `"delta"` message, which it applies
+to its lists of component instances, ports and connections. While views are attached, the circuit no longer
+sends these lists in full; a view that is behind catches up via `View.catch_up`.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from collections import deque, namedtuple
+from itertools import count
+from threading import RLock
+
+from cirq.core import ComponentInstance, Port
+from cirq.history import snapshot_operations
+
+Delta = namedtuple("Delta", ["version", "origin", "operations"])
+
+
+def _rename_maps(deltas):
+    # follow renames and removals of the deltas, map old names to current names or None
+    components = {}
+    ports = {}
+    renamed_circuit = False
+    for delta in deltas:
+        for op in delta.operations:
+            kind = op[0]
+            if kind == "rename_component":
+                for k, v in components.items():
+                    if v == op[1]:
+                        components[k] = op[2]
+                components.setdefault(op[1], op[2])
+            elif kind == "remove_component":
+                for k, v in components.items():
+                    if v == op[1]:
+                        components[k] = None
+                components.setdefault(op[1], None)
+            elif kind == "rename_port":
+                for k, v in ports.items():
+                    if v == op[1]:
+                        ports[k] = op[2]
+                ports.setdefault(op[1], op[2])
+            elif kind == "remove_port":
+                for k, v in ports.items():
+                    if v == op[1]:
+                        ports[k] = None
+                ports.setdefault(op[1], None)
+            elif kind == "rename_circuit":
+                renamed_circuit = True
+    return components, ports, renamed_circuit
+
+
+def rebase_operations(operations, deltas):
+    """
+    Update the element names referred to by `operations` for the changes made by `deltas`.
+
+    :param operations: list of operation tuples, see `Circuit.apply_operations`
+    :param deltas: Deltas made since the version `operations` were based on
+    :return: list of rebased operation tuples, without the operations on removed elements
+    """
+    components, ports, renamed_circuit = _rename_maps(deltas)
+
+    def _c(name):
+        return components.get(name, name)
+
+    def _p(name):
+        return ports.get(name, name)
+
+    def _ref(parent, port):
+        if parent is None:
+            return None, _p(port)
+        return _c(parent), port
+
+    ret = []
+    for op in operations:
+        kind = op[0]
+        if kind in ("connect", "disconnect"):
+            s, t = _ref(*op[1:3]), _ref(*op[3:5])
+            if None in (s[1], t[1]) or (op[1] is not None and s[0] is None) or (op[3] is not None and t[0] is None):
+                continue
+            op = (kind,) + s + t
+        elif kind in ("remove_component", "rename_component"):
+            if _c(op[1]) is None:
+                continue
+            op = (kind, _c(op[1])) + tuple(op[2:])
+        elif kind in ("remove_port", "rename_port", "move_port"):
+            if _p(op[1]) is None:
+                continue
+            op = (kind, _p(op[1])) + tuple(op[2:])
+        elif kind == "rename_circuit" and renamed_circuit:
+            continue
+        ret.append(op)
+    return ret
+
+
+def _map_refs(connections, f):
+    return {f(c[:2]) + f(c[2:]) for c in connections}
+
+
+def applicable_operations(circuit, operations, ctypes=None):
+    """
+    Filter out the operations that cannot be applied to the current state of `circuit`,
+    e.g. because they refer to missing elements or would create duplicate names or connections.
+    Operations are checked in order, taking the effects of the preceding operations into account.
+
+    :param circuit: Circuit object
+    :param operations: list of operation tuples
+    :param ctypes: dict of ComponentTypes by name for `add_component` operations
+    :return: list of applicable operations
+    """
+    components = {name: ci.ctype for name, ci in circuit.c.items()}
+    known_ctypes = {ct.name: ct for ct in components.values()}
+    known_ctypes.update(ctypes or {})
+    ports = [p.name for p in circuit.ports]
+    connections = None
+    circuit_name = circuit.name
+
+    def _exists(parent, port):
+        if parent is None:
+            return port in ports
+        return parent in components and port in components[parent].p
+
+    ret = []
+    for op in operations:
+        kind = op[0]
+        if kind in ("connect", "disconnect"):
+            if connections is None:
+                # noinspection PyProtectedMember
+                connections = {circuit._port_ref(c.source) + circuit._port_ref(c.target)
+                               for c in circuit.connections}
+            s, t = tuple(op[1:3]), tuple(op[3:5])
+            if not (_exists(*s) and _exists(*t)):
+                continue
+            if kind == "connect":
+                if s + t in connections or t + s in connections:
+                    continue
+                connections.add(s + t)
+            else:
+                if s + t not in connections:
+                    continue
+                connections.discard(s + t)
+        elif kind == "add_component":
+            ctype = known_ctypes.get(op[2])
+            if op[1] in components or ctype is None:
+                continue
+            components[op[1]] = ctype
+        elif kind == "remove_component":
+            if op[1] not in components:
+                continue
+            del components[op[1]]
+            if connections is not None:
+                connections = {c for c in connections if op[1] not in (c[0], c[2])}
+        elif kind == "rename_component":
+            if op[1] not in components or op[2] in components:
+                continue
+            components[op[2]] = components.pop(op[1])
+            if connections is not None:
+                connections = _map_refs(connections, lambda r: (op[2], r[1]) if r[0] == op[1] else r)
+        elif kind == "add_port":
+            if op[1] in ports:
+                continue
+            ports.insert(min(op[4], len(ports)), op[1])
+        elif kind == "remove_port":
+            if op[1] not in ports:
+                continue
+            ports.remove(op[1])
+            if connections is not None:
+                connections = {c for c in connections if (None, op[1]) not in (c[:2], c[2:])}
+        elif kind == "rename_port":
+            if op[1] not in ports or op[2] in ports:
+                continue
+            ports[ports.index(op[1])] = op[2]
+            if connections is not None:
+                connections = _map_refs(connections, lambda r: (None, op[2]) if r == (None, op[1]) else r)
+        elif kind == "move_port":
+            if op[1] not in ports:
+                continue
+            ports.remove(op[1])
+            ports.insert(min(op[3], len(ports)), op[1])
+        elif kind == "rename_circuit":
+            if op[1] != circuit_name:
+                continue
+            circuit_name = op[2]
+        ret.append(op)
+    return ret
+
+
+# noinspection PyProtectedMember
+def _contains(circuit, element):
+    if isinstance(element, ComponentInstance):
+        return circuit.c.get(element.name) is element
+    if isinstance(element, Port):
+        if element._parent is circuit:
+            return circuit.p.get(element.name) is element
+        return _contains(circuit, element._parent)
+    return element in circuit.connections
+
+
+class ChangeSequencer(object):
+    """
+    Assign versions to the changes of a circuit and broadcast them to all attached views.
+
+    Attributes
+    ----------
+
+    1. circuit: The shared circuit
+    2. version: Version number of the latest change
+    3. views: dict of attached views by id
+    """
+
+    def __init__(self, circuit, log_size=1000):
+        """
+        :param circuit: Circuit object
+        :param log_size: Number of recent deltas kept for rebasing edits and for views catching up.
+        """
+        self.circuit = circuit
+        self.version = 0
+        self.views = {}
+        self._log = deque(maxlen=log_size)
+        self._view_ids = count(1)
+        self._origin = None
+        self._lock = RLock()
+        circuit.on_operations(self.record)
+
+    def attach(self, callback=None):
+        """
+        Attach a new view.
+
+        :param callback: Optional callable `callback(view, delta)` invoked for every change.
+        :return: View object
+        """
+        with self._lock:
+            view = View(self, next(self._view_ids), callback)
+            self.views[view.id] = view
+            return view
+
+    def detach(self, view):
+        """
+        Detach a view, it will not receive any further changes.
+        """
+        with self._lock:
+            self.views.pop(view.id, None)
+
+    def close(self):
+        """
+        Detach all views and stop sequencing changes.
+        """
+        self.circuit.on_operations(self.record, remove=True)
+        self.views.clear()
+
+    def record(self, circuit, operations):
+        """
+        Assign the next version to a change and broadcast it. Registered as `on_operations` callback,
+        so edits made directly to the circuit are sequenced as well (with origin `None`).
+
+        :param circuit: The changed circuit
+        :param operations: list of operation tuples
+        """
+        with self._lock:
+            self.version += 1
+            delta = Delta(self.version, self._origin, list(operations))
+            self._log.append(delta)
+            for view in self.views.values():
+                view.receive(delta)
+
+    def since(self, version):
+        """
+        Return the deltas following `version`.
+
+        :param version: Version number
+        :return: list of Deltas or `None` if some of them are no longer kept.
+        """
+        with self._lock:
+            if version == self.version:
+                return []
+            if not self._log or self._log[0].version > version + 1:
+                return None
+            return [d for d in self._log if d.version > version]
+
+    def submit(self, operations, base_version, origin=None, ctypes=None, domains=None):
+        """
+        Apply the edits of a view.
+
+        :param operations: list of operation tuples, see `Circuit.apply_operations`
+        :param base_version: The latest version the view had seen when making the edits.
+        :param origin: id of the submitting view
+        :param ctypes: dict of ComponentTypes by name for `add_component` operations
+        :param domains: dict of Domains by name for `add_port` operations
+        :return: The Delta of the applied change, `None` if nothing could be applied.
+        :raise ValueError: if `base_version` is too old to be rebased.
+        """
+        with self._lock:
+            missed = self.since(base_version)
+            if missed is None:
+                raise ValueError("Version {} is too old, resynchronize the view.".format(base_version))
+            if missed:
+                operations = rebase_operations(operations, missed)
+            operations = applicable_operations(self.circuit, operations, ctypes)
+            if not operations:
+                return None
+            version = self.version
+            self._origin = origin
+            try:
+                self.circuit.apply_operations(operations, ctypes, domains)
+            finally:
+                self._origin = None
+            if self.version == version:
+                return None
+            return self._log[-1]
+
+    def selections(self):
+        """
+        Return the selected elements of all views that still belong to the circuit.
+
+        :return: dict mapping view ids to selected elements
+        """
+        return {vid: view.selection for vid, view in self.views.items()
+                if view.selection is not None and _contains(self.circuit, view.selection)}
+
+
+class View(object):
+    """
+    A view of a circuit attached to a `ChangeSequencer`.
+
+    Attributes
+    ----------
+
+    1. id: Unique view id
+    2. version: Version of the latest change the view has received
+    3. selection: The element selected in this view
+    """
+
+    def __init__(self, sequencer, view_id, callback=None):
+        self.sequencer = sequencer
+        self.id = view_id
+        self.callback = callback
+        self.version = sequencer.version
+        self.selection = None
+
+    def receive(self, delta):
+        """
+        Receive a change from the sequencer.
+
+        :param delta: Delta object
+        """
+        self.version = delta.version
+        if self.callback is not None:
+            self.callback(self, delta)
+
+    def submit(self, operations, base_version=None, ctypes=None, domains=None):
+        """
+        Submit edits made in this view, see `ChangeSequencer.submit`.
+
+        :param operations: list of operation tuples
+        :param base_version: Version the edits are based on, default `None` for the latest received version.
+        """
+        if base_version is None:
+            base_version = self.version
+        return self.sequencer.submit(operations, base_version, self.id, ctypes, domains)
+
+    def select(self, element):
+        """
+        Select an element of the circuit in this view only.
+
+        :param element: ComponentInstance, Port or Connection of the circuit, or `None`
+        """
+        self.selection = element
+
+    def catch_up(self, version):
+        """
+        Return what a front end at `version` needs to reach the current state.
+
+        :param version: The front end's version
+        :return: tuple `(version, deltas, snapshot)` where either `deltas` is a list of Deltas
+            or, if they are no longer kept, `snapshot` is a list of operations that builds the circuit from scratch.
+        """
+        with self.sequencer._lock:
+            deltas = self.sequencer.since(version)
+            if deltas is None:
+                return self.sequencer.version, None, snapshot_operations(self.sequencer.circuit)
+            return self.sequencer.version, deltas, None
+
+    def detach(self):
+        """
+        Stop receiving changes.
+        """
+        self.sequencer.detach(self)
@@ -13,23 +13,35 @@ from IPython.core.display import SVG
 
 __author__ = 'Nikolas Tezak'
 
+import hashlib
 import json
-import os
+from array import array
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from timeit import default_timer
 from types import FunctionType
 from math import sin, cos, pi
 
 from IPython.utils.traitlets import (Unicode, Bool, Instance, Any, Enum,
-                                     HasTraits, Float, List, Tuple, Dict)
-from IPython.html.widgets import DOMWidget, ContainerWidget, ButtonWidget, PopupWidget, TextWidget, DropdownWidget
+                                     HasTraits, Float, Int, List, Tuple, Dict)
+from IPython.html.widgets import (Widget, DOMWidget, CallbackDispatcher, ContainerWidget, ButtonWidget, PopupWidget,
+                                  TextWidget, DropdownWidget)
 from IPython.display import display, Javascript, FileLink
 
+from cirq.palette import ComponentIndex
 
-def init_js():
+
+def init_js(inline=None):
     """
-    Run this to load the required javascript files
+    Run this to load the required javascript files.
+    Nothing is loaded if the page already has the current version.
+
+    :param inline: Whether to send the full script, default `None` to send only a short loader
+        if the script has been installed via `cirq.assets.install()`.
     """
-    path = os.path.join(os.path.dirname(__file__), "static", "cirq.js")
-    display(Javascript(filename=path))
+    from cirq.assets import init_script
+
+    display(Javascript(init_script(inline)))
 
 
 class Domain(DOMWidget):
@@ -63,6 +75,14 @@ class Domain(DOMWidget):
     _color_selected = Unicode("red", sync=True)
     _color_target = Unicode("green", sync=True)
 
+    @property
+    def css_class(self):
+        """
+        CSS class of all port and connection elements of this domain in the front-end.
+        Their colors are set by a single stylesheet per domain, which is rewritten when the colors change.
+        """
+        return "cirq-domain-{}".format(self.model_id)
+
     @classmethod
     def valid_connection(cls, p1, p2):
         """
@@ -77,6 +97,9 @@ class Domain(DOMWidget):
         if p1.domain is not p2.domain:
             return False
 
+        if p1.width != p2.width:
+            return False
+
         if p1.domain.causal:
 
             p1t = p1.is_target
@@ -119,6 +142,53 @@ def clone_ports(ports):
     return [p.clone() for p in ports]
 
 
+def port_info(p):
+    """
+    Return the description of a port as used in the JSON representation of circuits.
+    The `width` is only included for bus ports.
+
+    :param p: Port object
+    """
+    info = {"name": p.name, "domain": p.domain.name, "direction": p.direction}
+    if p.width != 1:
+        info["width"] = p.width
+    return info
+
+
+def make_port(info, domains):
+    """
+    Create a port from its description, see `port_info`.
+
+    :param info: dict with keys `name`, `domain`, `direction` and optionally `width`
+    :param domains: dict of Domains by name
+    """
+    return Port(name=info["name"], domain=domains[info["domain"]], direction=info["direction"],
+                width=info.get("width", 1))
+
+
+class Lane(namedtuple("Lane", ["port", "index"])):
+    """
+    A single lane of a (bus) port. Lanes are lightweight views that are created on demand.
+    Lane `k` of a bus is connected to lane `k` of every bus connected to it.
+    """
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return "{}[{}]".format(self.port.name, self.index)
+
+    @property
+    def domain(self):
+        return self.port.domain
+
+    @property
+    def direction(self):
+        return self.port.direction
+
+    def __repr__(self):
+        return "{!r}[{}]".format(self.port, self.index)
+
+
 class AttrDict(dict):
     """
     Dict that allows access of elements via dot-accessors.
@@ -180,6 +250,22 @@ class HasPorts(HasTraits):
         return filter(lambda p: p.domain is domain, self.ports)
 
 
+class _Width(Int):
+    """
+    Port width trait, validated before it is changed.
+    """
+
+    def validate(self, obj, value):
+        value = super(_Width, self).validate(obj, value)
+        if value < 1:
+            raise ValueError("Ports need a width of at least 1")
+        # read the stored values directly, as this also runs while the port is being constructed
+        stored = obj._trait_values
+        if value != stored.get("width", 1) and (stored.get("connections_in") or stored.get("connections_out")):
+            raise ValueError("The width of a connected port cannot be changed")
+        return value
+
+
 class Port(DOMWidget):
     """
     Connection port element. Can be associated with a ComponentType, a ComponentInstance or a Circuit.
@@ -206,6 +292,7 @@ class Port(DOMWidget):
     name = Unicode("n", sync=True)
     domain = Instance(klass=Domain, sync=True, doc="Associated domain, e.g., electrical contact, etc.")
     direction = Enum(("in", "out", "inout"), sync=True)
+    width = _Width(1, sync=True, help="Number of lanes of a bus port, 1 for a simple port.")
 
     params = List(sync=True)
 
@@ -237,6 +324,21 @@ class Port(DOMWidget):
                 if new not in ["in", "out"]:
                     raise ValueError("Causal domains can only have associated input and output ports")
 
+    # noinspection PyUnusedLocal
+    def _name_changed(self, name, old, new):
+        if self._circuit:
+            self._circuit._element_changed(self)
+
+    @property
+    def is_bus(self):
+        """True if the port bundles several lanes."""
+        return self.width > 1
+
+    @property
+    def lanes(self):
+        """List of the Lane views of the port, a single one for simple ports."""
+        return [Lane(self, k) for k in range(self.width)]
+
     @property
     def is_ext(self):
         """True if the port is external, i.e. the port of a whole circuit."""
@@ -253,8 +355,8 @@ class Port(DOMWidget):
         return self.direction == "in" or (self.direction == "out" and self.is_ext)
 
     def clone(self):
-        """Create a port with the same name, domain and direction to be associated with a new parent element."""
-        return Port(name=self.name, domain=self.domain, direction=self.direction)
+        """Create a port with the same name, domain, direction and width to be associated with a new parent element."""
+        return Port(name=self.name, domain=self.domain, direction=self.direction, width=self.width)
 
     def __repr__(self):
         if self._parent:
@@ -363,6 +465,36 @@ class ComponentType(HasPorts, DOMWidget):
             **default_options
         )
 
+    def make_array(self, name, size, **options):
+        """
+        Create an InstanceArray representing `size` identical instances of the ComponentType
+        by a single element with bus ports. See `make_instance` for the options.
+
+        :param name: name for the array
+        :param size: number of elements
+        """
+        default_options = dict(
+            _layout_ports=self._layout_ports,
+            _inner_svg=self._inner_svg,
+            _x_label=self._x_label,
+            _y_label=self._y_label,
+            _inner_color=self._inner_color,
+            _inner_color_selected=self._inner_color_selected,
+            _label_color=self._label_color,
+        )
+        default_options.update(options)
+
+        ports = clone_ports(self.ports)
+        for p in ports:
+            p.width *= size
+        return InstanceArray(
+            name=name,
+            ctype=self,
+            size=size,
+            ports=ports,
+            **default_options
+        )
+
     def __repr__(self):
         return "ComponentType(name={}, ports={!r}, params={!r})".format(self.name, self.ports, self.params)
 
@@ -389,6 +521,11 @@ class ComponentInstance(HasPorts, DOMWidget):
     _inner_color_selected = Unicode("red", sync=True)
     _label_color = Unicode("white", sync=True)
 
+    # noinspection PyUnusedLocal
+    def _name_changed(self, name, old, new):
+        if self._circuit:
+            self._circuit._element_changed(self)
+
     def __repr__(self):
         if self._circuit:
             # noinspection PyTypeChecker
@@ -396,6 +533,103 @@ class ComponentInstance(HasPorts, DOMWidget):
         return self.name
 
 
+class ArrayElement(namedtuple("ArrayElement", ["array", "index"])):
+    """
+    View of a single element of an InstanceArray, created on demand.
+    The ports of an element are Lane views of the array's bus ports, e.g., `my_array[17].p.In1`.
+    Elements of a ComponentType with bus ports of width `w` have lists of `w` lanes as ports.
+    """
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return "{}[{}]".format(self.array.name, self.index)
+
+    @property
+    def ctype(self):
+        return self.array.ctype
+
+    @property
+    def p(self):
+        ret = AttrDict()
+        k = self.index
+        for tp, p in zip(self.array.ctype.ports, self.array.ports):
+            w = tp.width
+            ret[p.name] = Lane(p, k) if w == 1 else [Lane(p, k * w + j) for j in range(w)]
+        return ret
+
+    @property
+    def param_assignments(self):
+        return self.array.element_params(self.index)
+
+    @property
+    def position(self):
+        """Absolute `(x, y)` position of the element."""
+        return self.array._x + self.array.element_x[self.index], self.array._y + self.array.element_y[self.index]
+
+    def __repr__(self):
+        return "{!r}[{}]".format(self.array, self.index)
+
+
+class InstanceArray(ComponentInstance):
+    """
+    A single circuit element representing `size` identical instances of a ComponentType,
+    see `ComponentType.make_array`.
+
+    Each port of the ComponentType is represented by one bus port with a lane per element
+    (or `w` consecutive lanes per element for ports of width `w`), so connecting two arrays connects
+    their elements pairwise with a single Connection. Per-element state is stored in columns:
+    `element_x` and `element_y` hold the element offsets relative to the array position, and
+    `param_columns` maps parameter names to lists of per-element values that override the
+    array-wide `param_assignments`. Use `array[k]` to address single elements.
+    """
+
+    size = Int(1, sync=True)
+    collapsed = Bool(True, sync=True)
+    param_columns = Dict()
+
+    def __init__(self, **kw):
+        super(InstanceArray, self).__init__(**kw)
+        self.element_x = array("d", (2 * self._r * k for k in range(self.size)))
+        self.element_y = array("d", [0.] * self.size)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return ArrayElement(self, index)
+
+    def __iter__(self):
+        return (ArrayElement(self, k) for k in range(self.size))
+
+    def set_column(self, name, values):
+        """
+        Set the per-element values of a parameter.
+
+        :param name: Parameter name
+        :param values: Sequence with one value per element
+        """
+        values = list(values)
+        if len(values) != self.size:
+            raise ValueError("Expected {} values, got {}".format(self.size, len(values)))
+        self.param_columns = dict(self.param_columns, **{name: values})
+
+    def element_params(self, index):
+        """
+        Return the parameter assignments of one element.
+
+        :param index: Element index
+        """
+        ret = dict(self.param_assignments)
+        for name, values in self.param_columns.items():
+            ret[name] = values[index]
+        return ret
+
+
 class Connection(DOMWidget):
     """
     Class representing a single connection between two ports.
@@ -421,10 +655,13 @@ class Connection(DOMWidget):
 
     _circuit = Any(sync=True)
 
-    _color = Unicode("black", sync=True)
-    _color_selected = Unicode("red", sync=True)
     _cr = Float(140., sync=True)
 
+    @property
+    def lanes(self):
+        """List of `(source_lane, target_lane)` pairs of Lane views, one pair per lane of a bus connection."""
+        return zip(self.source.lanes, self.target.lanes)
+
     # noinspection PyProtectedMember
     def _source_changed(self, _, old, new):
         if old:
@@ -434,8 +671,6 @@ class Connection(DOMWidget):
             old.connections_out = remove_self(old.connections_out)
 
         new.connections_out.append(self)
-        self._color = new.domain._color
-        self._color_selected = new.domain._color_selected
 
     def _target_changed(self, _, old, new):
         if old:
@@ -450,14 +685,248 @@ class Connection(DOMWidget):
         Remove the connection from the circuit and the relevant connections_in/out lists of its ports.
         """
         remove_self = lambda ll: filter(lambda c: c is not self, ll)
-        self._circuit.connections = remove_self(self._circuit.connections)
-        self.source.connections_out = remove_self(self.source.connections_out)
-        self.target.connections_in = remove_self(self.target.connections_in)
+        circuit = self._circuit
+        with circuit.changes():
+            if self in circuit.connections:
+                circuit._emit(("disconnect",) + circuit._port_ref(self.source) + circuit._port_ref(self.target))
+            circuit.connections = remove_self(circuit.connections)
+            self.source.connections_out = remove_self(self.source.connections_out)
+            self.target.connections_in = remove_self(self.target.connections_in)
 
     def __repr__(self):
         return "Connection(source={!r}, target={!r})".format(self.source, self.target)
 
 
+class StructuralHash(object):
+    """
+    Order-independent hash over a set of elements that can be updated in O(1) per added or removed element.
+
+    Each element contributes the 64-bit digest of a key describing it, and the overall value is the sum
+    of all contributions modulo 2**64. The digests are derived via md5, so the value is stable
+    across processes and sessions.
+    """
+
+    MASK = (1 << 64) - 1
+
+    def __init__(self):
+        self.contributions = {}
+        self.value = 0
+
+    def add(self, element, key):
+        """
+        Add (or replace) the contribution of `element`.
+
+        :param element: Any hashable object identifying the contribution
+        :param key: Structural description of the element, must have a deterministic `repr`.
+        """
+        self.remove(element)
+        h = int(hashlib.md5(repr(key)).hexdigest()[:16], 16)
+        self.contributions[element] = h
+        self.value = (self.value + h) & self.MASK
+
+    def remove(self, element):
+        """
+        Remove the contribution of `element`, if present.
+
+        :param element: Object identifying the contribution
+        """
+        h = self.contributions.pop(element, None)
+        if h is not None:
+            self.value = (self.value - h) & self.MASK
+
+    def __contains__(self, element):
+        return element in self.contributions
+
+
+class ConnectivityIndex(object):
+    """
+    Incrementally maintained connectivity bookkeeping for a Circuit.
+
+    The index is updated by the Circuit whenever ports, component instances or connections are
+    added or removed, such that queries for unconnected ports, the degree histogram, the fan-in/fan-out
+    of a port and the instances adjacent to a given instance can be answered in O(1) or O(result).
+
+    The endpoints of a connection are recorded when it is added, so removing a connection
+    always undoes exactly what adding it did.
+    """
+
+    def __init__(self):
+        self.fan_in = {}
+        self.fan_out = {}
+        self.unconnected = {}
+        self.histogram = {}
+        self.adjacency = {}
+        self.endpoints = {}
+
+    def _count(self, degree, delta):
+        n = self.histogram.get(degree, 0) + delta
+        if n:
+            self.histogram[degree] = n
+        else:
+            del self.histogram[degree]
+
+    def add_port(self, p):
+        """
+        Start tracking the port `p` as an unconnected port.
+
+        :param p: Port instance
+        """
+        if p in self.fan_in:
+            return
+        self.fan_in[p] = 0
+        self.fan_out[p] = 0
+        self.unconnected.setdefault(p.domain, set()).add(p)
+        self._count(0, 1)
+        self.adjacency.setdefault(p._parent, {})
+
+    def remove_port(self, p):
+        """
+        Stop tracking the port `p`.
+
+        :param p: Port instance
+        """
+        if p not in self.fan_in:
+            return
+        self._count(self.fan_in.pop(p) + self.fan_out.pop(p), -1)
+        self.unconnected.get(p.domain, set()).discard(p)
+
+    def remove_element(self, element):
+        """
+        Stop tracking a component instance (or circuit) and all its ports.
+
+        :param element: ComponentInstance or Circuit
+        """
+        for p in element.ports:
+            self.remove_port(p)
+        self.adjacency.pop(element, None)
+
+    def _shift(self, p, d_in, d_out):
+        if p not in self.fan_in:
+            return
+        degree = self.fan_in[p] + self.fan_out[p]
+        self.fan_in[p] += d_in
+        self.fan_out[p] += d_out
+        new_degree = degree + d_in + d_out
+        self._count(degree, -1)
+        self._count(new_degree, 1)
+        if new_degree:
+            self.unconnected.get(p.domain, set()).discard(p)
+        else:
+            self.unconnected.setdefault(p.domain, set()).add(p)
+
+    def _link(self, a, b, delta):
+        for x, y in ([(a, b)] if a is b else [(a, b), (b, a)]):
+            neighbors = self.adjacency.get(x)
+            if neighbors is None:
+                continue
+            n = neighbors.get(y, 0) + delta
+            if n > 0:
+                neighbors[y] = n
+            else:
+                neighbors.pop(y, None)
+
+    # noinspection PyProtectedMember
+    def add_connection(self, c):
+        """
+        Account for a new connection.
+
+        :param c: Connection instance
+        """
+        if c in self.endpoints:
+            return
+        s, t = self.endpoints[c] = c.source, c.target
+        self._shift(s, 0, 1)
+        self._shift(t, 1, 0)
+        self._link(s._parent, t._parent, 1)
+
+    # noinspection PyProtectedMember
+    def remove_connection(self, c):
+        """
+        Account for a removed connection.
+
+        :param c: Connection instance
+        """
+        if c not in self.endpoints:
+            return
+        s, t = self.endpoints.pop(c)
+        self._shift(s, 0, -1)
+        self._shift(t, -1, 0)
+        self._link(s._parent, t._parent, -1)
+
+
+def _width_suffix(p):
+    # port operations only carry the width of bus ports
+    return (p.width,) if p.width != 1 else ()
+
+
+def _size_suffix(ci):
+    # component operations only carry the size of instance arrays
+    return (ci.size,) if isinstance(ci, InstanceArray) else ()
+
+
+_VISUAL_TRAITS = ["_inner_svg", "_x_label", "_y_label", "_inner_color", "_inner_color_selected", "_label_color"]
+
+
+def component_state(ci):
+    """
+    Return the state of a component instance beyond its name, type, position and size, as a jsonifiable dict
+    with the entries that differ from a new instance: `"params"` (the parameter assignments), `"visual"`
+    (overrides of the ComponentType's visual properties) and, for InstanceArrays, `"collapsed"`,
+    `"param_columns"`, `"element_x"` and `"element_y"`.
+
+    :param ci: ComponentInstance
+    """
+    ret = {}
+    if ci.param_assignments:
+        ret["params"] = dict(ci.param_assignments)
+    visual = {t: getattr(ci, t) for t in _VISUAL_TRAITS if getattr(ci, t) != getattr(ci.ctype, t)}
+    if visual:
+        ret["visual"] = visual
+    if isinstance(ci, InstanceArray):
+        if not ci.collapsed:
+            ret["collapsed"] = False
+        if ci.param_columns:
+            ret["param_columns"] = {name: list(values) for name, values in ci.param_columns.items()}
+        if list(ci.element_x) != [2 * ci._r * k for k in range(ci.size)] or any(ci.element_y):
+            ret["element_x"] = list(ci.element_x)
+            ret["element_y"] = list(ci.element_y)
+    return ret
+
+
+def restore_component_state(ci, state):
+    """
+    Restore the state returned by `component_state`.
+
+    :param ci: ComponentInstance of the same type (and size)
+    :param state: dict as returned by `component_state`
+    """
+    if "params" in state:
+        ci.param_assignments = dict(state["params"])
+    for t, value in state.get("visual", {}).items():
+        setattr(ci, t, value)
+    if "collapsed" in state:
+        ci.collapsed = state["collapsed"]
+    if "param_columns" in state:
+        ci.param_columns = {name: list(values) for name, values in state["param_columns"].items()}
+    if "element_x" in state:
+        ci.element_x = array("d", state["element_x"])
+        ci.element_y = array("d", state["element_y"])
+
+
+def _state_suffix(ci):
+    # component operations carry the state of the instance if it differs from a new one
+    state = component_state(ci)
+    return (state,) if state else ()
+
+
+def _component_op_extras(op):
+    # the optional size and state of an add_component or remove_component operation
+    extras = op[5:]
+    state = extras[-1] if extras and isinstance(extras[-1], dict) else None
+    size = extras[0] if extras and not isinstance(extras[0], dict) else None
+    return size, state
+
+
 class Circuit(ComponentType):
     """
     Circuit widget class. A circuit is defined by:
@@ -497,6 +966,10 @@ class Circuit(ComponentType):
     c = Dict(AttrDict({}))
 
     selected_element = Any(sync=True)
+    selection = List(sync=True)
+
+    _connectivity = Instance(klass=ConnectivityIndex, args=())
+    _structure = Instance(klass=StructuralHash, args=())
 
     _layout_x0 = Float(80., sync=True)
     _layout_y0 = Float(120., sync=True)
@@ -507,7 +980,22 @@ class Circuit(ComponentType):
     _port_y = Float(30., sync=True)
     _dock_color = Unicode("#3366AA", sync=True)
 
+    # element lists that attached front-end views keep up to date by applying deltas
+    _delta_traits = ("component_instances", "ports", "connections")
+
     def __init__(self, **kw):
+        self._operation_callbacks = CallbackDispatcher()
+        self._pending_operations = []
+        self._changes_depth = 0
+        self._sequencer = None
+        # every ComponentType and Domain used in the circuit so far, by name, see known_component_type
+        self._known_ctypes = {}
+        self._known_domains = {}
+        # front-end views by key and their keys by View id
+        self._views = {}
+        self._view_keys = {}
+        # version and model ids of the latest delta sent to the front-end views
+        self._sent_ids = None, None
         super(Circuit, self).__init__(**kw)
         self.on_msg(self.handle_element_msg)
 
@@ -535,6 +1023,12 @@ class Circuit(ComponentType):
         for ct in snew - sold:
             ct._circuit = self
             ct.on_msg(self.handle_element_msg)
+            self._connectivity.add_connection(ct)
+            self._structure.add(ct, self._structural_key(ct))
+
+        for ct in sold - snew:
+            self._connectivity.remove_connection(ct)
+            self._structure.remove(ct)
 
     @staticmethod
     def delete_connection(c):
@@ -560,7 +1054,446 @@ class Circuit(ComponentType):
         # print "connecting", p1, p2
         new_connection = Connection(source=p1, target=p2)
 
-        self.connections = self.connections + [new_connection]
+        with self.changes():
+            self.connections = self.connections + [new_connection]
+            self._emit(("connect",) + self._port_ref(p1) + self._port_ref(p2))
+        return new_connection
+
+    @contextmanager
+    def changes(self):
+        """
+        Context manager grouping all modifications made through the editing methods of the circuit
+        (`connect`, `add_component`, `remove_component`, `rename_component`, `add_port`, `remove_port`,
+        `rename_port`, `move_port`, `rename` and `Connection.remove`) into a single change.
+        Change callbacks (see `on_operations`) are invoked once when the outermost block exits.
+        """
+        self._changes_depth += 1
+        try:
+            yield
+        finally:
+            self._changes_depth -= 1
+        if not self._changes_depth and self._pending_operations:
+            operations, self._pending_operations = self._pending_operations, []
+            self._operation_callbacks(self, operations)
+
+    def on_operations(self, callback, remove=False):
+        """
+        (Un)register a callback to be invoked after each change of the circuit.
+
+        The callback is called as `callback(circuit, operations)` where `operations` is a list of tuples
+        such as `("connect", source_parent, source_port, target_parent, target_port)`
+        or `("rename_component", old_name, new_name)`. Ports are referred to by the name of their parent
+        component instance or `None` for external ports of the circuit. See `apply_operations`
+        for the full list of operations.
+
+        :param callback: Callable `callback(circuit, operations)`
+        :param remove: Unregister the callback instead
+        """
+        self._operation_callbacks.register_callback(callback, remove=remove)
+
+    def _emit(self, operation):
+        self._pending_operations.append(operation)
+
+    # noinspection PyProtectedMember
+    def _port_ref(self, p):
+        return None if p._parent is self else p._parent.name, p.name
+
+    def _resolve_port(self, parent_name, port_name):
+        if parent_name is None:
+            return self.p[port_name]
+        return self.c[parent_name].p[port_name]
+
+    # noinspection PyUnresolvedReferences
+    def add_component(self, ci, x=None, y=None):
+        """
+        Add a component instance to the circuit.
+
+        :param ci: ComponentInstance with a name that is not yet used within the circuit
+        :param x: Optional x-coordinate, default `None` for automatic placement
+        :param y: Optional y-coordinate, default `None` for automatic placement
+        """
+        if ci.name in self.c:
+            raise ValueError("A component instance named {} already exists.".format(ci.name))
+        with self.changes():
+            self.component_instances = self.component_instances + [ci]
+            if x is not None:
+                ci._x = x
+            if y is not None:
+                ci._y = y
+            self._emit(("add_component", ci.name, ci.ctype.name, ci._x, ci._y) + _size_suffix(ci) +
+                       _state_suffix(ci))
+
+    def remove_component(self, ci):
+        """
+        Remove a component instance and all connections to its ports from the circuit.
+
+        :param ci: ComponentInstance belonging to the circuit
+        """
+        with self.changes():
+            for p in ci.ports:
+                for c in p.connections_in + p.connections_out:
+                    c.remove()
+            self.component_instances = filter(lambda comp: comp is not ci, self.component_instances)
+            if self.selected_element is ci:
+                self.selected_element = None
+            if ci in self.selection:
+                self.selection = [e for e in self.selection if e is not ci]
+            self._emit(("remove_component", ci.name, ci.ctype.name, ci._x, ci._y) + _size_suffix(ci) +
+                       _state_suffix(ci))
+
+    # noinspection PyUnresolvedReferences
+    def rename_component(self, ci, name):
+        """
+        Rename a component instance of the circuit.
+
+        :param ci: ComponentInstance belonging to the circuit
+        :param name: New name that is not yet used within the circuit
+        """
+        if name in self.c:
+            raise ValueError("A component instance named {} already exists.".format(name))
+        with self.changes():
+            old = ci.name
+            del self.c[old]
+            ci.name = name
+            self.c[name] = ci
+            self._emit(("rename_component", old, name))
+
+    # noinspection PyUnresolvedReferences
+    def add_port(self, p, index=None):
+        """
+        Add an external port to the circuit.
+
+        :param p: Port with a name that is not yet used for an external port
+        :param index: Position in the list of external ports, default `None` to append.
+        """
+        if p.name in self.p:
+            raise ValueError("A port named {} already exists.".format(p.name))
+        if index is None:
+            index = len(self.ports)
+        with self.changes():
+            self.ports = self.ports[:index] + [p] + self.ports[index:]
+            self._emit(("add_port", p.name, p.domain.name, p.direction, index) + _width_suffix(p))
+
+    # noinspection PyUnresolvedReferences
+    def remove_port(self, p):
+        """
+        Remove an external port and all connections to it from the circuit.
+
+        :param p: External Port of the circuit
+        """
+        with self.changes():
+            for c in p.connections_in + p.connections_out:
+                c.remove()
+            index = self.ports.index(p)
+            self.ports = filter(lambda pp: pp is not p, self.ports)
+            if self.selected_element is p:
+                self.selected_element = None
+            if p in self.selection:
+                self.selection = [e for e in self.selection if e is not p]
+            self._emit(("remove_port", p.name, p.domain.name, p.direction, index) + _width_suffix(p))
+
+    # noinspection PyUnresolvedReferences
+    def rename_port(self, p, name):
+        """
+        Rename an external port of the circuit.
+
+        :param p: External Port of the circuit
+        :param name: New name that is not yet used for an external port
+        """
+        if name in self.p:
+            raise ValueError("A port named {} already exists.".format(name))
+        with self.changes():
+            old = p.name
+            del self.p[old]
+            p.name = name
+            self.p[name] = p
+            self._emit(("rename_port", old, name))
+
+    # noinspection PyUnresolvedReferences
+    def move_port(self, p, index):
+        """
+        Move an external port to a new position in the list of external ports.
+
+        :param p: External Port of the circuit
+        :param index: New position
+        """
+        ps = list(self.ports)
+        old = ps.index(p)
+        ps.pop(old)
+        index = max(0, min(index, len(ps)))
+        if index == old:
+            return
+        with self.changes():
+            self.ports = ps[:index] + [p] + ps[index:]
+            self._emit(("move_port", p.name, old, index))
+
+    def rename(self, name):
+        """
+        Rename the circuit.
+
+        :param name: New circuit name
+        """
+        with self.changes():
+            old = self.name
+            self.name = name
+            self._emit(("rename_circuit", old, name))
+
+    # noinspection PyProtectedMember
+    def _owns(self, element):
+        if isinstance(element, ComponentInstance):
+            return self.c.get(element.name) is element
+        if isinstance(element, Port):
+            return element._parent is self
+        if isinstance(element, Connection):
+            return element._circuit is self
+        return False
+
+    # noinspection PyProtectedMember
+    def move_elements(self, elements, dx, dy, echo=True):
+        """
+        Move component instances by an offset. Other elements are ignored.
+
+        :param elements: Sequence of circuit elements, e.g., the `selection`
+        :param dx: Offset along x
+        :param dy: Offset along y
+        :param echo: Whether to send the new positions to the front-end, `False` if it has moved them already.
+        """
+        for ci in elements:
+            if not isinstance(ci, ComponentInstance) or not self._owns(ci):
+                continue
+            x, y = ci._x + dx, ci._y + dy
+            if echo:
+                ci._x, ci._y = x, y
+            else:
+                with ci._lock_property("_x", x):
+                    ci._x = x
+                with ci._lock_property("_y", y):
+                    ci._y = y
+
+    # noinspection PyUnresolvedReferences,PyProtectedMember
+    def remove_elements(self, elements):
+        """
+        Remove component instances, external ports and connections, along with all connections to the removed
+        instances and ports, in a single update of each of the circuit's lists.
+
+        :param elements: Sequence of circuit elements, e.g., the `selection`
+        """
+        elements = set(e for e in elements if self._owns(e))
+        instances = [ci for ci in self.component_instances if ci in elements]
+        ports = [(k, p) for k, p in enumerate(self.ports) if p in elements]
+        removed = set(c for c in elements if isinstance(c, Connection))
+        for p in [p for ci in instances for p in ci.ports] + [p for _, p in ports]:
+            removed.update(p.connections_in)
+            removed.update(p.connections_out)
+        if not instances and not ports and not removed:
+            return
+
+        with self.changes():
+            if removed:
+                outgoing, incoming = {}, {}
+                for c in self.connections:
+                    if c in removed:
+                        self._emit(("disconnect",) + self._port_ref(c.source) + self._port_ref(c.target))
+                        outgoing.setdefault(c.source, set()).add(c)
+                        incoming.setdefault(c.target, set()).add(c)
+                self.connections = [c for c in self.connections if c not in removed]
+                for p, cs in outgoing.items():
+                    p.connections_out = [c for c in p.connections_out if c not in cs]
+                for p, cs in incoming.items():
+                    p.connections_in = [c for c in p.connections_in if c not in cs]
+            if instances:
+                gone = set(instances)
+                self.component_instances = [ci for ci in self.component_instances if ci not in gone]
+                for ci in instances:
+                    self._emit(("remove_component", ci.name, ci.ctype.name, ci._x, ci._y) + _size_suffix(ci) +
+                               _state_suffix(ci))
+            if ports:
+                gone = set(p for _, p in ports)
+                self.ports = [p for p in self.ports if p not in gone]
+                # last ports first, such that the indices stay valid when the operations are replayed
+                for index, p in reversed(ports):
+                    self._emit(("remove_port", p.name, p.domain.name, p.direction, index) + _width_suffix(p))
+            if self.selected_element in elements or self.selected_element in removed:
+                self.selected_element = None
+            if self.selection:
+                self.selection = [e for e in self.selection if e not in elements and e not in removed]
+
+    # noinspection PyProtectedMember
+    def copy_elements(self, elements):
+        """
+        Copy component instances and the connections among them, e.g., for pasting them via `paste_elements`.
+        Other elements are ignored.
+
+        :param elements: Sequence of circuit elements, e.g., the `selection`
+        :return: dict with lists `"component_instances"` of tuples `(ctype, name, x, y, state, size)`,
+            with the `component_state` of each instance (parameters, visual overrides and the per-element
+            columns and offsets of arrays) and size `None` for simple instances, and `"connections"` of tuples
+            `(source_index, source_port, target_index, target_port)` referring to the copied instances by index.
+        """
+        instances = [ci for ci in elements if isinstance(ci, ComponentInstance) and self._owns(ci)]
+        index = {ci: k for k, ci in enumerate(instances)}
+        connections = []
+        for ci in instances:
+            for p in ci.ports:
+                for c in p.connections_out:
+                    target = c.target._parent
+                    if target in index:
+                        connections.append((index[ci], p.name, index[target], c.target.name))
+        return {
+            "component_instances": [(ci.ctype, ci.name, ci._x, ci._y, component_state(ci),
+                                     ci.size if isinstance(ci, InstanceArray) else None)
+                                    for ci in instances],
+            "connections": connections,
+        }
+
+    # noinspection PyUnresolvedReferences,PyProtectedMember
+    def paste_elements(self, copied, dx=40., dy=40.):
+        """
+        Add copies of component instances and their connections, as returned by `copy_elements`,
+        in a single update of the circuit's lists. Names that are taken get a numeric suffix.
+
+        :param copied: dict as returned by `copy_elements`, possibly of another circuit
+        :param dx: Offset along x relative to the copied positions
+        :param dy: Offset along y relative to the copied positions
+        :return: list of the new component instances and connections
+        """
+        taken = set(self.c)
+        instances = []
+        for ctype, name, x, y, state, size in copied["component_instances"]:
+            new_name, k = name, 0
+            while new_name in taken:
+                k += 1
+                new_name = "{}_{}".format(name, k)
+            taken.add(new_name)
+            ci = ctype.make_instance(new_name) if size is None else ctype.make_array(new_name, size)
+            restore_component_state(ci, state)
+            instances.append((ci, x + dx, y + dy))
+        connections = self.add_elements(instances, [(instances[sk][0].p[sp], instances[tk][0].p[tp])
+                                                     for sk, sp, tk, tp in copied["connections"]])
+        return [ci for ci, _, _ in instances] + connections
+
+    # noinspection PyUnresolvedReferences,PyProtectedMember
+    def add_elements(self, instances=(), connections=()):
+        """
+        Add component instances and connections in a single update of each of the circuit's lists.
+        Connections are not verified.
+
+        :param instances: Sequence of tuples `(ci, x, y)` of new ComponentInstances with unique names and
+            their positions, where `None` selects automatic placement.
+        :param connections: Sequence of `(source, target)` port pairs to connect
+        :return: list of the new Connection objects
+        """
+        names = set(self.c)
+        for ci, _, _ in instances:
+            if ci.name in names:
+                raise ValueError("A component instance named {} already exists.".format(ci.name))
+            names.add(ci.name)
+        connections = [Connection(source=s, target=t) for s, t in connections]
+
+        with self.changes():
+            if instances:
+                self.component_instances = self.component_instances + [ci for ci, _, _ in instances]
+                for ci, x, y in instances:
+                    if x is not None:
+                        ci._x = x
+                    if y is not None:
+                        ci._y = y
+                    self._emit(("add_component", ci.name, ci.ctype.name, ci._x, ci._y) + _size_suffix(ci) +
+                               _state_suffix(ci))
+            if connections:
+                self.connections = self.connections + connections
+                for c in connections:
+                    self._emit(("connect",) + self._port_ref(c.source) + self._port_ref(c.target))
+        return connections
+
+    # noinspection PyUnresolvedReferences,PyProtectedMember
+    def apply_operations(self, operations, ctypes=None, domains=None):
+        """
+        Apply a sequence of operations as reported to `on_operations` callbacks. Supported operations are
+
+            1. `("connect", source_parent, source_port, target_parent, target_port)`
+            2. `("disconnect", source_parent, source_port, target_parent, target_port)`
+            3. `("add_component", name, ctype_name, x, y[, size][, state])`, with the size of InstanceArrays
+               and the state of instances that differ from new ones, see `component_state`
+            4. `("remove_component", name, ctype_name, x, y[, size][, state])`
+            5. `("rename_component", old_name, new_name)`
+            6. `("add_port", name, domain_name, direction, index[, width])`
+            7. `("remove_port", name, domain_name, direction, index[, width])`
+            8. `("rename_port", old_name, new_name)`
+            9. `("move_port", name, old_index, new_index)`
+            10. `("rename_circuit", old_name, new_name)`
+
+        Consecutive `add_component` and `connect` operations are applied in bulk.
+
+        :param operations: Sequence of operation tuples
+        :param ctypes: dict of ComponentTypes by name, used to resolve `add_component` operations.
+            Types of component instances already in the circuit are found automatically.
+        :param domains: dict of Domains by name, used to resolve `add_port` operations.
+            Domains of ports already in the circuit are found automatically.
+        """
+        ctypes = dict(ctypes or {})
+        domains = dict(domains or {})
+        for ci in self.component_instances:
+            ctypes.setdefault(ci.ctype.name, ci.ctype)
+        for p in self.ports:
+            domains.setdefault(p.domain.name, p.domain)
+
+        new_instances = []
+        new_connections = []
+
+        def _flush():
+            if new_instances:
+                self.component_instances = self.component_instances + [ci for ci, _, _ in new_instances]
+                for ci, x, y in new_instances:
+                    ci._x, ci._y = x, y
+                    self._emit(("add_component", ci.name, ci.ctype.name, x, y) + _size_suffix(ci) +
+                               _state_suffix(ci))
+            if new_connections:
+                self.connections = self.connections + new_connections
+                for c in new_connections:
+                    self._emit(("connect",) + self._port_ref(c.source) + self._port_ref(c.target))
+            del new_instances[:], new_connections[:]
+
+        with self.changes():
+            for op in operations:
+                kind = op[0]
+                if (kind != "add_component" and new_instances) or (kind != "connect" and new_connections):
+                    _flush()
+
+                if kind == "add_component":
+                    ctype = ctypes[op[2]]
+                    size, state = _component_op_extras(op)
+                    ci = ctype.make_array(op[1], size) if size is not None else ctype.make_instance(op[1])
+                    if state:
+                        restore_component_state(ci, state)
+                    new_instances.append((ci, op[3], op[4]))
+                elif kind == "connect":
+                    new_connections.append(Connection(source=self._resolve_port(*op[1:3]),
+                                                      target=self._resolve_port(*op[3:5])))
+                elif kind == "disconnect":
+                    s, t = self._resolve_port(*op[1:3]), self._resolve_port(*op[3:5])
+                    for c in s.connections_out:
+                        if c.target is t:
+                            c.remove()
+                            break
+                elif kind == "remove_component":
+                    self.remove_component(self.c[op[1]])
+                elif kind == "rename_component":
+                    self.rename_component(self.c[op[1]], op[2])
+                elif kind == "add_port":
+                    self.add_port(Port(name=op[1], domain=domains[op[2]], direction=op[3],
+                                       width=op[5] if len(op) > 5 else 1), op[4])
+                elif kind == "remove_port":
+                    self.remove_port(self.p[op[1]])
+                elif kind == "rename_port":
+                    self.rename_port(self.p[op[1]], op[2])
+                elif kind == "move_port":
+                    self.move_port(self.p[op[1]], op[3])
+                elif kind == "rename_circuit":
+                    self.rename(op[2])
+                else:
+                    raise ValueError("Unknown operation {!r}".format(op))
+            _flush()
 
     def _component_instances_changed(self, _, old, new):
         # noinspection PyUnresolvedReferences
@@ -572,7 +1505,17 @@ class Circuit(ComponentType):
         if not len(self.c) == len(new):
             raise ValueError("Component instances need all have unique names.")
 
+        for ci in set(old) - set(new):
+            self._connectivity.remove_element(ci)
+            self._structure.remove(ci)
+
         for ci in new:
+            self._known_ctypes[ci.ctype.name] = ci.ctype
+            for p in ci.ports:
+                self._known_domains[p.domain.name] = p.domain
+                self._connectivity.add_port(p)
+            if ci not in self._structure:
+                self._structure.add(ci, self._structural_key(ci))
             if not ci._circuit is self:
                 ci._circuit = self
                 kkx = kk // ny
@@ -590,67 +1533,334 @@ class Circuit(ComponentType):
 
     def _ports_changed(self, name, old, new):
         super(Circuit, self)._ports_changed(name, old, new)
+        for p in set(old) - set(new):
+            self._connectivity.remove_port(p)
         for p in new:
             p._circuit = self
             p.on_msg(self.handle_element_msg)
+            self._known_domains[p.domain.name] = p.domain
+            self._connectivity.add_port(p)
+        self._structure.add(self, self._structural_key(self))
+
+    @staticmethod
+    def _port_signature(p):
+        return p.name, p.domain.name, p.domain.causal, p.domain.one2one, p.direction, p.width
+
+    # noinspection PyProtectedMember
+    def _structural_key(self, element):
+        if element is self:
+            return "ports", tuple(map(self._port_signature, self.ports))
+        if isinstance(element, ComponentInstance):
+            return "instance", element.name, element.ctype.name, tuple(map(self._port_signature, element.ports))
+        s, t = element.source, element.target
+        # refer to the circuit's own ports without its name, so renaming the circuit does not matter
+        return ("connection",
+                s._parent.name if s._parent is not self else None, s.name,
+                t._parent.name if t._parent is not self else None, t.name)
+
+    # noinspection PyProtectedMember
+    def _element_changed(self, element):
+        """
+        Update the structural hash after a component instance or port has been renamed.
+
+        :param element: The renamed ComponentInstance or Port
+        """
+        if isinstance(element, Port):
+            ports = [element]
+            element = element._parent
+        else:
+            ports = element.ports
+        if element not in self._structure:
+            return
+        self._structure.add(element, self._structural_key(element))
+        for p in ports:
+            for c in p.connections_in + p.connections_out:
+                if c in self._structure:
+                    self._structure.add(c, self._structural_key(c))
+
+    def structural_hash(self):
+        """
+        Return a 64-bit hash of the circuit's structure, i.e., its external ports, its component instances
+        (names, types and port signatures) and its connections. Visual properties such as positions and
+        colors, parameter assignments and the circuit's own name do not enter the hash.
+
+        The hash is maintained incrementally as the circuit is modified,
+        so this call is O(1) and can serve as a key for caching compiled backend models.
+        """
+        return self._structure.value
+
+    def known_component_type(self, name):
+        """
+        Return the ComponentType of the given name of any instance that has been part of the circuit,
+        e.g., to resolve the type of an `add_component` operation after the instance has been renamed or removed.
+
+        :raise KeyError: if no such type has been used in the circuit.
+        """
+        return self._known_ctypes[name]
 
-    def port_msg(self, p, m):
+    def known_domain(self, name):
+        """
+        Return the Domain of the given name of any port that has been part of the circuit or its instances,
+        e.g., to resolve the domain of an `add_port` operation after the port has been renamed or removed.
+
+        :raise KeyError: if no such domain has been used in the circuit.
+        """
+        return self._known_domains[name]
+
+    @property
+    def sequencer(self):
+        """
+        The `cirq.collab.ChangeSequencer` of the circuit, created on first use.
+        Each front-end view of the circuit is attached to it, see `front_end_view`.
+        """
+        if self._sequencer is None:
+            from cirq.collab import ChangeSequencer
+
+            self._sequencer = ChangeSequencer(self)
+        return self._sequencer
+
+    def front_end_view(self, key):
+        """
+        Return the View representing a front-end view of the circuit, attaching it to the `sequencer` if necessary.
+        The front-end view receives every change as a `"delta"` message and keeps its own selection.
+        The message lists the operations of the change and the model ids of the elements they add
+        (see `_delta_ids`), such that the front-end can apply it to its copy of the element lists.
+
+        :param key: Key of the front-end view
+        :return: cirq.collab.View object
+        """
+        view = self._views.get(key)
+        if view is None:
+            view = self.sequencer.attach(self._send_delta)
+            self._views[key] = view
+            self._view_keys[view.id] = key
+        return view
+
+    def detach_front_end_view(self, key):
+        """
+        Detach the View of a front-end view that has been closed.
+
+        :param key: Key of the front-end view
+        """
+        view = self._views.pop(key, None)
+        if view is not None:
+            del self._view_keys[view.id]
+            view.detach()
+
+    def send_state(self, key=None):
+        """
+        Send the widget state, or a single property, to the front-end.
+        While front-end views are attached, the lists of component instances, ports and connections are left out:
+        the views apply the changes of the circuit as deltas instead, see `front_end_view`.
+
+        :param key: Name of a single property to send, default `None` for all properties.
+        """
+        keys = self.keys if key is None else [key]
+        if self._views:
+            keys = [k for k in keys if k not in self._delta_traits]
+        if keys:
+            self._send({"method": "update", "state": {k: self._pack_widgets(getattr(self, k)) for k in keys}})
+
+    def _find_connection(self, ref):
+        try:
+            source, target = self._resolve_port(*ref[:2]), self._resolve_port(*ref[2:])
+        except KeyError:
+            return None
+        for c in source.connections_out:
+            if c.target is target:
+                return c
+        return None
+
+    def _delta_ids(self, deltas):
+        """
+        Return the model ids of the elements added by the operations of consecutive deltas up to the current version,
+        which the front-end needs to apply them. The elements are looked up in the current state of the circuit
+        under the names they have after the later operations, the id is `None` if an element has been removed since.
+
+        :param deltas: list of Delta objects
+        :return: list of lists of model ids or `None`, one per operation of each Delta
+        """
+        components = {}
+        ports = {}
+        disconnected = set()
+
+        def _ref(parent, port):
+            if parent is None:
+                port = ports.get(port, port)
+                return None if port is None else (None, port)
+            parent = components.get(parent, parent)
+            return None if parent is None else (parent, port)
+
+        ids = []
+        for op in reversed([op for delta in deltas for op in delta.operations]):
+            kind = op[0]
+            element = None
+            if kind == "add_component":
+                element = self.c.get(components.get(op[1], op[1]))
+            elif kind == "add_port":
+                element = self.p.get(ports.get(op[1], op[1]))
+            elif kind in ("connect", "disconnect"):
+                s, t = _ref(*op[1:3]), _ref(*op[3:5])
+                if s is not None and t is not None:
+                    if kind == "disconnect":
+                        disconnected.add(s + t)
+                    elif s + t in disconnected:
+                        disconnected.discard(s + t)
+                    else:
+                        element = self._find_connection(s + t)
+            elif kind == "rename_component":
+                components[op[1]] = components.get(op[2], op[2])
+            elif kind == "remove_component":
+                components[op[1]] = None
+            elif kind == "rename_port":
+                ports[op[1]] = ports.get(op[2], op[2])
+            elif kind == "remove_port":
+                ports[op[1]] = None
+            ids.append(element.model_id if element is not None else None)
+        ids.reverse()
+
+        ret = []
+        k = 0
+        for delta in deltas:
+            ret.append(ids[k:k + len(delta.operations)])
+            k += len(delta.operations)
+        return ret
+
+    def _send_delta(self, view, delta, ids=None):
+        if view.selection is not None and view.id not in self.sequencer.selections():
+            # the selected element has been removed
+            view.select(None)
+        if ids is None:
+            # the latest delta, the same for all views
+            if self._sent_ids[0] != delta.version:
+                self._sent_ids = delta.version, self._delta_ids([delta])[0]
+            ids = self._sent_ids[1]
+        self.send({"type": "delta", "view": self._view_keys[view.id], "version": delta.version,
+                   "origin": self._view_keys.get(delta.origin), "operations": delta.operations, "ids": ids})
+
+    def _catch_up(self, view, version):
+        """
+        Bring a front-end view from `version` to the current version. It is sent the deltas it has missed or,
+        if its version is unknown or too old (see `cirq.collab.View.catch_up`), the full lists of elements.
+
+        :param view: View of the front-end view
+        :param version: Version of the front-end's elements, `None` if unknown
+        :return: The current version
+        """
+        if version is None:
+            current, deltas = self.sequencer.version, None
+        else:
+            current, deltas, _ = view.catch_up(version)
+        if deltas is None:
+            self._send({"method": "update",
+                        "state": {k: self._pack_widgets(getattr(self, k)) for k in self._delta_traits}})
+        else:
+            for delta, ids in zip(deltas, self._delta_ids(deltas)):
+                self._send_delta(view, delta, ids)
+        return current
+
+    def _selected(self, view):
+        return self.selected_element if view is None else view.selection
+
+    def _select(self, element, view=None):
+        if view is None:
+            self.selected_element = element
+            return
+        view.select(element)
+        # only the front-end view that made the selection marks it, Python-side tools see the latest one
+        with self._lock_property("selected_element", element):
+            self.selected_element = element
+        self.send({"type": "select_view", "view": self._view_keys[view.id],
+                   "id": element.model_id if element is not None else None})
+
+    def port_msg(self, p, m, view=None):
         """
         Handle click event sent from Port model.
 
         :param p: Port element that triggered the message
         :param m: Received message object
+        :param view: View of the front-end view that sent the message, if any
         """
         if m == "click":
-            se = self.selected_element
+            se = self._selected(view)
             if se:
                 if isinstance(se, Port):
-                    if p is self.selected_element:
-                        self.selected_element = None
+                    if p is se:
+                        self._select(None, view)
                         return
                     elif Domain.valid_connection(se, p):
                         # print "valid connection, connecting..."
-                        self.connect(se, p)
+                        if view is None:
+                            self.connect(se, p)
+                        else:
+                            view.submit([("connect",) + self._port_ref(se) + self._port_ref(p)])
                         return
-            self.selected_element = p
+            self._select(p, view)
 
-    def component_msg(self, c, m):
+    def component_msg(self, c, m, view=None):
         """
         Handle click event sent from Component model.
 
         :param c: Component instance that triggered the message
         :param m: Received message object
+        :param view: View of the front-end view that sent the message, if any
         """
         if m == "click":
-            if self.selected_element is c:
+            if self._selected(view) is c:
                 return
-            self.selected_element = c
+            self._select(c, view)
+        elif isinstance(m, dict) and m["type"] == "move":
+            # the front-end has already moved all selected instances along with c
+            self.move_elements([Widget.widgets.get(model_id) for model_id in m["ids"]], m["dx"], m["dy"],
+                               echo=False)
 
-    def connection_msg(self, c, m):
+    def connection_msg(self, c, m, view=None):
         """
         Handle click event sent from Connection model.
 
         :param c: Connection that triggered the message
         :param m: Received message object
+        :param view: View of the front-end view that sent the message, if any
         """
         if m == "click":
-            if self.selected_element is c:
-                self.delete_connection(c)
-                self.selected_element = None
+            if self._selected(view) is c:
+                if view is None:
+                    self.delete_connection(c)
+                else:
+                    view.submit([("disconnect",) + self._port_ref(c.source) + self._port_ref(c.target)])
+                self._select(None, view)
             else:
-                self.selected_element = c
+                self._select(c, view)
 
-    def msg(self, m):
+    def msg(self, m, view=None):
         """
         Handle click event sent from Circuit model.
 
         :param m: Received message object
+        :param view: View of the front-end view that sent the message, if any
         """
         if m == "click":
-            if self.selected_element:
-                self.selected_element = None
+            if self._selected(view):
+                self._select(None, view)
+            if self.selection:
+                self.selection = []
         elif isinstance(m, dict):
-            if m["type"] == "captured_svg":
+            if m["type"] == "attach_view":
+                view = self.front_end_view(m["view"])
+                self.send({"type": "attached", "view": m["view"],
+                           "version": self._catch_up(view, m.get("version"))})
+            elif m["type"] == "catch_up":
+                # the front-end view has missed deltas
+                view = self.front_end_view(m["view"])
+                self.send({"type": "caught_up", "view": m["view"], "version": self._catch_up(view, m["version"])})
+            elif m["type"] == "detach_view":
+                self.detach_front_end_view(m["view"])
+            elif m["type"] == "select":
+                # box selection, resolved by the front-end
+                widgets = [Widget.widgets.get(model_id) for model_id in m["ids"]]
+                self.selected_element = None
+                self.selection = [w for w in widgets if self._owns(w)]
+            elif m["type"] == "captured_svg":
                 # noinspection PyUnresolvedReferences
                 self.svg_snapshots.append(m["data"])
                 # noinspection PyTypeChecker
@@ -662,18 +1872,27 @@ class Circuit(ComponentType):
         """
         Handle messages from the front-end.
 
+        Clicks of a front-end view attached via `front_end_view` arrive as `{"type": "click", "view": key}`,
+        they select elements in that view only and its edits are submitted through its View.
+
         :param element: Circuit element that triggered the message
         :param msg: Message object
         """
         # print element, msg
+        view = None
+        if isinstance(msg, dict) and msg["type"] == "click":
+            view = self.front_end_view(msg["view"])
+            msg = "click"
+        if msg == "click" and element is not self and self.selection:
+            self.selection = []
         if isinstance(element, Port):
-            return self.port_msg(element, msg)
+            return self.port_msg(element, msg, view=view)
         if isinstance(element, ComponentInstance):
-            return self.component_msg(element, msg)
+            return self.component_msg(element, msg, view=view)
         if isinstance(element, Connection):
-            return self.connection_msg(element, msg)
+            return self.connection_msg(element, msg, view=view)
         if element is self:
-            return self.msg(msg)
+            return self.msg(msg, view=view)
 
     def capture_svg(self, callback=None):
         """
@@ -687,6 +1906,15 @@ class Circuit(ComponentType):
             # noinspection PyUnresolvedReferences
             self._svg_callbacks.append(callback)
 
+    def highlight(self, elements=()):
+        """
+        Highlight ports and connections in the front-end, e.g., the members of a net, in the color of
+        their domain's `_color_target`. Any previous highlighting is removed.
+
+        :param elements: Sequence of Port and Connection objects, default empty to remove all highlighting.
+        """
+        self.send({"type": "highlight", "ids": [e.model_id for e in elements]})
+
     # noinspection PyUnresolvedReferences
     def save_last_image(self, filename, display_link=True):
         """
@@ -744,6 +1972,142 @@ class Circuit(ComponentType):
 
         self.capture_svg(callback=_callback)
 
+    def unconnected_ports(self, domain=None):
+        """
+        Return all ports (of the circuit itself and of its component instances) without any connection.
+        This is served from an index that is maintained on every mutation of the circuit.
+
+        :param domain: Only return unconnected ports of this domain, default `None` for all domains.
+        """
+        if domain is not None:
+            return list(self._connectivity.unconnected.get(domain, ()))
+        return [p for ports in self._connectivity.unconnected.values() for p in ports]
+
+    def degree(self, port):
+        """
+        Return the total number of connections attached to `port`.
+
+        :param port: Port of the circuit or of one of its component instances
+        """
+        return self.fan_in(port) + self.fan_out(port)
+
+    def fan_in(self, port):
+        """
+        Return the number of connections having `port` as their target.
+
+        :param port: Port of the circuit or of one of its component instances
+        """
+        return self._connectivity.fan_in.get(port, 0)
+
+    def fan_out(self, port):
+        """
+        Return the number of connections having `port` as their source.
+
+        :param port: Port of the circuit or of one of its component instances
+        """
+        return self._connectivity.fan_out.get(port, 0)
+
+    def degree_histogram(self):
+        """
+        Return a dict mapping each port degree to the number of ports with that degree.
+        """
+        return dict(self._connectivity.histogram)
+
+    def adjacent_instances(self, element):
+        """
+        Return all elements (component instances or the circuit itself)
+        that share at least one connection with `element`.
+
+        :param element: ComponentInstance belonging to the circuit or the circuit itself
+        """
+        return list(self._connectivity.adjacency.get(element, {}))
+
+    def validate(self, allow_unconnected=True):
+        """
+        Check the circuit for invalid connections and return a list of problem descriptions.
+
+        The following problems are detected:
+
+            1. connections to ports that do not belong to the circuit
+            2. connections between ports of different domains
+            3. connections in a causal domain that do not lead from a source to a target port
+            4. ports of a one-to-one domain with more than one connection
+            5. unconnected ports, unless `allow_unconnected` is `True`
+
+        :param allow_unconnected: Whether unconnected ports are acceptable, default `True`.
+        :return: list of strings, empty if the circuit is valid.
+        """
+        problems = []
+        for c in self.connections:
+            s, t = c.source, c.target
+            if s not in self._connectivity.fan_in or t not in self._connectivity.fan_in:
+                problems.append("{!r} refers to a port outside of the circuit".format(c))
+            elif s.domain is not t.domain:
+                problems.append("{!r} connects different domains".format(c))
+            elif s.domain.causal and not (s.is_source and t.is_target):
+                problems.append("{!r} does not lead from a source to a target".format(c))
+
+        for p, n_in in self._connectivity.fan_in.items():
+            if p.domain.one2one and n_in + self._connectivity.fan_out[p] > 1:
+                problems.append("{!r} has more than one connection in a one-to-one domain".format(p))
+
+        if not allow_unconnected:
+            problems.extend("{!r} is unconnected".format(p) for p in self.unconnected_ports())
+        return problems
+
+    def partition(self, k, seed=0):
+        """
+        Split the circuit into `k` subcircuits with balanced numbers of component instances
+        while minimizing the number of connections between them, see `cirq.partition`.
+
+        The subcircuits contain copies of the component instances. Each cut connection is replaced
+        by a pair of external ports named by `cirq.partition.cut_port_name`, one in each of the two
+        subcircuits, while connections to the external ports of this circuit are kept in the subcircuits.
+
+        :param k: Number of partitions
+        :param seed: Random seed for the coarsening
+        :return: list of `k` Circuit objects
+        """
+        from cirq.partition import partition
+
+        return partition(self, k, seed)
+
+    def graph_view(self, level="ports", domain=None, directed=False):
+        """
+        Return a read-only NetworkX multigraph of the ports or component instances of the circuit
+        whose nodes and edges are read from the circuit on access, see `cirq.graphview`.
+
+        :param level: `"ports"` or `"instances"`
+        :param domain: Only include ports and connections of this Domain, default `None` for all.
+        :param directed: Whether edges lead from the source to the target of each connection, default `False`.
+        """
+        from cirq.graphview import graph_view
+
+        return graph_view(self, level, domain, directed)
+
+    def canonical_hash(self, external_names=False):
+        """
+        Return a 64-bit hash of the circuit's topology that does not depend on the names of its component
+        instances (nor, by default, on the names of its external ports), see `cirq.canonical`.
+        Unlike `structural_hash`, it is computed from scratch in O(E log E) per refinement round.
+
+        :param external_names: Whether the names of the external ports enter the hash
+        """
+        from cirq.canonical import canonical_hash
+
+        return canonical_hash(self.to_jsonifiable(), external_names)
+
+    def canonical_form(self, external_names=False):
+        """
+        Return a canonical form of the circuit that is equal for two circuits if and only if they are
+        equal up to renaming, e.g., to rule out collisions of `canonical_hash`, see `cirq.canonical`.
+
+        :param external_names: Whether the names of the external ports are part of the form
+        """
+        from cirq.canonical import canonical_form
+
+        return canonical_form(self.to_jsonifiable(), external_names)
+
     def get_nets(self, domain):
         """
         For a non-causal `domain`, compute all connected nets/cliques/groups of ports attached to each other.
@@ -794,7 +2158,7 @@ class Circuit(ComponentType):
         """
 
         with open(json_path, "r") as jsonfile:
-            ret = cls.from_json(jsonfile.readall())
+            ret = cls.from_json(jsonfile.read())
         return ret
 
     @classmethod
@@ -808,31 +2172,40 @@ class Circuit(ComponentType):
         return cls.from_jsonifiable(json.loads(json_string))
 
     @classmethod
-    def from_jsonifiable(cls, obj):
+    def from_jsonifiable(cls, obj, registry=None):
         """
         Create a Circuit from simple python dicts and lists. See source code of `to_jsonifiable`.
 
         :param obj: dicts and lists describing the circuit.
+        :param registry: Optional object providing methods `domain(name, causal, one2one)` and
+            `component_type(name, port_infos, domains)` that return shared Domain and ComponentType objects,
+            such as a `cirq.workspace.Workspace`. By default, new objects are created.
         :return: Circuit object
         """
         name = obj.get("name", None)
         if not name:
             raise ValueError()
 
-        domains = {k: Domain(name=k, causal=v["causal"], one2one=v["one2one"])
-                   for k, v in obj.get("domains", {}).items()}
+        if registry is None:
+            make_domain = lambda k, v: Domain(name=k, causal=v["causal"], one2one=v["one2one"])
+            make_ctype = lambda k, v: ComponentType(name=k, ports=[make_port(pi, domains) for pi in v["ports"]])
+        else:
+            make_domain = lambda k, v: registry.domain(k, v["causal"], v["one2one"])
+            make_ctype = lambda k, v: registry.component_type(k, v["ports"], domains)
 
-        def _make_port(port_info):
-            return Port(name=port_info["name"], domain=domains[port_info["domain"]], direction=port_info["direction"])
+        domains = {k: make_domain(k, v) for k, v in obj.get("domains", {}).items()}
 
-        ports = map(_make_port, obj.get("ports", []))
+        ports = [make_port(pi, domains) for pi in obj.get("ports", [])]
         ports_dict = {p.name: p for p in ports}
 
-        component_types = {k: ComponentType(name=k, ports=map(_make_port, v["ports"]))
-                           for k, v in obj.get("component_types", {}).items()}
+        component_types = {k: make_ctype(k, v) for k, v in obj.get("component_types", {}).items()}
 
-        component_instances = {k: component_types[v].make_instance(k)
+        arrays = obj.get("arrays", {})
+        component_instances = {k: (component_types[v].make_array(k, arrays[k]) if k in arrays
+                                   else component_types[v].make_instance(k))
                                for k, v in obj.get("component_instances", {}).items()}
+        for k, state in obj.get("instance_state", {}).items():
+            restore_component_state(component_instances[k], state)
 
         def _resolve_port(cn, pn):
             if cn == name:
@@ -858,21 +2231,18 @@ class Circuit(ComponentType):
             domains = domains | {p.domain for p in c.ports}
             ctypes.add(c.ctype)
 
-        def _port_info(p):
-            return {
-                "name": p.name,
-                "domain": p.domain.name,
-                "direction": p.direction,
-            }
-
-        ports = map(_port_info, self.ports)
+        ports = map(port_info, self.ports)
         domains_dict = {d.name: {"causal": d.causal, "one2one": d.one2one} for d in domains}
-        ctypes_dict = {ct.name: {"ports": map(_port_info, ct.ports)} for ct in ctypes}
+        ctypes_dict = {ct.name: {"ports": map(port_info, ct.ports)} for ct in ctypes}
         component_instances_dict = {c.name: c.ctype.name for c in self.component_instances}
+        arrays = {c.name: c.size for c in self.component_instances if isinstance(c, InstanceArray)}
+        # parameters, visual overrides and the per-element columns and offsets of arrays
+        instance_state = {c.name: state for c, state in ((c, component_state(c)) for c in self.component_instances)
+                          if state}
         # noinspection PyProtectedMember
         connections = [(c.source._parent.name, c.source.name, c.target._parent.name, c.target.name)
                        for c in self.connections]
-        return {
+        ret = {
             "name": self.name,
             "domains": domains_dict,
             "ports": ports,
@@ -880,6 +2250,11 @@ class Circuit(ComponentType):
             "component_instances": component_instances_dict,
             "connections": connections,
         }
+        if arrays:
+            ret["arrays"] = arrays
+        if instance_state:
+            ret["instance_state"] = instance_state
+        return ret
 
     def to_json(self):
         """
@@ -938,9 +2313,23 @@ class CircuitBuilder(PopupWidget):
     _domains_by_name = Dict()
     components = List()
     _components_by_name = Dict()
+    library = Any()
+    clipboard = Any()
+    palette_size = Int(20)
+    # an empty index until components or a library are set
+    _palette = Instance(klass=ComponentIndex, args=())
 
-    def __init__(self, domains, components, circuit, **kwargs):
+    def __init__(self, domains, components, circuit, history_depth=100, palette_size=20, **kwargs):
+        """
+        :param domains: list of Domains for new external ports
+        :param components: list of ComponentTypes, or a `cirq.library.ComponentLibrary`
+            whose types are only loaded when an instance is added.
+        :param circuit: Circuit object or name of a new circuit
+        :param history_depth: Maximum number of undo steps
+        :param palette_size: Maximum number of component types offered at once, narrow them down via the search field.
+        """
         super(CircuitBuilder, self).__init__(**kwargs)
+        self.palette_size = palette_size
 
         if isinstance(circuit, str):
             circuit = Circuit(name=circuit)
@@ -971,6 +2360,16 @@ class CircuitBuilder(PopupWidget):
         self._add_port_btn.on_click(self.add_port_dialog)
         self._add_comp_btn = ButtonWidget(description="New Component")
         self._add_comp_btn.on_click(self.add_component_dialog)
+        self._undo_btn = ButtonWidget(description="Undo")
+        self._undo_btn.on_click(self.undo)
+        self._redo_btn = ButtonWidget(description="Redo")
+        self._redo_btn.on_click(self.redo)
+        self._copy_btn = ButtonWidget(description="Copy")
+        self._copy_btn.on_click(self.copy_selection)
+        self._paste_btn = ButtonWidget(description="Paste")
+        self._paste_btn.on_click(self.paste)
+        self._delete_sel_btn = ButtonWidget(description="Delete Selection")
+        self._delete_sel_btn.on_click(self.delete_selection)
 
         self.basic_controls.children = [
             self._reset_view_btn,
@@ -978,9 +2377,17 @@ class CircuitBuilder(PopupWidget):
             self._rename_circ_btn,
             self._add_port_btn,
             self._add_comp_btn,
+            self._undo_btn,
+            self._redo_btn,
+            self._copy_btn,
+            self._paste_btn,
+            self._delete_sel_btn,
         ]
 
         # 2) add component
+        self._add_comp_search = TextWidget(description="Search")
+        self._add_comp_search.on_displayed(_resize_inputs)
+        self._add_comp_search.on_trait_change(self._update_palette, "value")
         self._add_comp_type = DropdownWidget(description="ComponentType")
         self._add_comp_name = TextWidget(description="Component name")
         self._add_comp_name.on_displayed(_resize_inputs)
@@ -992,6 +2399,7 @@ class CircuitBuilder(PopupWidget):
         self._add_comp_back.on_click(self.back)
 
         self.add_component_controls.children = [
+            self._add_comp_search,
             self._add_comp_type,
             self._add_comp_name,
             self._add_comp_add,
@@ -1062,12 +2470,19 @@ class CircuitBuilder(PopupWidget):
 
         # has to come at end!!
         self.domains = domains
-        self.components = components
+        if isinstance(components, (list, tuple)):
+            self.components = list(components)
+        else:
+            self.library = components
         self.circuit = circuit
 
         self.circuit.on_trait_change(self._handle_circuit_selection, "selected_element")
         self.circuit.on_trait_change(self._handle_circuit_name, "name")
 
+        from cirq.history import History
+
+        self.history = History(self.circuit, depth=history_depth)
+
         self.children = [
             self.basic_controls,
             self.add_component_controls,
@@ -1085,6 +2500,56 @@ class CircuitBuilder(PopupWidget):
         """
         self.circuit.zoom = (0., 0., 1.)
 
+    # noinspection PyDocstring
+    def undo(self, *_):
+        """
+        Undo the last modification of the circuit.
+        """
+        self.circuit.selected_element = None
+        self.history.undo()
+
+    # noinspection PyDocstring
+    def redo(self, *_):
+        """
+        Redo the last undone modification of the circuit.
+        """
+        self.circuit.selected_element = None
+        self.history.redo()
+
+    # noinspection PyDocstring
+    def copy_selection(self, *_):
+        """
+        Copy the selected component instances and the connections among them to the clipboard.
+        Shift-drag in the editor to select a region.
+        """
+        self.clipboard = self.circuit.copy_elements(self.circuit.selection)
+
+    # noinspection PyDocstring
+    def paste(self, *_):
+        """
+        Paste the component instances on the clipboard next to the originals and select the copies.
+        """
+        if self.clipboard is None:
+            return
+        self.circuit.selected_element = None
+        self.circuit.selection = self.circuit.paste_elements(self.clipboard)
+
+    # noinspection PyDocstring
+    def delete_selection(self, *_):
+        """
+        Delete all selected elements at once.
+        """
+        self.circuit.remove_elements(self.circuit.selection)
+
+    def move_selection(self, dx, dy):
+        """
+        Move the selected component instances by an offset.
+
+        :param dx: Offset along x
+        :param dy: Offset along y
+        """
+        self.circuit.move_elements(self.circuit.selection, dx, dy)
+
     # noinspection PyDocstring
     def back(self, *_):
         """
@@ -1144,14 +2609,7 @@ class CircuitBuilder(PopupWidget):
         if not isinstance(c, ComponentInstance) \
                 or not c in self.circuit.component_instances:
             return
-        self.circuit.component_instances = filter(lambda comp: comp is not c,
-                                                  self.circuit.component_instances)
-        # noinspection PyTypeChecker
-        for p in c.ports:
-            for cc in p.connections_in + p.connections_out:
-                cc.remove()
-
-        self.circuit.selected_element = None
+        self.circuit.remove_component(c)
 
     # noinspection PyDocstring,PyTypeChecker
     def delete_selected_port(self, *_):
@@ -1162,14 +2620,7 @@ class CircuitBuilder(PopupWidget):
         if not isinstance(p, Port) \
                 or not p in self.circuit.ports:
             return
-        self.circuit.ports = filter(lambda pp: pp is not p,
-                                    self.circuit.ports)
-
-        # noinspection PyUnresolvedReferences
-        for c in p.connections_in + p.connections_out:
-            c.remove()
-
-        self.circuit.selected_element = None
+        self.circuit.remove_port(p)
 
     # noinspection PyDocstring,PyTypeChecker
     def move_selected_port_up(self, *_):
@@ -1180,11 +2631,7 @@ class CircuitBuilder(PopupWidget):
         if not isinstance(p, Port) \
                 or not p in self.circuit.ports:
             return
-        ps = list(self.circuit.ports)
-        ii = ps.index(p)
-        ps.pop(ii)
-        ii = max(1, ii)
-        self.circuit.ports = ps[:ii - 1] + [p] + ps[ii - 1:]
+        self.circuit.move_port(p, self.circuit.ports.index(p) - 1)
 
     # noinspection PyDocstring,PyTypeChecker
     def move_selected_port_down(self, *_):
@@ -1195,15 +2642,27 @@ class CircuitBuilder(PopupWidget):
         if not isinstance(p, Port) \
                 or not p in self.circuit.ports:
             return
-        ps = list(self.circuit.ports)
-        ii = ps.index(p)
-        ps.pop(ii)
-        self.circuit.ports = ps[:ii + 1] + [p] + ps[ii + 1:]
+        self.circuit.move_port(p, self.circuit.ports.index(p) + 1)
 
     # noinspection PyUnusedLocal
     def _components_changed(self, name, old, new):
-        self._add_comp_type.values = {c.name: c.name for c in new}
         self._components_by_name = {c.name: c for c in new}
+        self._palette = ComponentIndex.from_components(new)
+        self._update_palette()
+
+    # noinspection PyUnusedLocal
+    def _library_changed(self, name, old, new):
+        # only the names from the library index are needed, the types are loaded when used
+        self._components_by_name = {}
+        self._palette = ComponentIndex.from_library(new)
+        self._update_palette()
+
+    def _update_palette(self):
+        # only send the best matches to the front end
+        names = self._palette.search(self._add_comp_search.value, self.palette_size)
+        self._add_comp_type.values = OrderedDict((n, n) for n in names)
+        if names:
+            self._add_comp_type.value_name = names[0]
 
     # noinspection PyUnusedLocal
     def _domains_changed(self, name, old, new):
@@ -1235,17 +2694,19 @@ class CircuitBuilder(PopupWidget):
             self._add_port_direction.visible = d.causal
 
     def _rename_circuit(self, *_):
-        if len(self._circuit_name.value):
-            self.circuit.name = self._circuit_name.value
+        if len(self._circuit_name.value) and self._circuit_name.value != self.circuit.name:
+            self.circuit.rename(self._circuit_name.value)
 
     # noinspection PyUnresolvedReferences
     def _add_component(self, *_):
-        ctype = self._components_by_name[self._add_comp_type.value_name]
+        ctype_name = self._add_comp_type.value_name
+        ctype = self._components_by_name.get(ctype_name)
+        if ctype is None and self.library is not None:
+            ctype = self.library[ctype_name]
         cname = self._add_comp_name.value
 
         if len(cname) and not cname in self.circuit.c:
-            new_comp = ctype.make_instance(cname)
-            self.circuit.component_instances = self.circuit.component_instances + [new_comp]
+            self.circuit.add_component(ctype.make_instance(cname))
 
     # noinspection PyUnresolvedReferences
     def _add_port(self, *_):
@@ -1255,8 +2716,7 @@ class CircuitBuilder(PopupWidget):
             direction = "inout"
         pname = self._add_port_name.value
         if len(pname) and not pname in self.circuit.p:
-            newp = Port(name=pname, domain=d, direction=direction)
-            self.circuit.ports = self.circuit.ports + [newp]
+            self.circuit.add_port(Port(name=pname, domain=d, direction=direction))
 
     def _rename_component(self, *_):
         c = self.circuit.selected_element
@@ -1264,16 +2724,199 @@ class CircuitBuilder(PopupWidget):
             return
         newname = self._mod_comp_name.value
         if len(newname) and not newname in self.circuit.c:
-            del self.circuit.c[c.name]
-            c.name = newname
-            self.circuit.c[c.name] = c
+            self.circuit.rename_component(c, newname)
 
     def _rename_port(self, *_):
         p = self.circuit.selected_element
-        if not isinstance(p, Port):
+        if not isinstance(p, Port) or not p.is_ext:
             return
         newname = self._mod_port_name.value
         if len(newname) and not newname in self.circuit.p:
-            del self.circuit.p[p.name]
-            p.name = newname
-            self.circuit.p[p.name] = p
+            self.circuit.rename_port(p, newname)
+
+
+class HandlerStats(object):
+    """
+    Call counts, cumulative wall-clock time and cumulative payload sizes
+    recorded per trait handler, front-end message type and widget sync.
+
+    Keys are strings such as `"Circuit._connections_changed"` for trait change handlers,
+    `"msg:Port:click"` for front-end messages dispatched by `Circuit.handle_element_msg`
+    and `"sync:Port"` for widget state sent to the front-end.
+    Payload sizes are list lengths for trait handlers and JSON-encoded bytes for messages.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.time = {}
+        self.payload = {}
+
+    def record(self, key, dt, size):
+        """
+        Record a single call.
+
+        :param key: Handler or message key
+        :param dt: Time spent in seconds
+        :param size: Payload size
+        """
+        self.calls[key] = self.calls.get(key, 0) + 1
+        self.time[key] = self.time.get(key, 0.) + dt
+        self.payload[key] = self.payload.get(key, 0) + size
+
+    def reset(self):
+        """
+        Discard all recorded data.
+        """
+        self.calls.clear()
+        self.time.clear()
+        self.payload.clear()
+
+    def summary(self):
+        """
+        Return a list of `(key, calls, time, payload)` tuples, sorted by decreasing cumulative time.
+        """
+        return sorted(((k, self.calls[k], self.time[k], self.payload[k]) for k in self.calls),
+                      key=lambda row: -row[2])
+
+    def __repr__(self):
+        lines = ["{:<45} {:>8} {:>12} {:>12}".format("handler", "calls", "time [s]", "payload")]
+        lines += ["{:<45} {:>8} {:>12.6f} {:>12}".format(*row) for row in self.summary()]
+        return "\n".join(lines)
+
+
+def _payload_size(obj):
+    try:
+        return len(json.dumps(obj))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _instrument_trait_handler(stats, key, f):
+    # the trait machinery inspects the signature, so keep (name, old, new)
+    def wrapper(self, name, old, new):
+        t0 = default_timer()
+        try:
+            return f(self, name, old, new)
+        finally:
+            stats.record(key, default_timer() - t0, len(new) if hasattr(new, "__len__") else 1)
+
+    return wrapper
+
+
+def _instrument_msg_handler(stats, kind, f):
+    def wrapper(self, *args, **kw):
+        m = args[-1]
+        key = "msg:{}:{}".format(kind, m["type"] if isinstance(m, dict) else m)
+        t0 = default_timer()
+        try:
+            return f(self, *args, **kw)
+        finally:
+            stats.record(key, default_timer() - t0, _payload_size(m))
+
+    return wrapper
+
+
+def _instrument_send(stats, f):
+    def wrapper(self, msg):
+        size = _payload_size(msg)
+        t0 = default_timer()
+        try:
+            return f(self, msg)
+        finally:
+            stats.record("sync:" + type(self).__name__, default_timer() - t0, size)
+
+    return wrapper
+
+
+_INSTRUMENTED_TRAIT_HANDLERS = [
+    (HasPorts, "_ports_changed"),
+    (Connection, "_source_changed"),
+    (Connection, "_target_changed"),
+    (Circuit, "_ports_changed"),
+    (Circuit, "_connections_changed"),
+    (Circuit, "_component_instances_changed"),
+]
+
+_INSTRUMENTED_MSG_HANDLERS = [
+    (Circuit, "port_msg", "Port"),
+    (Circuit, "component_msg", "ComponentInstance"),
+    (Circuit, "connection_msg", "Connection"),
+    (Circuit, "msg", "Circuit"),
+]
+
+_instrumentation = {}
+
+
+def enable_instrumentation(stats=None):
+    """
+    Start recording call counts, time and payload sizes of the trait change handlers,
+    front-end message handlers and widget syncs of all circuit elements.
+    The handlers are wrapped only while instrumentation is enabled, so there is no overhead otherwise.
+    Calls may be nested, recording continues until each of them has been matched by `disable_instrumentation`.
+
+    :param stats: HandlerStats object to record into, default `None` to create a new one,
+        or to continue with the current one if instrumentation is already enabled.
+    :return: The HandlerStats object being recorded into.
+    :raise ValueError: if instrumentation is already enabled with another HandlerStats object.
+    """
+    if _instrumentation:
+        if stats is not None and stats is not _instrumentation["stats"]:
+            raise ValueError("Instrumentation is already enabled with another HandlerStats object.")
+        _instrumentation["depth"] += 1
+        return _instrumentation["stats"]
+
+    stats = stats or HandlerStats()
+    originals = []
+    for cls, name in _INSTRUMENTED_TRAIT_HANDLERS:
+        f = cls.__dict__[name]
+        originals.append((cls, name, f))
+        setattr(cls, name, _instrument_trait_handler(stats, "{}.{}".format(cls.__name__, name), f))
+    for cls, name, kind in _INSTRUMENTED_MSG_HANDLERS:
+        f = cls.__dict__[name]
+        originals.append((cls, name, f))
+        setattr(cls, name, _instrument_msg_handler(stats, kind, f))
+    f = Widget.__dict__["_send"]
+    originals.append((Widget, "_send", f))
+    Widget._send = _instrument_send(stats, f)
+
+    _instrumentation.update(stats=stats, originals=originals, depth=1)
+    return stats
+
+
+def disable_instrumentation():
+    """
+    Undo a call of `enable_instrumentation`. When the outermost call is undone,
+    recording stops and the original handlers are restored.
+
+    :return: The HandlerStats object that was recorded into or `None` if instrumentation was not enabled.
+    """
+    if not _instrumentation:
+        return None
+    _instrumentation["depth"] -= 1
+    if _instrumentation["depth"]:
+        return _instrumentation["stats"]
+    for cls, name, f in _instrumentation["originals"]:
+        setattr(cls, name, f)
+    stats = _instrumentation["stats"]
+    _instrumentation.clear()
+    return stats
+
+
+@contextmanager
+def instrument(stats=None):
+    """
+    Context manager that records handler statistics for the enclosed block, e.g.::
+
+        with instrument() as stats:
+            circuit.connect(p1, p2)
+        print stats
+
+    Nested blocks record into the statistics of the outer block, which keeps recording after they exit.
+
+    :param stats: HandlerStats object to record into, default `None` to create a new one.
+    """
+    stats = enable_instrumentation(stats)
+    try:
+        yield stats
+    finally:
+        disable_instrumentation()
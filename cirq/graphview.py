@@ -0,0 +1,220 @@
+# coding=utf-8
+"""
+Live, read-only graph views of a circuit for use with NetworkX.
+
+`graph_view(circuit)` returns a frozen NetworkX multigraph whose node and adjacency dicts are
+replaced by mappings that read the circuit's own bookkeeping (the connection lists of the ports
+and the circuit's connectivity index) on every access. Nothing is copied, so graph algorithms
+always see the current state of the circuit, and the view never needs to be rebuilt after edits.
+
+Nodes are either ports (`level="ports"`) or component instances (`level="instances"`),
+edges are Connection objects, which serve as the multigraph edge keys. At the instance level,
+connections to the external ports of the circuit are not part of the graph.
+
+The mappings themselves (`CircuitGraph`) do not depend on NetworkX.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from collections import Mapping
+
+LEVELS = ("ports", "instances")
+
+
+class _Nodes(Mapping):
+    """
+    Mapping from the nodes of a CircuitGraph to their (generated) attribute dicts.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __iter__(self):
+        return self._graph.iter_nodes()
+
+    def __len__(self):
+        return self._graph.number_of_nodes()
+
+    def __contains__(self, node):
+        return self._graph.has_node(node)
+
+    def __getitem__(self, node):
+        if not self._graph.has_node(node):
+            raise KeyError(node)
+        return self._graph.node_data(node)
+
+
+class _Neighbors(Mapping):
+    """
+    Mapping from the neighbors of a node to dicts `{connection: {"connection": connection}}`
+    of the connections between the node and each neighbor.
+    """
+
+    def __init__(self, graph, node, outgoing, incoming):
+        self._graph = graph
+        self._node = node
+        self._outgoing = outgoing
+        self._incoming = incoming
+
+    def _ends(self):
+        return self._graph.iter_ends(self._node, self._outgoing, self._incoming)
+
+    def __iter__(self):
+        seen = set()
+        for other, _ in self._ends():
+            if other not in seen:
+                seen.add(other)
+                yield other
+
+    def __len__(self):
+        return len(set(other for other, _ in self._ends()))
+
+    def __contains__(self, other):
+        return any(o is other for o, _ in self._ends())
+
+    def __getitem__(self, other):
+        edges = {c: {"connection": c} for o, c in self._ends() if o is other}
+        if not edges:
+            raise KeyError(other)
+        return edges
+
+
+class _Adjacency(Mapping):
+    """
+    Mapping from each node of a CircuitGraph to the `_Neighbors` of that node.
+    """
+
+    def __init__(self, graph, outgoing=True, incoming=True):
+        self._graph = graph
+        self._outgoing = outgoing
+        self._incoming = incoming
+
+    def __iter__(self):
+        return self._graph.iter_nodes()
+
+    def __len__(self):
+        return self._graph.number_of_nodes()
+
+    def __contains__(self, node):
+        return self._graph.has_node(node)
+
+    def __getitem__(self, node):
+        if not self._graph.has_node(node):
+            raise KeyError(node)
+        return _Neighbors(self._graph, node, self._outgoing, self._incoming)
+
+
+class CircuitGraph(object):
+    """
+    Graph structure of a circuit, computed on demand from the circuit's current state.
+
+    :param circuit: Circuit object
+    :param level: `"ports"` for a graph of ports or `"instances"` for a graph of component instances
+    :param domain: Only include ports and connections of this Domain, default `None` for all.
+    """
+
+    def __init__(self, circuit, level="ports", domain=None):
+        if level not in LEVELS:
+            raise ValueError("level must be one of {}".format(LEVELS))
+        self.circuit = circuit
+        self.level = level
+        self.domain = domain
+        self.nodes = _Nodes(self)
+
+    def adjacency(self, outgoing=True, incoming=True):
+        """
+        Return a live mapping `{node: {neighbor: {connection: data}}}`.
+
+        :param outgoing: Include connections from a node to its neighbors
+        :param incoming: Include connections from the neighbors to a node
+        """
+        return _Adjacency(self, outgoing, incoming)
+
+    def _in_domain(self, p):
+        return self.domain is None or p.domain is self.domain
+
+    # noinspection PyProtectedMember
+    def iter_nodes(self):
+        circuit = self.circuit
+        if self.level == "instances":
+            return iter(circuit.component_instances)
+        ports = [p for p in circuit.ports if self._in_domain(p)]
+        return iter(ports + [p for ci in circuit.component_instances for p in ci.ports if self._in_domain(p)])
+
+    # noinspection PyProtectedMember
+    def number_of_nodes(self):
+        if self.level == "instances":
+            return len(self.circuit.component_instances)
+        if self.domain is None:
+            return len(self.circuit._connectivity.fan_in)
+        return sum(1 for _ in self.iter_nodes())
+
+    # noinspection PyProtectedMember
+    def has_node(self, node):
+        try:
+            if self.level == "instances":
+                return self.circuit.c.get(node.name) is node
+            return node in self.circuit._connectivity.fan_in and self._in_domain(node)
+        except (AttributeError, TypeError):
+            return False
+
+    # noinspection PyProtectedMember
+    def node_data(self, node):
+        if self.level == "instances":
+            return {"ctype": node.ctype.name}
+        return {"parent": node._parent, "domain": node.domain.name}
+
+    # noinspection PyProtectedMember
+    def iter_ends(self, node, outgoing=True, incoming=True):
+        """
+        Iterate over `(neighbor, connection)` pairs of a node.
+        """
+        instances = self.level == "instances"
+        circuit = self.circuit
+        for p in (node.ports if instances else [node]):
+            if not self._in_domain(p):
+                continue
+            ends = []
+            if outgoing:
+                ends.extend((c.target, c) for c in p.connections_out)
+            if incoming:
+                ends.extend((c.source, c) for c in p.connections_in)
+            for other, c in ends:
+                if instances:
+                    other = other._parent
+                    if other is circuit:
+                        continue
+                yield other, c
+
+
+def graph_view(circuit, level="ports", domain=None, directed=False):
+    """
+    Return a frozen NetworkX MultiGraph (or MultiDiGraph) that reads its nodes and edges
+    directly from the circuit. Requires NetworkX.
+
+    :param circuit: Circuit object
+    :param level: `"ports"` for a graph of ports or `"instances"` for a graph of component instances
+    :param domain: Only include ports and connections of this Domain, default `None` for all.
+    :param directed: Whether edges lead from the source to the target of each connection, default `False`.
+    """
+    import networkx as nx
+
+    graph = CircuitGraph(circuit, level, domain)
+    g = nx.MultiDiGraph() if directed else nx.MultiGraph()
+    g._node = graph.nodes
+    if directed:
+        g._adj = g._succ = graph.adjacency(outgoing=True, incoming=False)
+        g._pred = graph.adjacency(outgoing=False, incoming=True)
+    else:
+        g._adj = graph.adjacency()
+    g.graph["name"] = circuit.name
+    # results cached by NetworkX would go stale, as the circuit changes without notifying the graph
+    g.__networkx_cache__ = None
+    return nx.freeze(g)
@@ -0,0 +1,39 @@
+# coding=utf-8
+"""
+Support for using cirq outside of a notebook, e.g., from scripts, worker processes or servers.
+
+All circuit elements are IPython widgets, which need a running kernel with a comm manager
+to sync their state to. `ensure_kernel()` starts an in-process kernel if none is running,
+whose front-end messages are simply dropped.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+_kernel_manager = []
+
+
+def ensure_kernel():
+    """
+    Start an in-process IPython kernel unless an IPython shell is already running.
+
+    :return: The active InteractiveShell
+    """
+    from IPython import get_ipython
+
+    shell = get_ipython()
+    if shell is not None and hasattr(shell, "comm_manager"):
+        return shell
+
+    from IPython.kernel.inprocess.manager import InProcessKernelManager
+
+    km = InProcessKernelManager()
+    km.start_kernel()
+    _kernel_manager.append(km)
+    return km.kernel.shell
@@ -0,0 +1,242 @@
+# coding=utf-8
+"""
+Operation log and undo/redo history for circuits.
+
+Both classes listen to the changes a Circuit reports via `Circuit.on_operations`.
+Each change is a short list of operation tuples (see `Circuit.apply_operations`),
+so memory and the work for undoing or redoing a change scale with the size of the change,
+not with the size of the circuit.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from collections import deque
+
+# noinspection PyProtectedMember
+from cirq.core import Circuit, _width_suffix, _size_suffix, _state_suffix
+
+
+_SWAPPED = {
+    "connect": "disconnect",
+    "disconnect": "connect",
+    "add_component": "remove_component",
+    "remove_component": "add_component",
+    "add_port": "remove_port",
+    "remove_port": "add_port",
+}
+
+
+def invert_operation(operation):
+    """
+    Return the operation that undoes `operation`.
+
+    :param operation: Operation tuple, see `Circuit.apply_operations`
+    """
+    kind = operation[0]
+    if kind in _SWAPPED:
+        return (_SWAPPED[kind],) + tuple(operation[1:])
+    if kind in ("rename_component", "rename_port", "rename_circuit"):
+        return kind, operation[2], operation[1]
+    if kind == "move_port":
+        return kind, operation[1], operation[3], operation[2]
+    raise ValueError("Unknown operation {!r}".format(operation))
+
+
+def invert_change(operations):
+    """
+    Return the list of operations that undoes the list `operations`.
+
+    :param operations: list of operation tuples
+    """
+    return [invert_operation(op) for op in reversed(operations)]
+
+
+def snapshot_operations(circuit):
+    """
+    Return a list of operations that builds `circuit` when applied to an empty circuit of the same name.
+
+    :param circuit: Circuit object
+    """
+    # noinspection PyProtectedMember
+    return ([("add_port", p.name, p.domain.name, p.direction, k) + _width_suffix(p)
+             for k, p in enumerate(circuit.ports)]
+            + [("add_component", ci.name, ci.ctype.name, ci._x, ci._y) + _size_suffix(ci) + _state_suffix(ci)
+               for ci in circuit.component_instances]
+            + [("connect",) + circuit._port_ref(c.source) + circuit._port_ref(c.target)
+               for c in circuit.connections])
+
+
+def _collect_types(circuit, operations, ctypes, domains):
+    # remember the types and domains of added elements, so they can be re-created later;
+    # the elements themselves may have been renamed or removed within the same change
+    for op in operations:
+        if op[0] == "add_component":
+            ctype = circuit.known_component_type(op[2])
+            ctypes[ctype.name] = ctype
+            for p in ctype.ports:
+                domains[p.domain.name] = p.domain
+        elif op[0] == "add_port":
+            domains[op[2]] = circuit.known_domain(op[2])
+
+
+class OperationLog(object):
+    """
+    Record every change of a circuit as a list of operations.
+
+    The log starts with the operations that build the circuit's state at the time of attaching,
+    so `replay()` can reconstruct the current circuit from scratch. Replaying re-uses the
+    ComponentType and Domain objects seen by the log and applies consecutive additions in bulk,
+    which avoids re-creating the type library as `Circuit.from_jsonifiable` does.
+
+    Attributes
+    ----------
+
+    1. name: Name of the circuit when the log was attached
+    2. changes: list of changes, each a list of operation tuples
+    3. ctypes: dict of all ComponentTypes used by the logged operations
+    4. domains: dict of all Domains used by the logged operations
+    """
+
+    def __init__(self, circuit):
+        self.circuit = circuit
+        self.name = circuit.name
+        self.ctypes = {}
+        self.domains = {}
+        self.changes = []
+        self.record(circuit, snapshot_operations(circuit))
+        circuit.on_operations(self.record)
+
+    # noinspection PyUnusedLocal
+    def record(self, circuit, operations):
+        """
+        Append a change to the log. Registered as `on_operations` callback.
+
+        :param circuit: The changed circuit
+        :param operations: list of operation tuples
+        """
+        _collect_types(circuit, operations, self.ctypes, self.domains)
+        self.changes.append(list(operations))
+
+    def operations(self):
+        """
+        Iterate over all logged operations in order.
+        """
+        for change in self.changes:
+            for op in change:
+                yield op
+
+    def replay(self, name=None):
+        """
+        Reconstruct the circuit by applying all logged operations to a new empty circuit.
+
+        :param name: Name of the new circuit, default `None` for the name at the time of attaching.
+        :return: new Circuit object
+        """
+        ret = Circuit(name=name or self.name)
+        ret.apply_operations(self.operations(), self.ctypes, self.domains)
+        return ret
+
+    def detach(self):
+        """
+        Stop recording changes.
+        """
+        self.circuit.on_operations(self.record, remove=True)
+
+
+class History(object):
+    """
+    Undo/redo history of a circuit.
+
+    Each change reported by the circuit is stored as one undo step. Undoing applies the inverse
+    operations of the step, redoing re-applies the step. Making a new change clears the redo stack.
+    At most `depth` steps are kept, older ones are dropped.
+    """
+
+    def __init__(self, circuit, depth=100):
+        self.circuit = circuit
+        self.ctypes = {}
+        self.domains = {}
+        self._undo = deque(maxlen=depth)
+        self._redo = deque(maxlen=depth)
+        self._applying = False
+        _collect_types(circuit, snapshot_operations(circuit), self.ctypes, self.domains)
+        circuit.on_operations(self.record)
+
+    @property
+    def depth(self):
+        """Maximum number of undo steps."""
+        return self._undo.maxlen
+
+    def can_undo(self):
+        """True if there is a change to undo."""
+        return len(self._undo) > 0
+
+    def can_redo(self):
+        """True if there is an undone change to redo."""
+        return len(self._redo) > 0
+
+    def record(self, circuit, operations):
+        """
+        Store a change as an undo step. Registered as `on_operations` callback.
+
+        :param circuit: The changed circuit
+        :param operations: list of operation tuples
+        """
+        if self._applying:
+            return
+        _collect_types(circuit, operations, self.ctypes, self.domains)
+        self._undo.append(list(operations))
+        self._redo.clear()
+
+    def _apply(self, operations):
+        self._applying = True
+        try:
+            self.circuit.apply_operations(operations, self.ctypes, self.domains)
+        finally:
+            self._applying = False
+
+    def undo(self):
+        """
+        Undo the last change.
+
+        :return: True if a change was undone
+        """
+        if not self._undo:
+            return False
+        change = self._undo.pop()
+        self._apply(invert_change(change))
+        self._redo.append(change)
+        return True
+
+    def redo(self):
+        """
+        Redo the last undone change.
+
+        :return: True if a change was redone
+        """
+        if not self._redo:
+            return False
+        change = self._redo.pop()
+        self._apply(change)
+        self._undo.append(change)
+        return True
+
+    def clear(self):
+        """
+        Drop all undo and redo steps.
+        """
+        self._undo.clear()
+        self._redo.clear()
+
+    def detach(self):
+        """
+        Stop recording changes.
+        """
+        self.circuit.on_operations(self.record, remove=True)
@@ -0,0 +1,188 @@
+# coding=utf-8
+"""
+Autosaving of circuits with an append-only journal.
+
+Instead of rewriting the full JSON document after every edit, a `Journal` appends each change
+reported by `Circuit.on_operations` as one line to `<path>.journal` and only periodically
+compacts the journal into a full snapshot at `<path>` (in the format of `Circuit.save_json`).
+After a crash, `recover(path)` loads the last snapshot and re-applies the journal tail.
+
+Journal lines are JSON objects of one of the following forms:
+
+    1. `{"generation": n}`: header, the journal continues the snapshot of generation `n`
+    2. `{"domains": {name: {"causal": ..., "one2one": ...}}}`: domains not contained in the snapshot
+    3. `{"component_types": {name: {"ports": [...]}}}`: component types not contained in the snapshot
+    4. `{"operations": [...]}`: one change, see `Circuit.apply_operations`
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import json
+import os
+
+from cirq.core import Circuit, ComponentType, Domain, port_info, make_port
+
+
+def _write_atomically(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as outfile:
+        outfile.write(data)
+        outfile.flush()
+        os.fsync(outfile.fileno())
+    if os.name == "nt" and os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp_path, path)
+
+
+class Journal(object):
+    """
+    Autosave a circuit as a snapshot file plus an append-only journal of changes.
+
+    Each change costs a single appended line, independent of the circuit size.
+    After `compact_every` changes the journal is folded into a new snapshot.
+    The snapshot carries a generation number that is repeated in the journal header,
+    such that a journal left over from a crash during compaction is recognized as stale.
+    """
+
+    def __init__(self, circuit, path, compact_every=1000, sync=False):
+        """
+        Start autosaving `circuit`. A snapshot is written immediately.
+
+        :param circuit: Circuit object
+        :param path: Path of the snapshot file, the journal is stored at `path + ".journal"`.
+        :param compact_every: Number of changes after which the journal is compacted.
+        :param sync: Whether to `fsync` the journal after every change, default `False`.
+        """
+        self.circuit = circuit
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+        self.sync = sync
+        self.generation = 0
+        self.n_changes = 0
+        self._journal = None
+        self._known_domains = set()
+        self._known_types = set()
+        self.compact()
+        circuit.on_operations(self.record)
+
+    def compact(self):
+        """
+        Write a full snapshot of the circuit and start a new, empty journal.
+        """
+        self.generation += 1
+        snapshot = self.circuit.to_jsonifiable()
+        snapshot["journal_generation"] = self.generation
+        _write_atomically(self.path, json.dumps(snapshot))
+
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "w")
+        self._known_domains = set(snapshot["domains"])
+        self._known_types = set(snapshot["component_types"])
+        self.n_changes = 0
+        self._append({"generation": self.generation})
+
+    def _append(self, entry):
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        if self.sync:
+            os.fsync(self._journal.fileno())
+
+    def _declare_types(self, circuit, operations):
+        ctypes = {}
+        for op in operations:
+            if op[0] == "add_component" and op[2] not in self._known_types:
+                ctypes[op[2]] = circuit.known_component_type(op[2])
+            elif op[0] == "add_port":
+                self._declare_domains([circuit.known_domain(op[2])])
+        for ct in ctypes.values():
+            self._declare_domains([p.domain for p in ct.ports])
+        if ctypes:
+            self._append({"component_types": {name: {"ports": map(port_info, ct.ports)}
+                                              for name, ct in ctypes.items()}})
+            self._known_types.update(ctypes)
+
+    def _declare_domains(self, domains):
+        new = {d.name: d for d in domains if d.name not in self._known_domains}
+        if new:
+            self._append({"domains": {name: {"causal": d.causal, "one2one": d.one2one} for name, d in new.items()}})
+            self._known_domains.update(new)
+
+    def record(self, circuit, operations):
+        """
+        Append a change to the journal. Registered as `on_operations` callback.
+
+        :param circuit: The changed circuit
+        :param operations: list of operation tuples
+        """
+        self._declare_types(circuit, operations)
+        self._append({"operations": operations})
+        self.n_changes += 1
+        if self.n_changes >= self.compact_every:
+            self.compact()
+
+    def close(self):
+        """
+        Write a final snapshot and stop autosaving.
+        """
+        self.circuit.on_operations(self.record, remove=True)
+        self.compact()
+        self._journal.close()
+
+
+def _read_journal(journal_path):
+    entries = []
+    if not os.path.exists(journal_path):
+        return entries
+    with open(journal_path, "r") as infile:
+        for line in infile:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # torn write of the last line
+                break
+    return entries
+
+
+def recover(path):
+    """
+    Restore an autosaved circuit from its last snapshot and the changes recorded in its journal.
+
+    :param path: Path of the snapshot file as passed to `Journal`
+    :return: Circuit object
+    """
+    with open(path, "r") as infile:
+        snapshot = json.load(infile)
+    circuit = Circuit.from_jsonifiable(snapshot)
+
+    entries = _read_journal(path + ".journal")
+    if not entries or entries[0].get("generation") != snapshot.get("journal_generation"):
+        return circuit
+
+    ctypes = {}
+    domains = {}
+    for ci in circuit.component_instances:
+        ctypes[ci.ctype.name] = ci.ctype
+        for p in ci.ports:
+            domains[p.domain.name] = p.domain
+    for p in circuit.ports:
+        domains[p.domain.name] = p.domain
+
+    for entry in entries[1:]:
+        if "domains" in entry:
+            for name, info in entry["domains"].items():
+                domains.setdefault(name, Domain(name=name, causal=info["causal"], one2one=info["one2one"]))
+        if "component_types" in entry:
+            for name, info in entry["component_types"].items():
+                ctypes[name] = ComponentType(name=name, ports=[make_port(pi, domains) for pi in info["ports"]])
+        if "operations" in entry:
+            circuit.apply_operations(map(tuple, entry["operations"]), ctypes, domains)
+    return circuit
@@ -0,0 +1,89 @@
+# coding=utf-8
+"""
+Queries on the JSON representation of circuits (see `Circuit.to_jsonifiable`) that do not create widgets.
+
+Creating a `Circuit` requires IPython's widget machinery and a kernel, which dominates the startup time of
+short-lived worker processes. Workers that only need connectivity information can use these functions on
+the parsed JSON directly, without importing IPython at all.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import json
+
+
+def load(json_path):
+    """
+    Load the JSON representation of a circuit as nested dicts and lists.
+
+    :param json_path: JSON file as written by `Circuit.save_json`
+    """
+    with open(json_path, "r") as jsonfile:
+        return json.load(jsonfile)
+
+
+def ports(obj, domain=None):
+    """
+    Return references `(parent, port)` to all ports of a circuit, external ports (with parent `None`) first,
+    followed by the ports of the component instances sorted by instance name.
+
+    :param obj: Circuit in the `Circuit.to_jsonifiable` format
+    :param domain: Only return ports of the domain with this name, default `None` for all ports.
+    """
+    ret = [(None, p["name"]) for p in obj.get("ports", []) if domain is None or p["domain"] == domain]
+    ctypes = obj.get("component_types", {})
+    for name, ctype_name in sorted(obj.get("component_instances", {}).items()):
+        ret.extend((name, p["name"]) for p in ctypes[ctype_name]["ports"]
+                   if domain is None or p["domain"] == domain)
+    return ret
+
+
+def _ref(obj, parent, port):
+    return (None if parent == obj["name"] else parent), port
+
+
+def get_nets(obj, domain):
+    """
+    Compute the nets of a non-causal domain, like `Circuit.get_nets`, but on the JSON representation.
+
+    :param obj: Circuit in the `Circuit.to_jsonifiable` format
+    :param domain: Domain name
+    :return: list of nets, each a list of `(parent, port)` references in the order of `ports(obj, domain)`
+    """
+    all_ports = ports(obj, domain)
+    order = {p: k for k, p in enumerate(all_ports)}
+    parent = {p: p for p in all_ports}
+
+    def _find(p):
+        while parent[p] != p:
+            parent[p] = parent[parent[p]]
+            p = parent[p]
+        return p
+
+    for sn, spn, tn, tpn in obj.get("connections", []):
+        s, t = _ref(obj, sn, spn), _ref(obj, tn, tpn)
+        if s not in parent or t not in parent:
+            continue
+        rs, rt = _find(s), _find(t)
+        if rs != rt:
+            if order[rs] < order[rt]:
+                parent[rt] = rs
+            else:
+                parent[rs] = rt
+
+    members = {}
+    for p in all_ports:
+        members.setdefault(_find(p), []).append(p)
+    # like Circuit.get_nets, only ports that take part in a connection form nets
+    connected = set()
+    for sn, spn, tn, tpn in obj.get("connections", []):
+        connected.add(_ref(obj, sn, spn))
+        connected.add(_ref(obj, tn, tpn))
+    return sorted((net for net in members.values() if connected.intersection(net)), key=lambda net: order[net[0]])
@@ -0,0 +1,201 @@
+# coding=utf-8
+"""
+Component library files holding collections of Domains and ComponentTypes.
+
+A library file consists of a single-line JSON header followed by one JSON line per ComponentType.
+The header contains all domains and an index mapping each ComponentType name to the byte range
+of its definition and a short summary (port count and parameters). Opening a library only reads
+the header, individual component types are parsed and created on first access.
+
+Write a library with `save_library` and open it with `ComponentLibrary`::
+
+    save_library("optics.cirqlib", [bs_type, phase_type])
+    lib = ComponentLibrary("optics.cirqlib")
+    lib.names()                 # no ComponentType created yet
+    bs = lib["Beamsplitter"]    # loaded now
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import json
+
+from cirq.core import ComponentType, Domain, port_info, make_port
+
+LIBRARY_FORMAT = "cirq-library"
+LIBRARY_VERSION = 1
+
+_DOMAIN_OPTIONS = ["_color", "_color_selected", "_color_target"]
+_CTYPE_OPTIONS = ["_inner_svg", "_x_label", "_y_label", "_inner_color", "_inner_color_selected",
+                  "_label_color", "_r"]
+
+
+def _fixed_layout(positions):
+    def _layout_ports(_, ports):
+        for p, (x, y, phi) in zip(ports, positions):
+            p._x, p._y, p._phi = x, y, phi
+    return _layout_ports
+
+
+def _ctype_entry(ctype):
+    entry = {
+        "name": ctype.name,
+        "ports": map(port_info, ctype.ports),
+        "params": list(ctype.params),
+    }
+    for option in _CTYPE_OPTIONS:
+        entry[option] = getattr(ctype, option)
+    if ctype._layout_ports:
+        # custom layout functions cannot be stored, but the port positions they produce can
+        entry["layout"] = [(p._x, p._y, p._phi) for p in ctype.ports]
+    return entry
+
+
+def save_library(path, ctypes):
+    """
+    Write a component library file.
+
+    :param path: File path
+    :param ctypes: Sequence of ComponentTypes with unique names. Their domains are stored as well.
+    """
+    domains = {}
+    for ct in ctypes:
+        for p in ct.ports:
+            domains[p.domain.name] = p.domain
+
+    index = {}
+    lines = []
+    offset = 0
+    for ct in ctypes:
+        if ct.name in index:
+            raise ValueError("Duplicate ComponentType name {}".format(ct.name))
+        line = json.dumps(_ctype_entry(ct)) + "\n"
+        index[ct.name] = {
+            "offset": offset,
+            "length": len(line),
+            "n_ports": len(ct.ports),
+            "params": list(ct.params),
+        }
+        lines.append(line)
+        offset += len(line)
+
+    header = {
+        "format": LIBRARY_FORMAT,
+        "version": LIBRARY_VERSION,
+        "domains": {name: dict({"causal": d.causal, "one2one": d.one2one},
+                               **{option: getattr(d, option) for option in _DOMAIN_OPTIONS})
+                    for name, d in domains.items()},
+        "index": index,
+    }
+    with open(path, "wb") as outfile:
+        outfile.write(json.dumps(header) + "\n")
+        outfile.writelines(lines)
+
+
+class ComponentLibrary(object):
+    """
+    Read-only view of a component library file that creates ComponentTypes on first access.
+
+    Attributes
+    ----------
+
+    1. path: Library file path
+    2. domains: dict of all Domains of the library by name
+    3. index: dict mapping ComponentType names to dicts with keys `n_ports` and `params`
+    """
+
+    def __init__(self, path, registry=None):
+        """
+        Open a library by reading its header.
+
+        :param path: File path
+        :param registry: Optional object providing methods `register_domain(domain)` and
+            `register_component_type(ctype)` that return shared objects, such as a `cirq.workspace.Workspace`.
+        """
+        self.path = path
+        self.registry = registry
+        with open(path, "rb") as infile:
+            header = json.loads(infile.readline())
+            self._body_start = infile.tell()
+        if header.get("format") != LIBRARY_FORMAT:
+            raise ValueError("{} is not a component library".format(path))
+        if header.get("version", 0) > LIBRARY_VERSION:
+            raise ValueError("Unsupported component library version {}".format(header["version"]))
+
+        self.index = header["index"]
+        self.domains = {}
+        for name, info in header["domains"].items():
+            d = Domain(name=name, causal=info["causal"], one2one=info["one2one"],
+                       **{str(o): info[o] for o in _DOMAIN_OPTIONS if o in info})
+            self.domains[name] = registry.register_domain(d) if registry is not None else d
+        self._loaded = {}
+
+    def names(self):
+        """
+        Return the sorted ComponentType names without loading any of them.
+        """
+        return sorted(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def is_loaded(self, name):
+        """True if the ComponentType `name` has already been created."""
+        return name in self._loaded
+
+    def __getitem__(self, name):
+        ctype = self._loaded.get(name)
+        if ctype is None:
+            entry = self.index[name]
+            with open(self.path, "rb") as infile:
+                infile.seek(self._body_start + entry["offset"])
+                ctype = self._make_ctype(json.loads(infile.read(entry["length"])))
+            self._loaded[name] = ctype
+        return ctype
+
+    def get(self, name, default=None):
+        """
+        Return the ComponentType `name`, loading it if necessary, or `default` if it is not in the library.
+        """
+        if name in self.index:
+            return self[name]
+        return default
+
+    def load_all(self):
+        """
+        Load all ComponentTypes, reading the file only once.
+
+        :return: list of all ComponentTypes, sorted by name
+        """
+        if len(self._loaded) < len(self.index):
+            with open(self.path, "rb") as infile:
+                infile.seek(self._body_start)
+                for line in infile:
+                    entry = json.loads(line)
+                    if entry["name"] not in self._loaded:
+                        self._loaded[entry["name"]] = self._make_ctype(entry)
+        return [self._loaded[n] for n in self.names()]
+
+    def _make_ctype(self, entry):
+        ports = [make_port(pi, self.domains) for pi in entry["ports"]]
+        options = {str(o): entry[o] for o in _CTYPE_OPTIONS if o in entry}
+        if "layout" in entry:
+            options["_layout_ports"] = _fixed_layout(entry["layout"])
+        # set the layout and radius before the ports, such that the ports are placed accordingly
+        ctype = ComponentType(name=entry["name"], params=entry.get("params", []), **options)
+        ctype.ports = ports
+        if self.registry is not None:
+            ctype = self.registry.register_component_type(ctype)
+        return ctype
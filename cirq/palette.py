@@ -0,0 +1,139 @@
+# coding=utf-8
+"""
+Search index over component type names and parameters for the CircuitBuilder palette.
+
+Large component libraries contain thousands of types, far too many to send to the front end
+as a single dropdown. `ComponentIndex` finds the best matches of a search string via a sorted
+list of terms for prefix queries and a trigram index for fuzzy substring queries, so only the
+top matches need to be displayed.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+
+def trigrams(term):
+    """
+    Return the set of all three character substrings of `term`.
+
+    :param term: lower case string
+    """
+    return {term[k:k + 3] for k in range(len(term) - 2)}
+
+
+class ComponentIndex(object):
+    """
+    Index of component type names and their parameter names.
+
+    Matches are ranked as follows:
+
+        1. exact name matches
+        2. names starting with the query
+        3. parameters starting with the query
+        4. names or parameters sharing at least half of the query's trigrams, by the fraction shared
+
+    Ties are broken alphabetically.
+    """
+
+    def __init__(self, entries=()):
+        """
+        :param entries: iterable of `(name, params)` tuples
+        """
+        self.names = []
+        self._terms = []
+        self._sorted_terms = []
+        self._trigrams = defaultdict(set)
+        for name, params in entries:
+            self._add(name, params)
+        self._sorted_terms.sort()
+        self.names.sort()
+
+    @classmethod
+    def from_components(cls, ctypes):
+        """
+        Index a sequence of ComponentTypes.
+        """
+        return cls((ct.name, ct.params) for ct in ctypes)
+
+    @classmethod
+    def from_library(cls, library):
+        """
+        Index a `cirq.library.ComponentLibrary` using only its index header, without loading any type.
+        """
+        return cls((name, info.get("params", [])) for name, info in library.index.items())
+
+    def _add(self, name, params):
+        for k, term in enumerate([name] + list(params)):
+            term_id = len(self._terms)
+            term = term.lower()
+            self._terms.append((name, k == 0))
+            self._sorted_terms.append((term, term_id))
+            for t in trigrams(term):
+                self._trigrams[t].add(term_id)
+        self.names.append(name)
+
+    def add(self, name, params=()):
+        """
+        Add a single component type to the index.
+
+        :param name: ComponentType name
+        :param params: Parameter names
+        """
+        n_terms = len(self._terms)
+        self._add(name, params)
+        self.names.pop()
+        insort(self.names, name)
+        new_terms = self._sorted_terms[n_terms:]
+        del self._sorted_terms[n_terms:]
+        for term in new_terms:
+            insort(self._sorted_terms, term)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query, limit=20):
+        """
+        Return the names of the best matching component types.
+
+        :param query: Search string, matched case-insensitively. An empty query matches all names.
+        :param limit: Maximum number of results
+        :return: list of at most `limit` names, best match first
+        """
+        query = query.strip().lower()
+        if not query:
+            return self.names[:limit]
+
+        scores = {}
+
+        def _score(name, score):
+            if score > scores.get(name, 0.):
+                scores[name] = score
+
+        k = bisect_left(self._sorted_terms, (query,))
+        while k < len(self._sorted_terms) and self._sorted_terms[k][0].startswith(query):
+            term, term_id = self._sorted_terms[k]
+            name, is_name = self._terms[term_id]
+            _score(name, (4. if term == query else 3.) if is_name else 2.)
+            k += 1
+
+        query_trigrams = trigrams(query)
+        if query_trigrams:
+            counts = defaultdict(int)
+            for t in query_trigrams:
+                for term_id in self._trigrams.get(t, ()):
+                    counts[term_id] += 1
+            for term_id, count in counts.items():
+                fraction = float(count) / len(query_trigrams)
+                if fraction >= .5:
+                    _score(self._terms[term_id][0], fraction)
+
+        return sorted(scores, key=lambda n: (-scores[n], n))[:limit]
@@ -0,0 +1,211 @@
+# coding=utf-8
+"""
+Columnar parameter storage and vectorized parameter sweeps.
+
+A `ParameterStore` holds the numeric parameter assignments of all component instances of a circuit
+as one array per (ComponentType, parameter) pair. It does not reference any widgets and can thus
+be pickled and shipped to worker processes.
+
+The `sweep` function evaluates a backend callback over a grid of parameter values,
+compiling the circuit only once and updating only the affected array entries between grid points.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from itertools import product
+from multiprocessing import Pool
+
+import numpy as np
+
+
+class ParameterStore(object):
+    """
+    Store the parameters of all component instances of a circuit in columnar form.
+
+    Attributes
+    ----------
+
+    1. rows: dict mapping each ComponentType name to the ordered list of its instance names
+    2. index: dict mapping each instance name to a tuple `(ctype_name, row)`
+    3. columns: dict mapping each ComponentType name to a dict `{param: numpy array}`
+
+    Parameters that have not been assigned for an instance are stored as `nan`.
+    """
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.index = {name: (ct, row) for ct, names in rows.items() for row, name in enumerate(names)}
+
+    @classmethod
+    def from_circuit(cls, circuit, dtype=float):
+        """
+        Collect the parameter assignments of all component instances of `circuit`.
+        The parameters of a type are those declared in `ComponentType.params`
+        plus any further names appearing in the instances' `param_assignments`.
+
+        :param circuit: Circuit object
+        :param dtype: numpy dtype of the parameter columns, default `float`.
+        :return: ParameterStore object
+        """
+        instances = {}
+        for ci in circuit.component_instances:
+            instances.setdefault(ci.ctype.name, []).append(ci)
+
+        rows = {}
+        columns = {}
+        for ct, cis in instances.items():
+            params = list(cis[0].ctype.params)
+            for ci in cis:
+                params.extend(sorted(k for k in ci.param_assignments if k not in params))
+            rows[ct] = [ci.name for ci in cis]
+            columns[ct] = {param: np.array([ci.param_assignments.get(param, np.nan) for ci in cis], dtype=dtype)
+                           for param in params}
+        return cls(rows, columns)
+
+    def column(self, ctype_name, param):
+        """
+        Return the array of values of `param` for all instances of a ComponentType.
+
+        :param ctype_name: Name of the ComponentType
+        :param param: Parameter name
+        """
+        return self.columns[ctype_name][param]
+
+    def get(self, instance_name, param):
+        """
+        Return the value of `param` for a single component instance.
+
+        :param instance_name: Name of the component instance
+        :param param: Parameter name
+        """
+        ct, row = self.index[instance_name]
+        return self.columns[ct][param][row]
+
+    def assign(self, key, value):
+        """
+        Assign a parameter value. The `key` is a tuple `(name, param)`, where `name` is resolved
+        first as a component instance name and then as a ComponentType name.
+        In the latter case `value` may be a scalar or an array with one entry per instance.
+
+        :param key: tuple `(name, param)`
+        :param value: parameter value(s)
+        """
+        name, param = key
+        if name in self.index:
+            ct, row = self.index[name]
+            self.columns[ct][param][row] = value
+        elif name in self.columns:
+            self.columns[name][param][:] = value
+        else:
+            raise KeyError(name)
+
+    def update(self, assignments):
+        """
+        Assign multiple parameter values. See `assign`.
+
+        :param assignments: dict mapping `(name, param)` keys to values
+        """
+        for key, value in assignments.items():
+            self.assign(key, value)
+
+    def assignments(self, instance_name):
+        """
+        Return a `param_assignments`-style dict for a single component instance.
+        Unassigned (`nan`) parameters are omitted.
+
+        :param instance_name: Name of the component instance
+        """
+        ct, row = self.index[instance_name]
+        ret = {}
+        for param, col in self.columns[ct].items():
+            v = col[row]
+            if not np.isnan(v):
+                ret[param] = v.item()
+        return ret
+
+    def write_back(self, circuit):
+        """
+        Copy the stored values into the `param_assignments` of the component instances of `circuit`,
+        e.g., to display them in the editor.
+
+        :param circuit: The Circuit the store was created from
+        """
+        for ci in circuit.component_instances:
+            if ci.name in self.index:
+                ci.param_assignments = self.assignments(ci.name)
+
+    def copy(self):
+        """
+        Return a deep copy of the store.
+        """
+        return ParameterStore({ct: list(names) for ct, names in self.rows.items()},
+                              {ct: {param: col.copy() for param, col in cols.items()}
+                               for ct, cols in self.columns.items()})
+
+
+_worker_state = {}
+
+
+def _init_worker(evaluate, compiled, store):
+    _worker_state["evaluate"] = evaluate
+    _worker_state["compiled"] = compiled
+    _worker_state["store"] = store
+
+
+def _evaluate_point(point):
+    store = _worker_state["store"]
+    store.update(point)
+    return _worker_state["evaluate"](_worker_state["compiled"], store)
+
+
+def sweep(circuit, compile_model, evaluate, axes, processes=None):
+    """
+    Evaluate a backend callback over the full grid spanned by several parameter axes.
+
+    The circuit is converted exactly once via `compile_model(circuit)`.
+    For each grid point, only the swept entries of a single ParameterStore are updated
+    before calling `evaluate(compiled, store)`.
+
+    When `processes` is given, the grid points are distributed over a process pool.
+    Each worker receives the compiled model and the store only once,
+    so `compile_model`'s result, `evaluate` and the parameter values must be picklable.
+
+    :param circuit: Circuit object
+    :param compile_model: Function converting the circuit into a backend model.
+    :param evaluate: Function `evaluate(compiled, store)` returning the result for the current parameters.
+    :param axes: Sequence of `(key, values)` tuples, where `key` is a `(name, param)` tuple, see
+        `ParameterStore.assign`. The last axis varies fastest.
+    :param processes: Number of worker processes, default `None` for serial evaluation.
+    :return: list of `(point, result)` tuples where `point` is a dict mapping keys to values.
+    """
+    compiled = compile_model(circuit)
+    store = ParameterStore.from_circuit(circuit)
+
+    keys = [key for key, _ in axes]
+    points = [dict(zip(keys, values)) for values in product(*[values for _, values in axes])]
+
+    if processes is None:
+        results = []
+        last = {}
+        for point in points:
+            # product() reuses the value objects of unchanged axes
+            store.update({k: v for k, v in point.items() if k not in last or last[k] is not v})
+            last = point
+            results.append(evaluate(compiled, store))
+    else:
+        pool = Pool(processes, initializer=_init_worker, initargs=(evaluate, compiled, store))
+        try:
+            results = pool.map(_evaluate_point, points)
+        finally:
+            pool.close()
+            pool.join()
+
+    return zip(points, results)
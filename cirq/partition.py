@@ -0,0 +1,328 @@
+# coding=utf-8
+"""
+Partitioning of large circuits into balanced, loosely coupled subcircuits for parallel simulation.
+
+The component instances are split by recursive bisection. Each bisection is multilevel:
+the instance graph (weighted by the number of connections between instances) is coarsened
+by heavy-edge matching, the coarsest graph is split by growing a region from a peripheral node,
+and the split is projected back level by level while being refined by Kernighan-Lin/Fiduccia-Mattheyses
+style boundary moves that reduce the number of cut connections without violating the balance.
+
+Every cut connection is replaced by a pair of external ports with the same name in the two
+subcircuits it connects, so results computed per partition can be stitched by port name.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import random
+from collections import deque
+from multiprocessing import Pool
+
+_COARSEST_SIZE = 16
+_REFINEMENT_PASSES = 8
+
+
+class _Graph(object):
+    """
+    Undirected graph with node and edge weights given as `adjacency[u][v] = weight`.
+    """
+
+    def __init__(self, node_weights, adjacency):
+        self.node_weights = node_weights
+        self.adjacency = adjacency
+
+    def __len__(self):
+        return len(self.node_weights)
+
+    def subgraph(self, nodes):
+        nodes = set(nodes)
+        return _Graph({u: self.node_weights[u] for u in nodes},
+                      {u: {v: w for v, w in self.adjacency[u].items() if v in nodes} for u in nodes})
+
+    def coarsen(self, rng):
+        # heavy-edge matching: merge every node with its unmatched neighbor of largest edge weight
+        nodes = list(self.node_weights)
+        rng.shuffle(nodes)
+        parent = {}
+        for u in nodes:
+            if u in parent:
+                continue
+            best, best_w = None, 0
+            for v, w in self.adjacency[u].items():
+                if v not in parent and v != u and w > best_w:
+                    best, best_w = v, w
+            parent[u] = u
+            if best is not None:
+                parent[best] = u
+
+        node_weights = {}
+        adjacency = {}
+        for u, pu in parent.items():
+            node_weights[pu] = node_weights.get(pu, 0) + self.node_weights[u]
+            neighbors = adjacency.setdefault(pu, {})
+            for v, w in self.adjacency[u].items():
+                pv = parent[v]
+                if pv != pu:
+                    neighbors[pv] = neighbors.get(pv, 0) + w
+        return _Graph(node_weights, adjacency), parent
+
+
+def _farthest(graph, start):
+    last = start
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        last = queue.popleft()
+        for v in sorted(graph.adjacency[last]):
+            if v not in seen:
+                seen.add(v)
+                queue.append(v)
+    return last
+
+
+def _grow_bisection(graph, target):
+    # grow part 0 breadth-first from a peripheral node, continuing in other components if necessary
+    nodes = sorted(graph.node_weights)
+    side = {u: 1 for u in nodes}
+    start = _farthest(graph, nodes[0])
+    seen = {start}
+    queue = deque([start])
+    weight = 0
+    while weight < target:
+        if not queue:
+            rest = [u for u in nodes if u not in seen]
+            if not rest:
+                break
+            seen.add(rest[0])
+            queue.append(rest[0])
+        u = queue.popleft()
+        if weight > 0 and weight + graph.node_weights[u] > target:
+            continue
+        side[u] = 0
+        weight += graph.node_weights[u]
+        for v in sorted(graph.adjacency[u]):
+            if v not in seen:
+                seen.add(v)
+                queue.append(v)
+    return side
+
+
+def _refine(graph, side, target, tolerance):
+    # greedy boundary moves with positive gain (or zero gain improving the balance)
+    weights = [0, 0]
+    for u, s in side.items():
+        weights[s] += graph.node_weights[u]
+    bounds = (target - tolerance, target + tolerance)
+
+    for _ in range(_REFINEMENT_PASSES):
+        moved = False
+        for u in sorted(side, key=lambda n: -graph.node_weights[n]):
+            s = side[u]
+            external = internal = 0
+            for v, w in graph.adjacency[u].items():
+                if side[v] == s:
+                    internal += w
+                else:
+                    external += w
+            gain = external - internal
+            if gain < 0 or external == 0:
+                continue
+            nw = graph.node_weights[u]
+            new_w0 = weights[0] - nw if s == 0 else weights[0] + nw
+            if not bounds[0] <= new_w0 <= bounds[1]:
+                continue
+            if gain == 0 and abs(new_w0 - target) >= abs(weights[0] - target):
+                continue
+            side[u] = 1 - s
+            weights[s] -= nw
+            weights[1 - s] += nw
+            moved = True
+        if not moved:
+            break
+    return side
+
+
+def _bisect(graph, fraction, rng):
+    total = sum(graph.node_weights.values())
+    target = int(round(total * fraction))
+    tolerance = max(1, int(.03 * total))
+
+    levels = []
+    g = graph
+    while len(g) > _COARSEST_SIZE:
+        coarse, parent = g.coarsen(rng)
+        if len(coarse) > .9 * len(g):
+            break
+        levels.append((g, parent))
+        g = coarse
+
+    side = _refine(g, _grow_bisection(g, target), target, tolerance)
+    for fine, parent in reversed(levels):
+        side = _refine(fine, {u: side[parent[u]] for u in fine.node_weights}, target, tolerance)
+    return side
+
+
+def partition_nodes(graph, k, rng):
+    """
+    Split the nodes of `graph` into `k` balanced parts by recursive multilevel bisection.
+
+    :return: list of `k` lists of nodes
+    """
+    if k <= 1 or len(graph) <= 1:
+        return [sorted(graph.node_weights)] + [[] for _ in range(k - 1)]
+    k0 = k // 2
+    side = _bisect(graph, float(k0) / k, rng)
+    parts = []
+    for s, kk in ((0, k0), (1, k - k0)):
+        nodes = [u for u, su in side.items() if su == s]
+        parts.extend(partition_nodes(graph.subgraph(nodes), kk, rng))
+    return parts
+
+
+def instance_graph(circuit):
+    """
+    Return the graph of component instance indices, weighted by the number of connections between them.
+    Connections to external ports of the circuit are ignored.
+    """
+    index = {ci: k for k, ci in enumerate(circuit.component_instances)}
+    adjacency = {k: {} for k in index.values()}
+    for c in circuit.connections:
+        u, v = index.get(c.source._parent), index.get(c.target._parent)
+        if u is None or v is None or u == v:
+            continue
+        adjacency[u][v] = adjacency[u].get(v, 0) + 1
+        adjacency[v][u] = adjacency[v].get(u, 0) + 1
+    return _Graph({k: 1 for k in index.values()}, adjacency)
+
+
+def cut_port_name(connection):
+    """
+    Name of the pair of external ports that replaces a cut connection.
+
+    :param connection: Connection object
+    """
+    s, t = connection.source, connection.target
+    # noinspection PyProtectedMember
+    return "{}_{}__{}_{}".format(s._parent.name, s.name, t._parent.name, t.name)
+
+
+# noinspection PyProtectedMember
+def partition(circuit, k, seed=0):
+    """
+    Split a circuit into `k` subcircuits with balanced numbers of component instances
+    and few connections between them. See `Circuit.partition`.
+    """
+    from cirq.core import Circuit, Port, InstanceArray, component_state, restore_component_state
+
+    instances = circuit.component_instances
+    parts = partition_nodes(instance_graph(circuit), k, random.Random(seed))
+    part_of = {}
+    for kk, nodes in enumerate(parts):
+        for u in nodes:
+            part_of[instances[u]] = kk
+
+    copies = {}
+    subcircuits = []
+    for kk, nodes in enumerate(parts):
+        members = []
+        for u in sorted(nodes):
+            ci = instances[u]
+            if isinstance(ci, InstanceArray):
+                new = ci.ctype.make_array(ci.name, ci.size)
+            else:
+                new = ci.ctype.make_instance(ci.name)
+            restore_component_state(new, component_state(ci))
+            copies[ci] = new
+            members.append((new, ci._x, ci._y))
+        sub = Circuit(name="{}_part{}".format(circuit.name, kk + 1), component_instances=[m for m, _, _ in members])
+        for new, x, y in members:
+            new._x, new._y = x, y
+        subcircuits.append(sub)
+
+    def _copy(p):
+        return copies[p._parent].p[p.name]
+
+    ext_ports = [[] for _ in parts]
+    ext_by_name = [{} for _ in parts]
+    connections = [[] for _ in parts]
+
+    def _ext_port(kk, name, like, direction):
+        # an external port of the subcircuit standing in for the port `like`, with its domain and width
+        p = ext_by_name[kk].get(name)
+        if p is None:
+            p = ext_by_name[kk][name] = Port(name=name, domain=like.domain, direction=direction, width=like.width)
+            ext_ports[kk].append(p)
+        return p
+
+    for c in circuit.connections:
+        s, t = c.source, c.target
+        s_ext, t_ext = s._parent is circuit, t._parent is circuit
+        if s_ext and t_ext:
+            continue
+        if s_ext:
+            kk = part_of[t._parent]
+            connections[kk].append((_ext_port(kk, s.name, s, s.direction), _copy(t)))
+        elif t_ext:
+            kk = part_of[s._parent]
+            connections[kk].append((_copy(s), _ext_port(kk, t.name, t, t.direction)))
+        elif part_of[s._parent] == part_of[t._parent]:
+            connections[part_of[s._parent]].append((_copy(s), _copy(t)))
+        else:
+            name = cut_port_name(c)
+            ks, kt = part_of[s._parent], part_of[t._parent]
+            causal = s.domain.causal
+            connections[ks].append((_copy(s), _ext_port(ks, name, s, "out" if causal else "inout")))
+            connections[kt].append((_ext_port(kt, name, t, "in" if causal else "inout"), _copy(t)))
+
+    for sub, ports, conns in zip(subcircuits, ext_ports, connections):
+        # the connections are copies of valid ones, only the synthesized ports could disagree
+        for s, t in conns:
+            if s.width != t.width:
+                raise ValueError("Cannot connect {!r} of width {} to {!r} of width {}.".format(s, s.width, t, t.width))
+        with sub.changes():
+            for p in ports:
+                sub.add_port(p)
+            for s, t in conns:
+                sub.connect(s, t, verify=False)
+    return subcircuits
+
+
+def simulate_partitions(partitions, compile_model, evaluate, processes=None):
+    """
+    Simulate subcircuits independently and collect their results by port name.
+
+    Each subcircuit is converted via `compile_model(circuit)` in the calling process
+    (circuits are widgets and cannot be sent to other processes), then `evaluate(compiled)`
+    is called for all compiled models, in a process pool if `processes` is given.
+    In that case, `evaluate` and the compiled models must be picklable.
+
+    :param partitions: list of subcircuits, see `Circuit.partition`
+    :param compile_model: Function converting a circuit into a backend model
+    :param evaluate: Function `evaluate(compiled)` returning a dict of results by external port name
+    :param processes: Number of worker processes, default `None` for serial evaluation.
+    :return: dict mapping each external port name to a list of `(partition_index, value)` tuples.
+        Ports synthesized for cut connections appear in two partitions.
+    """
+    compiled = [compile_model(p) for p in partitions]
+    if processes is None:
+        results = map(evaluate, compiled)
+    else:
+        pool = Pool(processes)
+        try:
+            results = pool.map(evaluate, compiled)
+        finally:
+            pool.close()
+            pool.join()
+
+    stitched = {}
+    for kk, result in enumerate(results):
+        for name, value in result.items():
+            stitched.setdefault(name, []).append((kk, value))
+    return stitched
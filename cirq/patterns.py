@@ -0,0 +1,288 @@
+# coding=utf-8
+"""
+Subcircuit pattern matching and rewriting.
+
+A pattern is itself a small `Circuit`. Its component instances are matched to component instances
+of the same ComponentType (by name) in a host circuit, such that the connections among the matched
+instances are exactly the connections among the pattern instances. The external ports of the pattern
+mark the boundary of a match: a port of a pattern instance that is connected to an external pattern
+port may have arbitrary further connections in the host, while all other ports must not be connected
+to anything outside of the match.
+
+Matches are searched with a VF2-style backtracking algorithm. Pattern instances are matched in an order
+that starts with the rarest ComponentType and then follows the pattern's connections, such that the
+candidates for most instances are just the neighbors of already matched instances. Candidates are
+pruned by type and by the port degrees maintained by the circuit's connectivity index.
+
+`rewrite` replaces all (non-overlapping) matches by single instances of a replacement ComponentType,
+e.g., a compiled block, in one batched change.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from cirq.core import ComponentType, clone_ports
+
+
+class _PatternNode(object):
+    """
+    Precomputed matching constraints of one pattern component instance.
+    """
+
+    def __init__(self, ci):
+        self.name = ci.name
+        self.ctype_name = ci.ctype.name
+        self.port_names = [p.name for p in ci.ports]
+        # (direction, other instance name, other port name) for each connection to another pattern instance,
+        # with direction "out" or "in" for causal domains and "net" otherwise
+        self.edges = {pn: set() for pn in self.port_names}
+        self.boundary = set()
+
+
+# noinspection PyProtectedMember
+def _compile_pattern(pattern):
+    nodes = {ci.name: _PatternNode(ci) for ci in pattern.component_instances}
+    for c in pattern.connections:
+        s, t = c.source, c.target
+        s_ext, t_ext = s._parent is pattern, t._parent is pattern
+        if s_ext and t_ext:
+            continue
+        if s_ext:
+            nodes[t._parent.name].boundary.add(t.name)
+        elif t_ext:
+            nodes[s._parent.name].boundary.add(s.name)
+        elif s.domain.causal:
+            nodes[s._parent.name].edges[s.name].add(("out", t._parent.name, t.name))
+            nodes[t._parent.name].edges[t.name].add(("in", s._parent.name, s.name))
+        else:
+            # the orientation of non-causal connections is arbitrary
+            nodes[s._parent.name].edges[s.name].add(("net", t._parent.name, t.name))
+            nodes[t._parent.name].edges[t.name].add(("net", s._parent.name, s.name))
+    return nodes
+
+
+def _matching_order(nodes, type_counts):
+    # start with the rarest type, then prefer nodes with many connections to the already ordered ones
+    order = []
+    remaining = dict(nodes)
+    while remaining:
+        placed = {n.name for n in order}
+
+        def _key(node):
+            links = sum(1 for edges in node.edges.values() for _, other, _ in edges if other in placed)
+            return -links, type_counts.get(node.ctype_name, 0), node.name
+
+        node = min(remaining.values(), key=_key)
+        order.append(node)
+        del remaining[node.name]
+    return order
+
+
+class _Matcher(object):
+
+    def __init__(self, host, pattern, excluded):
+        self.host = host
+        self.nodes = _compile_pattern(pattern)
+        self.by_type = {}
+        for ci in host.component_instances:
+            self.by_type.setdefault(ci.ctype.name, []).append(ci)
+        self.order = _matching_order(self.nodes, {k: len(v) for k, v in self.by_type.items()})
+        self.excluded = excluded
+        self.mapping = {}
+        self.reverse = {}
+
+    def _candidates(self, node):
+        for pn, edges in node.edges.items():
+            for direction, other, other_pn in edges:
+                h_other = self.mapping.get(other)
+                if h_other is None:
+                    continue
+                hp = h_other.p[other_pn]
+                # follow the host connection that corresponds to the pattern connection
+                if direction == "out":
+                    return [c.source._parent for c in hp.connections_in if c.source.name == pn]
+                if direction == "in":
+                    return [c.target._parent for c in hp.connections_out if c.target.name == pn]
+                return ([c.source._parent for c in hp.connections_in if c.source.name == pn] +
+                        [c.target._parent for c in hp.connections_out if c.target.name == pn])
+        return self.by_type.get(node.ctype_name, [])
+
+    def _feasible(self, node, h):
+        # candidates reached via connections may also be the host circuit itself
+        if getattr(h, "ctype", None) is None or h.ctype.name != node.ctype_name:
+            return False
+        if h in self.reverse or h in self.excluded:
+            return False
+        host = self.host
+        for pn in node.port_names:
+            hp = h.p[pn]
+            edges = node.edges[pn]
+            degree = host.degree(hp)
+            if degree < len(edges) or (pn not in node.boundary and degree != len(edges)):
+                return False
+            causal = hp.domain.causal
+            # every host connection among matched instances must be a pattern connection
+            for direction, connections, attr in (("out" if causal else "net", hp.connections_out, "target"),
+                                                 ("in" if causal else "net", hp.connections_in, "source")):
+                for c in connections:
+                    other_port = getattr(c, attr)
+                    other = other_port._parent
+                    other_name = node.name if other is h else self.reverse.get(other)
+                    if other_name is not None and (direction, other_name, other_port.name) not in edges:
+                        return False
+            # every pattern connection to matched instances must exist in the host
+            for direction, other, other_pn in edges:
+                h_other = h if other == node.name else self.mapping.get(other)
+                if h_other is None:
+                    continue
+                ohp = h_other.p[other_pn]
+                outgoing = direction != "in" and any(c.target is ohp for c in hp.connections_out)
+                incoming = direction != "out" and any(c.source is ohp for c in hp.connections_in)
+                if not (outgoing or incoming):
+                    return False
+        return True
+
+    def matches(self, k=0):
+        if k == len(self.order):
+            yield dict(self.mapping)
+            return
+        node = self.order[k]
+        for h in self._candidates(node):
+            if not self._feasible(node, h):
+                continue
+            self.mapping[node.name] = h
+            self.reverse[h] = node.name
+            for m in self.matches(k + 1):
+                yield m
+                if h in self.excluded:
+                    break
+            # the deeper levels may have been abandoned by the break, so clean up after them as well
+            for deeper in self.order[k:]:
+                self.reverse.pop(self.mapping.pop(deeper.name, None), None)
+
+
+def iter_matches(host, pattern, excluded=None):
+    """
+    Iterate over all matches of `pattern` in `host`, including matches that overlap or differ only
+    by a symmetry of the pattern.
+
+    :param host: Circuit to search in
+    :param pattern: Circuit defining the pattern
+    :param excluded: Optional set of host instances that may not be part of a match.
+        The set may be extended while iterating, which prunes the remaining search.
+    :return: iterator over dicts mapping pattern instance names to host ComponentInstances
+    """
+    return _Matcher(host, pattern, excluded if excluded is not None else set()).matches()
+
+
+def find_matches(host, pattern, overlapping=False, limit=None):
+    """
+    Find matches of `pattern` in `host`.
+
+    :param host: Circuit to search in
+    :param pattern: Circuit defining the pattern
+    :param overlapping: Whether matches may share host instances, default `False`.
+    :param limit: Maximum number of matches, default `None` for all.
+    :return: list of dicts mapping pattern instance names to host ComponentInstances
+    """
+    if not pattern.component_instances:
+        return []
+    ret = []
+    excluded = set()
+    for m in iter_matches(host, pattern, excluded):
+        if not overlapping:
+            excluded.update(m.values())
+        ret.append(m)
+        if limit is not None and len(ret) >= limit:
+            break
+    return ret
+
+
+def _unique_name(taken, base, k):
+    name = "{}{}".format(base, k)
+    while name in taken:
+        k += 1
+        name = "{}{}".format(base, k)
+    return name, k + 1
+
+
+# noinspection PyProtectedMember
+def rewrite(host, pattern, replacement=None, matches=None, base_name=None):
+    """
+    Replace non-overlapping matches of `pattern` in `host` by instances of a replacement ComponentType.
+    The connections at the boundary of each match are moved to the replacement's port with the name
+    of the corresponding external pattern port. All replacements are made in a single change that updates
+    each of the host's lists once, see `Circuit.remove_elements` and `Circuit.add_elements`.
+
+    :param host: Circuit to modify
+    :param pattern: Circuit defining the pattern
+    :param replacement: ComponentType whose ports are named like the external ports of `pattern`,
+        default `None` to create one from the pattern's name and ports.
+    :param matches: Matches to replace, default `None` to replace all results of `find_matches`.
+    :param base_name: Prefix for the names of the new instances, default `None` for the lower case type name.
+    :return: list of the new ComponentInstances
+    """
+    if replacement is None:
+        replacement = ComponentType(name=pattern.name, ports=clone_ports(pattern.ports))
+    if matches is None:
+        matches = find_matches(host, pattern)
+    base_name = base_name or replacement.name.lower()
+
+    # which ports of which pattern instances are attached to each external pattern port
+    boundary = {}
+    for c in pattern.connections:
+        s, t = c.source, c.target
+        if s._parent is pattern and t._parent is not pattern:
+            boundary.setdefault(s.name, []).append((t._parent.name, t.name))
+        elif t._parent is pattern and s._parent is not pattern:
+            boundary.setdefault(t.name, []).append((s._parent.name, s.name))
+
+    matched_instances = set(ci for m in matches for ci in m.values())
+    taken = set(host.c) - set(ci.name for ci in matched_instances)
+    # the new ports replacing each host port at the boundary of a match
+    port_map = {}
+    replacements = []
+    k = 1
+    for m in matches:
+        matched = set(m.values())
+        external = []
+        for ext_name, refs in boundary.items():
+            for ci_name, pn in refs:
+                hp = m[ci_name].p[pn]
+                for c in hp.connections_out:
+                    if c.target._parent not in matched:
+                        external.append((ext_name, c.target, True))
+                for c in hp.connections_in:
+                    if c.source._parent not in matched:
+                        external.append((ext_name, c.source, False))
+
+        x = sum(ci._x for ci in matched) / len(matched)
+        y = sum(ci._y for ci in matched) / len(matched)
+        name, k = _unique_name(taken, base_name, k)
+        taken.add(name)
+        new = replacement.make_instance(name)
+        for ext_name, refs in boundary.items():
+            for ci_name, pn in refs:
+                port_map.setdefault(m[ci_name].p[pn], []).append(new.p[ext_name])
+        replacements.append((new, x, y, external))
+
+    connections = []
+    for new, _, _, external in replacements:
+        for ext_name, other, outgoing in external:
+            if other._parent not in matched_instances:
+                connections.append((new.p[ext_name], other) if outgoing else (other, new.p[ext_name]))
+            elif outgoing:
+                # a connection between two matches is added once, from its source
+                connections.extend((new.p[ext_name], p) for p in port_map.get(other, []))
+
+    new_instances = [new for new, _, _, _ in replacements]
+    with host.changes():
+        host.remove_elements(matched_instances)
+        host.add_elements([(new, x, y) for new, x, y, _ in replacements], connections)
+    return new_instances
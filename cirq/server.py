@@ -0,0 +1,413 @@
+# coding=utf-8
+"""
+Headless HTTP/JSON service for querying and editing circuits without a notebook.
+
+Circuits are stored as JSON files (in the format of `Circuit.save_json`) in a directory.
+Parsed circuits are kept in memory in a least-recently-used cache, so repeated queries
+do not parse the JSON again. Start the server from the command line::
+
+    python -m cirq.server --directory circuits/ --port 8642
+
+Endpoints (all request and response bodies are JSON):
+
+    GET    /circuits                          list of circuit names
+    GET    /circuits/<name>                   circuit in the `Circuit.to_jsonifiable` format
+    PUT    /circuits/<name>                   create or replace a circuit, its "name" must be <name> if given
+    DELETE /circuits/<name>                   delete a circuit
+    GET    /circuits/<name>/nets?domain=<d>   nets of a domain as lists of `[parent, port]` references
+    GET    /circuits/<name>/validate          `{"problems": [...]}`, pass `?allow_unconnected=0` to be strict
+    GET    /circuits/<name>/export            the JSON document as file download
+    POST   /circuits/<name>/connect           body `{"source": [parent, port], "target": [parent, port]}`
+    POST   /circuits/<name>/disconnect        body as for `connect`
+    POST   /circuits/<name>/operations        body `{"operations": [...]}`, see `Circuit.apply_operations`
+
+Port references use `null` as parent for the external ports of the circuit.
+
+Requests are served by one thread each, while all work on circuits is serialized by a single lock.
+This gives the same guarantees as a single-threaded event loop: each request sees and leaves
+a consistent state, and slow clients do not block others.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import argparse
+import json
+import os
+import re
+import sys
+import traceback
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from collections import OrderedDict
+from SocketServer import ThreadingMixIn
+from threading import RLock
+from urlparse import urlparse, parse_qs
+
+_NAME = re.compile(r"^[\w\-. ]+$")
+
+
+class CircuitStore(object):
+    """
+    Directory of circuit JSON files with an LRU cache of parsed circuits.
+
+    Modifications made through the store are written back to the file immediately.
+    """
+
+    def __init__(self, directory, maxsize=16):
+        """
+        :param directory: Directory holding `<name>.json` files, created if necessary.
+        :param maxsize: Maximum number of parsed circuits kept in memory.
+        """
+        self.directory = directory
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, name):
+        """
+        Return the file path of the circuit `name`.
+        """
+        if not _NAME.match(name):
+            raise ValueError("Invalid circuit name {!r}".format(name))
+        return os.path.join(self.directory, name + ".json")
+
+    def names(self):
+        """
+        Return the sorted names of all stored circuits.
+        """
+        return sorted(f[:-5] for f in os.listdir(self.directory) if f.endswith(".json"))
+
+    def __contains__(self, name):
+        return name in self._cache or os.path.exists(self.path(name))
+
+    def _remember(self, name, circuit):
+        self._cache[name] = circuit
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def get(self, name):
+        """
+        Return the parsed circuit `name`.
+
+        :raise KeyError: if there is no such circuit.
+        """
+        from cirq.core import Circuit
+
+        circuit = self._cache.pop(name, None)
+        if circuit is None:
+            path = self.path(name)
+            if not os.path.exists(path):
+                raise KeyError(name)
+            self.misses += 1
+            circuit = Circuit.load_json(path)
+        else:
+            self.hits += 1
+        self._remember(name, circuit)
+        return circuit
+
+    def put(self, name, obj):
+        """
+        Store a circuit given in the `Circuit.to_jsonifiable` format under `name`.
+
+        :return: The parsed circuit
+        """
+        from cirq.core import Circuit
+
+        circuit = Circuit.from_jsonifiable(obj)
+        self._remember(name, circuit)
+        self.save(name)
+        return circuit
+
+    def save(self, name):
+        """
+        Write the cached circuit `name` back to its file.
+        """
+        path = self.path(name)
+        tmp_path = path + ".tmp"
+        self._cache[name].save_json(tmp_path)
+        if os.name == "nt" and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
+
+    def delete(self, name):
+        """
+        Delete the circuit `name`.
+
+        :raise KeyError: if there is no such circuit.
+        """
+        if name not in self:
+            raise KeyError(name)
+        self._cache.pop(name, None)
+        path = self.path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class HTTPError(Exception):
+    """
+    Error that is reported to the client with the given HTTP status code.
+    """
+
+    def __init__(self, status, message):
+        super(HTTPError, self).__init__(message)
+        self.status = status
+
+
+def _find_domain(circuit, name):
+    for p in circuit.ports:
+        if p.domain.name == name:
+            return p.domain
+    for ci in circuit.component_instances:
+        for p in ci.ports:
+            if p.domain.name == name:
+                return p.domain
+    raise HTTPError(404, "Unknown domain {}".format(name))
+
+
+# noinspection PyProtectedMember
+def _resolve(circuit, ref):
+    try:
+        return circuit._resolve_port(*ref)
+    except (KeyError, TypeError, ValueError):
+        raise HTTPError(400, "Unknown port {!r}".format(ref))
+
+
+class CircuitService(object):
+    """
+    Request dispatcher of the server, independent of the HTTP transport.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = RLock()
+
+    def _circuit(self, name):
+        try:
+            return self.store.get(name)
+        except KeyError:
+            raise HTTPError(404, "Unknown circuit {}".format(name))
+
+    def handle(self, method, path, query, body):
+        """
+        Handle a request.
+
+        :param method: HTTP method
+        :param path: URL path, e.g. `"/circuits/MZ/nets"`
+        :param query: dict of query parameters
+        :param body: Decoded JSON body or `None`
+        :return: tuple `(status, response)` where `response` is jsonifiable
+        """
+        parts = [p for p in path.split("/") if p]
+        if not parts or parts[0] != "circuits" or len(parts) > 3:
+            raise HTTPError(404, "Not found")
+
+        with self.lock:
+            if len(parts) == 1:
+                if method == "GET":
+                    return 200, self.store.names()
+                raise HTTPError(405, "Method not allowed")
+
+            name = parts[1]
+            try:
+                self.store.path(name)
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            action = parts[2] if len(parts) == 3 else None
+            handler = getattr(self, "_{}_{}".format(method.lower(), action or "circuit"), None)
+            if handler is None:
+                raise HTTPError(405, "Method not allowed")
+            return handler(name, query, body)
+
+    # noinspection PyUnusedLocal
+    def _get_circuit(self, name, query, body):
+        return 200, self._circuit(name).to_jsonifiable()
+
+    # noinspection PyUnusedLocal
+    def _put_circuit(self, name, query, body):
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Expected a circuit object")
+        if body.get("name", name) != name:
+            raise HTTPError(400, "Circuit name {!r} does not match the URL".format(body["name"]))
+        body = dict(body, name=name)
+        created = name not in self.store
+        try:
+            self.store.put(name, body)
+        except (KeyError, ValueError, TypeError) as e:
+            raise HTTPError(400, "Invalid circuit: {!r}".format(e))
+        return (201 if created else 200), {"name": name}
+
+    # noinspection PyUnusedLocal
+    def _delete_circuit(self, name, query, body):
+        try:
+            self.store.delete(name)
+        except KeyError:
+            raise HTTPError(404, "Unknown circuit {}".format(name))
+        return 200, {"name": name}
+
+    # noinspection PyUnusedLocal,PyProtectedMember
+    def _get_nets(self, name, query, body):
+        circuit = self._circuit(name)
+        if "domain" not in query:
+            raise HTTPError(400, "Missing domain parameter")
+        domain = _find_domain(circuit, query["domain"])
+        return 200, [[circuit._port_ref(p) for p in net] for net in circuit.get_nets(domain)]
+
+    # noinspection PyUnusedLocal
+    def _get_validate(self, name, query, body):
+        allow_unconnected = query.get("allow_unconnected", "1") not in ("0", "false")
+        return 200, {"problems": self._circuit(name).validate(allow_unconnected)}
+
+    # noinspection PyUnusedLocal
+    def _get_export(self, name, query, body):
+        return 200, self._circuit(name).to_jsonifiable()
+
+    def _connection_ports(self, circuit, body):
+        if not isinstance(body, dict) or "source" not in body or "target" not in body:
+            raise HTTPError(400, "Expected source and target port references")
+        return _resolve(circuit, body["source"]), _resolve(circuit, body["target"])
+
+    # noinspection PyUnusedLocal
+    def _post_connect(self, name, query, body):
+        circuit = self._circuit(name)
+        s, t = self._connection_ports(circuit, body)
+        if circuit.connect(s, t) is None:
+            raise HTTPError(409, "Invalid connection")
+        self.store.save(name)
+        return 200, {"connections": len(circuit.connections)}
+
+    # noinspection PyUnusedLocal
+    def _post_disconnect(self, name, query, body):
+        circuit = self._circuit(name)
+        s, t = self._connection_ports(circuit, body)
+        for c in s.connections_out + s.connections_in:
+            if t in (c.source, c.target):
+                c.remove()
+                self.store.save(name)
+                return 200, {"connections": len(circuit.connections)}
+        raise HTTPError(404, "No such connection")
+
+    # noinspection PyUnusedLocal
+    def _post_operations(self, name, query, body):
+        circuit = self._circuit(name)
+        if not isinstance(body, dict) or not isinstance(body.get("operations"), list):
+            raise HTTPError(400, "Expected a list of operations")
+        try:
+            circuit.apply_operations([tuple(op) for op in body["operations"]])
+        except (KeyError, ValueError, TypeError, IndexError) as e:
+            # the operations before the failing one have been applied, keep the file consistent
+            self.store.save(name)
+            raise HTTPError(400, "Invalid operation: {!r}".format(e))
+        self.store.save(name)
+        return 200, {"connections": len(circuit.connections), "component_instances": len(circuit.c)}
+
+
+class CircuitRequestHandler(BaseHTTPRequestHandler):
+    """
+    Translates HTTP requests to calls of the server's `CircuitService`.
+    """
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        headers = {}
+        try:
+            body = None
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError:
+                    raise HTTPError(400, "Invalid JSON")
+            status, response = self.server.service.handle(method, url.path, query, body)
+            if url.path.endswith("/export"):
+                headers["Content-Disposition"] = "attachment; filename={}.json".format(url.path.split("/")[-2])
+        except HTTPError as e:
+            status, response = e.status, {"error": str(e)}
+        except Exception as e:
+            # report unexpected failures to the client instead of dropping the connection
+            sys.stderr.write(traceback.format_exc())
+            status, response = 500, {"error": "Internal server error: {!r}".format(e)}
+
+        data = json.dumps(response)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, fmt, *args)
+
+
+class CircuitServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server for a `CircuitStore`.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, store, verbose=False):
+        """
+        :param address: tuple `(host, port)`, use port 0 to pick a free port.
+        :param store: CircuitStore object
+        :param verbose: Whether to log every request to stderr.
+        """
+        from cirq.headless import ensure_kernel
+
+        ensure_kernel()
+        HTTPServer.__init__(self, address, CircuitRequestHandler)
+        self.service = CircuitService(store)
+        self.verbose = verbose
+
+
+def main(argv=None):
+    """
+    Command line entry point. See the module docstring.
+
+    :param argv: Command line arguments, default `None` for `sys.argv[1:]`.
+    """
+    parser = argparse.ArgumentParser(description="Serve circuits via an HTTP/JSON API.")
+    parser.add_argument("--directory", default=".", help="Directory of circuit JSON files.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8642)
+    parser.add_argument("--cache-size", type=int, default=16, help="Number of parsed circuits kept in memory.")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = CircuitServer((args.host, args.port), CircuitStore(args.directory, args.cache_size), args.verbose)
+    sys.stderr.write("Serving circuits from {} at http://{}:{}/circuits\n".format(
+        os.path.abspath(args.directory), *server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+# coding=utf-8
+"""
+Simplification passes that shrink a circuit before it is handed to an expensive modeling backend.
+
+Each pass modifies a circuit in place and returns a mapping from the names of the component instances
+it removed to the names of the instances that replace them (or `None` if they were dropped entirely).
+`simplify` runs a sequence of passes as a single change and composes their mappings, such that the
+result maps names of the original circuit to names of the simplified circuit.
+
+All passes first collect the instances and connections to remove and to add, visiting each component
+instance and connection a bounded number of times, and then update each list of the circuit once
+(see `Circuit.remove_elements` and `Circuit.add_elements`), i.e., they run in time linear in the size
+of the connection graph. Work on a copy to keep the original circuit::
+
+    simple = Circuit.from_jsonifiable(circuit.to_jsonifiable())
+    mapping = simplify(simple, [RemoveIdentities(["Wire"]), CollapseSeriesChains()])
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+from cirq.core import ComponentType, Port
+
+
+def _two_port_ends(ci):
+    # return (input, output) ports of a component with one input and one output in a causal domain
+    if len(ci.ports) != 2:
+        return None
+    a, b = ci.ports
+    if a.domain is not b.domain or not a.domain.causal or a.direction == b.direction:
+        return None
+    return (a, b) if a.direction == "in" else (b, a)
+
+
+def _unique_name(taken, base):
+    name = base
+    k = 1
+    while name in taken:
+        k += 1
+        name = "{}_{}".format(base, k)
+    return name
+
+
+class SimplificationPass(object):
+    """
+    Base class of simplification passes. Subclasses implement `__call__(circuit)`,
+    modifying the circuit in place and returning a dict that maps the names of removed component
+    instances to the names of their replacements or to `None`.
+    """
+
+    def __call__(self, circuit):
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return "{}()".format(self.__class__.__name__)
+
+
+class RemoveIdentities(SimplificationPass):
+    """
+    Remove pass-through components and connect their neighbors directly.
+
+    In a causal domain, an identity component has one input and one output port and all sources
+    feeding its input are connected to all targets of its output. In an acausal domain, an identity
+    component has two ports that are merged into a single net.
+    """
+
+    def __init__(self, identity_types=(), is_identity=None):
+        """
+        :param identity_types: Names of ComponentTypes whose instances are identities
+        :param is_identity: Optional predicate `is_identity(ci)` for further identity instances
+        """
+        self.identity_types = set(identity_types)
+        self.is_identity = is_identity
+
+    def _matches(self, ci):
+        if ci.ctype.name in self.identity_types:
+            return True
+        return self.is_identity is not None and self.is_identity(ci)
+
+    # noinspection PyProtectedMember
+    def __call__(self, circuit):
+        causal = {}
+        acausal = []
+        for ci in circuit.component_instances:
+            if len(ci.ports) != 2 or not self._matches(ci):
+                continue
+            a, b = ci.ports
+            if a.domain is not b.domain:
+                continue
+            if a.domain.causal:
+                ends = _two_port_ends(ci)
+                if ends is not None:
+                    causal[ci] = ends
+            else:
+                acausal.append(ci)
+
+        # targets reached from the output of a causal identity, looking through chains of identities
+        resolved = {}
+
+        def _targets(ci, visiting):
+            if ci in resolved:
+                return resolved[ci]
+            ret = []
+            visiting.add(ci)
+            for c in causal[ci][1].connections_out:
+                nxt = c.target._parent
+                if nxt in causal and c.target is causal[nxt][0]:
+                    if nxt not in visiting:
+                        ret.extend(_targets(nxt, visiting))
+                elif nxt not in causal:
+                    ret.append(c.target)
+            visiting.discard(ci)
+            resolved[ci] = ret
+            return ret
+
+        pairs = []
+        for ci, (p_in, p_out) in causal.items():
+            # each path through identities is connected once, at its first identity
+            sources = [c.source for c in p_in.connections_in if c.source._parent not in causal]
+            if sources:
+                targets = _targets(ci, set())
+                pairs.extend((s, t) for s in sources for t in targets)
+
+        # the ports of acausal identities merge all nets they touch
+        removed = set(acausal)
+        parent = {}
+
+        def _find(p):
+            while parent.get(p, p) is not p:
+                p = parent[p]
+            return p
+
+        others = []
+        for ci in acausal:
+            a, b = ci.ports
+            ra, rb = _find(a), _find(b)
+            if ra is not rb:
+                parent[rb] = ra
+            for p in ci.ports:
+                for c in p.connections_in + p.connections_out:
+                    other = c.target if c.source is p else c.source
+                    if other._parent in removed:
+                        ro, rp = _find(other), _find(p)
+                        if ro is not rp:
+                            parent[ro] = rp
+                    else:
+                        others.append((p, other))
+        nets = {}
+        for p, other in others:
+            net = nets.setdefault(_find(p), [])
+            if other not in net:
+                net.append(other)
+        for net in nets.values():
+            pairs.extend((p, net[0]) for p in net[1:])
+
+        with circuit.changes():
+            circuit.remove_elements(list(causal) + acausal)
+            circuit.add_elements(connections=pairs)
+        return {ci.name: None for ci in list(causal) + acausal}
+
+
+class CollapseSeriesChains(SimplificationPass):
+    """
+    Replace maximal chains of two-port components in series (in a causal domain) by single instances.
+
+    Two components are in series if the output of the first is connected only to the input of
+    the second and vice versa. A chain is replaced by an instance of a ComponentType named after
+    the ComponentTypes of the chain, e.g. `"Series(Phase,Attenuator)"`, whose ports are clones of
+    the input of the first and the output of the last component. After each call, `series` maps
+    the names of the new instances to the names of the original instances, in chain order.
+    """
+
+    def __init__(self, can_collapse=None, min_length=2):
+        """
+        :param can_collapse: Optional predicate `can_collapse(ci)` restricting which two-port components may be merged.
+        :param min_length: Minimum number of components in a chain to collapse it.
+        """
+        self.can_collapse = can_collapse
+        self.min_length = min_length
+        self.series = {}
+        self._types = {}
+
+    def _link(self, ci):
+        if self.can_collapse is not None and not self.can_collapse(ci):
+            return None
+        return _two_port_ends(ci)
+
+    def _series_type(self, chain, ends):
+        key = tuple(ci.ctype for ci in chain)
+        ctype = self._types.get(key)
+        if ctype is None:
+            p_in, p_out = ends[chain[0]][0], ends[chain[-1]][1]
+            in_name, out_name = (p_in.name, p_out.name) if p_in.name != p_out.name else ("In", "Out")
+            ctype = ComponentType(name="Series({})".format(",".join(ct.name for ct in key)),
+                                  ports=[Port(name=in_name, domain=p_in.domain, direction="in"),
+                                         Port(name=out_name, domain=p_out.domain, direction="out")])
+            self._types[key] = ctype
+        return ctype
+
+    def __call__(self, circuit):
+        ends = {}
+        for ci in circuit.component_instances:
+            e = self._link(ci)
+            if e is not None:
+                ends[ci] = e
+
+        def _next(ci):
+            # the successor in series with ci, if any
+            p_out = ends[ci][1]
+            if len(p_out.connections_out) != 1 or p_out.connections_in:
+                return None
+            t = p_out.connections_out[0].target
+            nxt = t._parent
+            if nxt not in ends or ends[nxt][0] is not t or nxt is ci:
+                return None
+            if len(t.connections_in) != 1 or t.connections_out or t.domain is not p_out.domain:
+                return None
+            return nxt
+
+        successors = {ci: _next(ci) for ci in ends}
+        has_predecessor = {nxt for nxt in successors.values() if nxt is not None}
+
+        chains = []
+        for ci in ends:
+            if ci in has_predecessor:
+                continue
+            chain = [ci]
+            while successors[chain[-1]] is not None:
+                chain.append(successors[chain[-1]])
+            if len(chain) >= self.min_length:
+                chains.append(chain)
+
+        mapping = {}
+        self.series = {}
+        taken = set(circuit.c)
+        instances = []
+        # the end ports of each chain are replaced by the ports of the new instance
+        port_map = {}
+        chain_ends = []
+        for chain in chains:
+            p_in, p_out = ends[chain[0]][0], ends[chain[-1]][1]
+            ctype = self._series_type(chain, ends)
+            name = _unique_name(taken, "_".join(ci.name for ci in chain))
+            taken.add(name)
+            new = ctype.make_instance(name)
+            port_map[p_in], port_map[p_out] = new.ports
+            instances.append((new, chain[0]._x, chain[0]._y))
+            chain_ends.append((p_in, p_out))
+            self.series[name] = [ci.name for ci in chain]
+            for ci in chain:
+                mapping[ci.name] = name
+
+        connections = []
+        for p_in, p_out in chain_ends:
+            new_in, new_out = port_map[p_in], port_map[p_out]
+            connections.extend((port_map.get(c.source, c.source), new_in) for c in p_in.connections_in)
+            # connections between two chains are added once, as sources of the second chain
+            connections.extend((new_out, c.target) for c in p_out.connections_out if c.target not in port_map)
+
+        with circuit.changes():
+            circuit.remove_elements([ci for chain in chains for ci in chain])
+            circuit.add_elements(instances, connections)
+        return mapping
+
+
+class MergeParallelConnections(SimplificationPass):
+    """
+    Remove duplicate connections between the same two ports in acausal domains.
+    The mapping returned by this pass is always empty, as no component instances are removed.
+    """
+
+    def __call__(self, circuit):
+        seen = set()
+        duplicates = []
+        for c in circuit.connections:
+            if c.source.domain.causal:
+                continue
+            key = frozenset((c.source, c.target))
+            if key in seen:
+                duplicates.append(c)
+            else:
+                seen.add(key)
+        circuit.remove_elements(duplicates)
+        return {}
+
+
+DEFAULT_PASSES = (MergeParallelConnections, CollapseSeriesChains)
+
+
+def simplify(circuit, passes=None):
+    """
+    Run simplification passes on a circuit in place, as a single change.
+
+    :param circuit: Circuit object
+    :param passes: Sequence of SimplificationPass objects, default `None` for
+        `MergeParallelConnections()` followed by `CollapseSeriesChains()`.
+    :return: dict mapping the names of all removed original component instances
+        to the names of the instances that replace them in the simplified circuit, or to `None`.
+    """
+    if passes is None:
+        passes = [p() for p in DEFAULT_PASSES]
+    mapping = {}
+    # originals replaced by each current name, to compose the mappings of consecutive passes
+    originals = {}
+    with circuit.changes():
+        for simplification in passes:
+            for old, new in simplification(circuit).items():
+                replaced = originals.pop(old, [old])
+                for name in replaced:
+                    mapping[name] = new
+                if new is not None:
+                    originals.setdefault(new, []).extend(replaced)
+    return mapping
@@ -0,0 +1,330 @@
+# coding=utf-8
+"""
+Export and import of circuits as SPICE netlists.
+
+`write_spice` writes one element line per component instance, with node names derived from the nets of
+the circuit: the net of the external ground port is node `0`, nets attached to other external ports are
+named after these ports, and all remaining nets are numbered `n1, n2, ...`. The element letter is derived
+from the ComponentType name (see `ELEMENT_TYPES`), other component types are written as subcircuit
+instances (`X` lines). Parameters are taken from `param_assignments`.
+
+`read_spice` parses a netlist line by line and builds a circuit in bulk, without ever holding the text
+of the netlist in memory. Only a map from node names to the first port attached to each node is kept
+besides the circuit itself, and the remaining ports of each node are connected to that port.
+Instances are placed along a spiral in the order in which they appear, which needs neither a grid nor
+any knowledge of the total number of elements.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import re
+from decimal import Decimal
+from math import sin, cos, pi, sqrt
+
+from cirq.core import Domain, ComponentType, Circuit, Connection, inouts
+
+# element letter -> (default ComponentType name, port names)
+ELEMENT_TYPES = {
+    "R": ("Resistor", ["p", "n"]),
+    "C": ("Capacitor", ["p", "n"]),
+    "L": ("Inductor", ["p", "n"]),
+    "V": ("VoltageSource", ["p", "n"]),
+    "I": ("CurrentSource", ["p", "n"]),
+    "D": ("Diode", ["p", "n"]),
+    "F": ("CCCS", ["p", "n"]),
+    "H": ("CCVS", ["p", "n"]),
+    "E": ("VCVS", ["p", "n", "cp", "cn"]),
+    "G": ("VCCS", ["p", "n", "cp", "cn"]),
+    "Q": ("BJT", ["c", "b", "e"]),
+    "J": ("JFET", ["d", "g", "s"]),
+    "M": ("MOSFET", ["d", "g", "s", "b"]),
+}
+_LETTERS = {type_name: letter for letter, (type_name, _) in ELEMENT_TYPES.items()}
+
+_VALUE_RE = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?[a-z]*$", re.IGNORECASE)
+_EXPONENTS = {"t": 12, "g": 9, "meg": 6, "k": 3, "m": -3, "u": -6, "n": -9, "p": -12, "f": -15}
+
+_GOLDEN_ANGLE = pi * (3. - sqrt(5.))
+
+
+def parse_value(token):
+    """
+    Parse a SPICE number with optional scale suffix, e.g., `"4.7k"` or `"10uF"`.
+    Tokens that are not numbers are returned unchanged.
+    """
+    m = _VALUE_RE.match(token)
+    if m is None:
+        return token
+    value = float(m.group(1))
+    suffix = (m.group(2) or "").lower()
+    if suffix == "mil":
+        return value * 25.4e-6
+    if suffix:
+        # scale in decimal to avoid rounding errors, e.g., 10u == 1e-05
+        return float(Decimal(m.group(1)).scaleb(_EXPONENTS[suffix]))
+    return value
+
+
+def _format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def element_letter(ctype_name):
+    """
+    Return the SPICE element letter for a ComponentType name, `"X"` for subcircuit instances.
+    """
+    return _LETTERS.get(ctype_name, "X")
+
+
+# noinspection PyProtectedMember
+def node_names(circuit, ground="GND"):
+    """
+    Assign SPICE node names to all ports of a circuit.
+
+    :param circuit: Circuit object
+    :param ground: Name of the external port whose net is the ground node `0`
+    :return: dict mapping each port to its node name
+    """
+    parent = {}
+
+    def _find(p):
+        root = p
+        while parent.get(root, root) is not root:
+            root = parent[root]
+        while p is not root:
+            parent[p], p = root, parent[p]
+        return root
+
+    for c in circuit.connections:
+        rs, rt = _find(c.source), _find(c.target)
+        if rs is not rt:
+            parent[rt] = rs
+
+    names = {}
+    for p in circuit.ports:
+        root = _find(p)
+        if p.name == ground:
+            names[root] = "0"
+        else:
+            names.setdefault(root, p.name)
+
+    ret = {p: names[_find(p)] for p in circuit.ports}
+    k = 0
+    for ci in circuit.component_instances:
+        for p in ci.ports:
+            root = _find(p)
+            name = names.get(root)
+            if name is None:
+                k += 1
+                name = names[root] = "n{}".format(k)
+            ret[p] = name
+    return ret
+
+
+def spice_lines(circuit, ground="GND", title=None):
+    """
+    Iterate over the lines (without line breaks) of the SPICE netlist of a circuit.
+
+    :param circuit: Circuit object
+    :param ground: Name of the external port whose net is the ground node `0`
+    :param title: Title line, default `None` for the circuit name
+    """
+    nodes = node_names(circuit, ground)
+    yield title if title is not None else circuit.name
+    for ci in circuit.component_instances:
+        letter = element_letter(ci.ctype.name)
+        name = ci.name if ci.name[:1].upper() == letter else "{}_{}".format(letter, ci.name)
+        tokens = [name] + [nodes[p] for p in ci.ports]
+        params = dict(ci.param_assignments)
+        if letter == "X":
+            tokens.append(ci.ctype.name)
+        elif letter in "VI":
+            for key, keyword in (("dc_value", "DC"), ("ac_value", "AC")):
+                if key in params:
+                    tokens.extend([keyword, _format_value(params.pop(key))])
+        elif "value" in params:
+            tokens.append(_format_value(params.pop("value")))
+        tokens.extend(_format_value(a) for a in params.pop("args", []))
+        tokens.extend("{}={}".format(key, _format_value(value)) for key, value in sorted(params.items()))
+        yield " ".join(tokens)
+    yield ".end"
+
+
+def write_spice(circuit, stream, ground="GND", title=None):
+    """
+    Write the SPICE netlist of a circuit to a file-like object, line by line.
+
+    :param circuit: Circuit object
+    :param stream: File-like object with a `write` method
+    :param ground: Name of the external port whose net is the ground node `0`
+    :param title: Title line, default `None` for the circuit name
+    """
+    for line in spice_lines(circuit, ground, title):
+        stream.write(line + "\n")
+
+
+def save_spice(circuit, path, ground="GND", title=None):
+    """
+    Write the SPICE netlist of a circuit to a file. See `write_spice`.
+    """
+    with open(path, "w") as spicefile:
+        write_spice(circuit, spicefile, ground, title)
+
+
+def _logical_lines(lines):
+    # join continuation lines, drop comments and blank lines; yields (line number, text)
+    pending = None
+    for number, line in enumerate(lines, 1):
+        line = line.split(";", 1)[0].rstrip()
+        stripped = line.strip()
+        if not stripped or stripped.startswith("*"):
+            continue
+        if stripped.startswith("+"):
+            if pending is None:
+                raise ValueError("Line {}: continuation without a preceding line".format(number))
+            pending = pending[0], pending[1] + " " + stripped[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = number, stripped
+    if pending is not None:
+        yield pending
+
+
+def read_spice(lines, domain=None, ctypes=None, name=None, ground="GND", ports=(), title=True):
+    """
+    Create a Circuit from a SPICE netlist, processing it line by line in time linear in its length.
+
+    Element parameters are stored in `param_assignments`: the value of `R`, `C` and `L` elements as `value`,
+    the `DC` and `AC` values of sources as `dc_value` and `ac_value`, `key=value` pairs by key and
+    all other positional arguments, e.g., model names, as a list `args`.
+    Subcircuit definitions (`.subckt`) are not supported, and all directives other than `.end` are ignored.
+
+    :param lines: Iterable of lines, e.g., an open file
+    :param domain: Non-causal Domain of all ports, default `None` to create one named `"net"`.
+    :param ctypes: Optional dict mapping element letters (e.g. `"R"`) or subcircuit names to ComponentTypes.
+        Their ports are matched to the nodes of an element by position.
+        Missing ComponentTypes are created with the names and ports of `ELEMENT_TYPES`.
+    :param name: Circuit name, default `None` for the title line of the netlist.
+    :param ground: Name of the external port created for the ground node `0`
+    :param ports: Names of further nodes to expose as external ports of the same name. A node named like
+        `ground` is joined with node `0`.
+    :param title: Whether the first line is the title line, as in standard SPICE netlists.
+    :return: Circuit object
+    """
+    if domain is None:
+        domain = Domain(name="net", causal=False)
+    ctypes = dict(ctypes or {})
+    lines = iter(lines)
+    if title:
+        title_line = next(lines, "").strip()
+        name = name or title_line
+    name = name or "SPICE"
+
+    others = [p for p in ports if p != ground]
+    ext_ports = inouts([ground] + others, domain)
+    first_port = {"0": ext_ports[0]}
+    if ground in ports:
+        first_port[ground] = ext_ports[0]
+    first_port.update(zip(others, ext_ports[1:]))
+    instances = []
+    connections = []
+    seen = set()
+
+    for number, line in _logical_lines(lines):
+        tokens = line.split()
+        head = tokens[0]
+        if head.startswith("."):
+            directive = head.lower()
+            if directive == ".end":
+                break
+            if directive == ".subckt":
+                raise ValueError("Line {}: subcircuit definitions are not supported".format(number))
+            continue
+
+        letter = head[0].upper()
+        rest = tokens[1:]
+        if letter == "X":
+            positional = [t for t in rest if "=" not in t]
+            if not positional:
+                raise ValueError("Line {}: missing subcircuit name".format(number))
+            key = positional[-1]
+            n_nodes = len(positional) - 1
+        elif letter in ELEMENT_TYPES:
+            key = letter
+            n_nodes = len(ELEMENT_TYPES[letter][1])
+        else:
+            raise ValueError("Line {}: unsupported element {}".format(number, head))
+        if len(rest) < n_nodes:
+            raise ValueError("Line {}: element {} needs {} nodes".format(number, head, n_nodes))
+
+        ctype = ctypes.get(key)
+        if ctype is None:
+            if letter == "X":
+                ctype = ComponentType(name=key, ports=inouts(["n{}".format(k + 1) for k in range(n_nodes)], domain))
+            else:
+                type_name, port_names = ELEMENT_TYPES[letter]
+                ctype = ComponentType(name=type_name, ports=inouts(port_names, domain))
+            ctypes[key] = ctype
+        if len(ctype.ports) != n_nodes:
+            raise ValueError("Line {}: {} has {} ports, but {} nodes are given".format(
+                number, ctype.name, len(ctype.ports), n_nodes))
+        if head in seen:
+            raise ValueError("Line {}: duplicate element name {}".format(number, head))
+        seen.add(head)
+
+        params = {}
+        args = []
+        values = rest[n_nodes + 1:] if letter == "X" else rest[n_nodes:]
+        k = 0
+        while k < len(values):
+            token = values[k]
+            if "=" in token:
+                param, value = token.split("=", 1)
+                params[param.lower()] = parse_value(value)
+            elif letter in "VI" and token.upper() in ("DC", "AC") and k + 1 < len(values):
+                params[token.lower() + "_value"] = parse_value(values[k + 1])
+                k += 1
+            elif letter in "VI" and "dc_value" not in params and not args:
+                params["dc_value"] = parse_value(token)
+            elif letter in "RCL" and "value" not in params:
+                params["value"] = parse_value(token)
+            else:
+                args.append(parse_value(token))
+            k += 1
+        if args:
+            params["args"] = args
+
+        ci = ctype.make_instance(head)
+        ci.param_assignments = params
+        instances.append(ci)
+        for p, node in zip(ci.ports, rest[:n_nodes]):
+            first = first_port.setdefault(node, p)
+            if first is not p:
+                connections.append(Connection(source=first, target=p))
+
+    circuit = Circuit(name=name, ports=ext_ports, component_instances=instances)
+    circuit.connections = connections
+    x0, y0 = circuit.width / 2., circuit.height / 2.
+    spacing = circuit._layout_dx / 2.
+    # Vogel's spiral: roughly uniform density for any number of instances, consecutive elements stay close
+    for k, ci in enumerate(instances):
+        r = spacing * sqrt(k)
+        ci._x = x0 + r * cos(k * _GOLDEN_ANGLE)
+        ci._y = y0 + r * sin(k * _GOLDEN_ANGLE)
+    return circuit
+
+
+def load_spice(path, domain=None, ctypes=None, name=None, ground="GND", ports=()):
+    """
+    Create a Circuit from a SPICE netlist file. See `read_spice`.
+    """
+    with open(path, "r") as spicefile:
+        return read_spice(spicefile, domain, ctypes, name, ground, ports)
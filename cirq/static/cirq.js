@@ -32,7 +32,8 @@ if (typeof String.endsWith !== 'function') {
 
 console.log("[loading cirq.js]");
 
-require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widget"], function (d3, WidgetManager) {
+// "cirq/d3" is defined by the bundle, see cirq/assets.py
+require(["cirq/d3", "widgets/js/widget"], function (d3, WidgetManager) {
 
     // Query whether a particular circuit element is currently the selected one
     // Will change when multi-selections become possible
@@ -43,6 +44,266 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
         return (model === model.get("_circuit").get("selected_element"));
     };
 
+    // Domain colors are applied by one stylesheet per domain, keyed by the domain's css class.
+    // Ports and connections are only tagged with that class, such that changing the colors of a domain
+    // rewrites a single style element regardless of the number of elements.
+    var domain_styles = {};
+
+    var domain_class = function (domain) {
+        return "cirq-domain-" + domain.id;
+    };
+
+    var domain_css = function (domain) {
+        var c = "." + domain_class(domain);
+        return [
+            c + " .port_marker {fill: " + domain.get("_color") + ";}",
+            c + ".selected .port_marker {fill: " + domain.get("_color_selected") + ";}",
+            c + ".highlighted .port_marker {fill: " + domain.get("_color_target") + ";}",
+            c + " path.vis {stroke: " + domain.get("_color") + ";}",
+            c + ".selected path.vis {stroke: " + domain.get("_color_selected") + ";}",
+            c + ".highlighted path.vis {stroke: " + domain.get("_color_target") + ";}"
+        ].join("\n");
+    };
+
+    // Create the stylesheet of a domain unless it exists and return the domain's css class
+    var ensure_domain_style = function (domain) {
+        if (domain_styles[domain.id] === undefined) {
+            var style = document.createElement("style");
+            style.setAttribute("type", "text/css");
+            style.textContent = domain_css(domain);
+            document.head.appendChild(style);
+            domain_styles[domain.id] = style;
+            domain.on("change:_color change:_color_selected change:_color_target", function () {
+                style.textContent = domain_css(domain);
+            });
+        }
+        return domain_class(domain);
+    };
+
+    // All domain stylesheets, for embedding them into captured svg images
+    var all_domain_css = function () {
+        return $.map(domain_styles, function (style) {
+            return style.textContent;
+        }).join("\n");
+    };
+
+    // Styles of multi-selected component instances and of the selection box, added to the page once
+    var ensure_base_style = function () {
+        if (document.getElementById("cirq-base-style") === null) {
+            var style = document.createElement("style");
+            style.setAttribute("type", "text/css");
+            style.setAttribute("id", "cirq-base-style");
+            style.textContent = [
+                "g.component.selected .component_body circle {stroke: red; stroke-width: 3px;}",
+                "rect.selection_box {fill: #3366AA; fill-opacity: 0.1; stroke: #3366AA; stroke-dasharray: 4 2;}"
+            ].join("\n");
+            document.head.appendChild(style);
+        }
+    };
+
+    // Uniform grid over points for box queries, such that a query only visits the cells overlapping the box
+    var GridIndex = function (cell) {
+        this.cell = cell;
+        this.cells = {};
+        this.n_cells = 0;
+    };
+
+    GridIndex.prototype.insert = function (x, y, item) {
+        var key = Math.floor(x / this.cell) + "," + Math.floor(y / this.cell);
+        if (this.cells[key] === undefined) {
+            this.cells[key] = [];
+            this.n_cells += 1;
+        }
+        this.cells[key].push({x: x, y: y, item: item});
+    };
+
+    GridIndex.prototype.query = function (x0, y0, x1, y1) {
+        var ret = [],
+            i0 = Math.floor(x0 / this.cell),
+            i1 = Math.floor(x1 / this.cell),
+            j0 = Math.floor(y0 / this.cell),
+            j1 = Math.floor(y1 / this.cell),
+            collect = function (entries) {
+                $.each(entries, function (k, e) {
+                    if (e.x >= x0 && e.x <= x1 && e.y >= y0 && e.y <= y1) {
+                        ret.push(e.item);
+                    }
+                });
+            },
+            i,
+            j;
+        if ((i1 - i0 + 1) * (j1 - j0 + 1) > this.n_cells) {
+            // the box covers more cells than are occupied
+            $.each(this.cells, function (key, entries) {
+                collect(entries);
+            });
+        } else {
+            for (i = i0; i <= i1; i += 1) {
+                for (j = j0; j <= j1; j += 1) {
+                    collect(this.cells[i + "," + j] || []);
+                }
+            }
+        }
+        return ret;
+    };
+
+    // Set a class on the element of the view of a model, see tag_element
+    var set_element_class = function (root, model, cls, value) {
+        if (model) {
+            d3.select(root).selectAll("[data-cirq-id=\"" + model.id + "\"]").classed(cls, value);
+        }
+    };
+
+    // Tag the element of a view with its model id and domain class
+    var tag_element = function (view, domain) {
+        view.svg.attr("data-cirq-id", view.model.id);
+        if (view.domain_class) {
+            view.svg.classed(view.domain_class, false);
+        }
+        view.domain_class = ensure_domain_style(domain);
+        view.svg.classed(view.domain_class, true)
+            .classed("selected", selectedq(view.model));
+    };
+
+    // Message of an element view, tagged with the key of the circuit view that contains it
+    var view_message = function (view, type) {
+        var key = $(view.el).closest("[data-cirq-view]").attr("data-cirq-view");
+        if (key === undefined) {
+            return type;
+        }
+        return {type: type, view: key};
+    };
+
+    // While views of a circuit are attached, the python backend no longer sends the full lists of
+    // component instances, ports and connections, but deltas of operations (see cirq/collab.py).
+    // All views of a circuit share its model, so the deltas are applied to the model by the first view
+    // that receives them and the model remembers the version of its lists in cirq_version.
+    var set_unsynced = WidgetManager._model_types.WidgetModel.__super__.set;
+
+    var connection_key = function (source, target) {
+        return source.id + ">" + target.id;
+    };
+
+    // Index the elements of a circuit model by the names the operations refer to them by
+    var index_circuit = function (model) {
+        var index = {components: {}, ports: {}, connections: {}};
+        $.each(model.get("component_instances"), function (k, ci) {
+            index.components[ci.get("name")] = ci;
+        });
+        $.each(model.get("ports"), function (k, p) {
+            index.ports[p.get("name")] = p;
+        });
+        $.each(model.get("connections"), function (k, c) {
+            index.connections[connection_key(c.get("source"), c.get("target"))] = c;
+        });
+        return index;
+    };
+
+    var port_model = function (index, parent, name) {
+        var ret = null;
+        if (parent === null) {
+            return index.ports[name] || null;
+        }
+        if (index.components[parent] !== undefined) {
+            $.each(index.components[parent].get("ports"), function (k, p) {
+                if (p.get("name") === name) {
+                    ret = p;
+                    return false;
+                }
+            });
+        }
+        return ret;
+    };
+
+    // Apply a delta to the lists of a circuit model. Returns false if the model has missed earlier deltas.
+    var apply_delta = function (model, delta) {
+        var version = model.cirq_version,
+            index = model.cirq_index,
+            manager = model.widget_manager,
+            lists = {},
+            list = function (key) {
+                if (lists[key] === undefined) {
+                    lists[key] = model.get(key).slice();
+                }
+                return lists[key];
+            },
+            drop = function (key, item) {
+                var k = $.inArray(item, list(key));
+                if (k >= 0) {
+                    lists[key].splice(k, 1);
+                }
+            };
+        if (version === null || version === undefined || delta.version <= version) {
+            // not synchronized yet or already applied for another view
+            return true;
+        }
+        if (delta.version !== version + 1) {
+            return false;
+        }
+        $.each(delta.operations, function (k, op) {
+            var item = delta.ids[k] !== null ? manager.get_model(delta.ids[k]) : null,
+                source,
+                target;
+            switch (op[0]) {
+            case "add_component":
+                if (item !== null) {
+                    list("component_instances").push(item);
+                    index.components[op[1]] = item;
+                }
+                break;
+            case "remove_component":
+                drop("component_instances", index.components[op[1]]);
+                delete index.components[op[1]];
+                break;
+            case "rename_component":
+                index.components[op[2]] = index.components[op[1]];
+                delete index.components[op[1]];
+                break;
+            case "add_port":
+                if (item !== null) {
+                    list("ports").splice(Math.min(op[4], list("ports").length), 0, item);
+                    index.ports[op[1]] = item;
+                }
+                break;
+            case "remove_port":
+                drop("ports", index.ports[op[1]]);
+                delete index.ports[op[1]];
+                break;
+            case "rename_port":
+                index.ports[op[2]] = index.ports[op[1]];
+                delete index.ports[op[1]];
+                break;
+            case "move_port":
+                drop("ports", index.ports[op[1]]);
+                list("ports").splice(Math.min(op[3], list("ports").length), 0, index.ports[op[1]]);
+                break;
+            case "connect":
+                if (item !== null) {
+                    list("connections").push(item);
+                    index.connections[connection_key(item.get("source"), item.get("target"))] = item;
+                }
+                break;
+            case "disconnect":
+                source = port_model(index, op[1], op[2]);
+                target = port_model(index, op[3], op[4]);
+                if (source !== null && target !== null) {
+                    drop("connections", index.connections[connection_key(source, target)]);
+                    delete index.connections[connection_key(source, target)];
+                }
+                break;
+            }
+        });
+        // bypass the widget model's set, such that the lists are not synced back to the backend
+        model.cirq_applying = true;
+        try {
+            set_unsynced.call(model, lists);
+        } finally {
+            model.cirq_applying = false;
+        }
+        model.cirq_version = delta.version;
+        return true;
+    };
+
     // Abstract class for svg-views to inherit from
     // code taken from IPython's ContainerView widget
     // and modified
@@ -92,40 +353,16 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
 
 
             this.svg.on("click", function () {
-                that.send("click");
+                that.send(view_message(that, "click"));
             });
 
-
-            var circuit = this.model.get("_circuit");
-
-            if (circuit !== null) {
-                this.listenTo(this.model.get("_circuit"), "change:selected_element", $.proxy(this.update_selected, this));
-            } else {
-                //noinspection JSLint
-                this.model.on("change:_circuit", function (model, value) {
-                    if (value) {
-                        this.listenTo(value, "change:selected_element", $.proxy(this.update_selected, this));
-                    }
-                }, this);
-            }
+            // selection is tracked by the circuit view, colors are set by the domain stylesheet
+            tag_element(this, this.model.get("domain"));
 
             this.update();
         },
 
 
-        update_selected: function (cmodel, value) {
-            var color,
-                selected = value === this.model;
-
-            if (selected) {
-                color = this.model.get("domain").get("_color_selected");
-            } else {
-                color = this.model.get("domain").get("_color");
-            }
-            this.svg.selectAll(".port_marker").attr("fill", color);
-        },
-
-
         update: function () {
             var dir = this.model.get("direction"),
                 x = this.model.get("_x"),
@@ -135,12 +372,15 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 y_label = this.model.get("_y_label"),
                 name = this.model.get("name"),
                 size = this.model.get("_size"),
-                color;
+                width = this.model.get("width");
 
-            if (selectedq(this.model)) {
-                color = this.model.get("domain").get("_color_selected");
-            } else {
-                color = this.model.get("domain").get("_color");
+            // bus ports are labeled with their number of lanes
+            if (width > 1) {
+                name = name + "/" + width;
+            }
+
+            if (this.model.hasChanged("domain")) {
+                tag_element(this, this.model.get("domain"));
             }
 
             this.svg.attr("transform", "translate(" + x + ", " + y + ")");
@@ -157,14 +397,12 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 this.svg.append("path")
                     .attr("class", "port_marker_invis")
                     .attr("d", String.format("M -{0} {0} L -{0} -{0} L {0} 0 L -{0} {0}", 1.5 * size))
-                    .attr("fill", color)
                     .attr("opacity", 0)
                     .attr("stroke", "none")
                     .attr("transform", "rotate(" + (phi / 2.0 / Math.PI * 360.0) + ")");
                 this.svg.append("path")
                     .attr("class", "port_marker")
                     .attr("d", String.format("M -{0} {0} L -{0} -{0} L {0} 0 L -{0} {0}", size))
-                    .attr("fill", color)
                     .attr("stroke", "none")
                     .attr("transform", "rotate(" + (phi / 2.0 / Math.PI * 360.0) + ")");
             } else if (dir === "inout") {
@@ -173,7 +411,6 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                     .attr("cx", 0)
                     .attr("cy", 0)
                     .attr("r", 1.5 * size)
-                    .attr("fill", color)
                     .attr("opacity", 0)
                     .attr("stroke", "none");
                 this.svg.append("circle")
@@ -181,7 +418,6 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                     .attr("cx", 0)
                     .attr("cy", 0)
                     .attr("r", size)
-                    .attr("fill", color)
                     .attr("stroke", "none");
             } else if (dir === "default") {
                 console.log("ERROR", this.svg, this.model);
@@ -211,6 +447,7 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
             this.setElement(el);
             this.svg = d3.select(el)
                 .attr("class", "component")
+                .attr("data-cirq-id", this.model.id)
                 .attr("pointer-events", "painted")
                 .style("cursor", "move");
 
@@ -228,10 +465,26 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                     if (d3.select(d3.event.sourceEvent.srcElement).attr("class").indexOf("port_marker") > -1) {
                         return;
                     }
-                    that.send("click");
+                    // dragging a member of a multi-selection moves the whole selection
+                    that.drag_group = that.selected_group();
+                    that.drag_offset = [0, 0];
+                    if (that.drag_group === null) {
+                        that.send(view_message(that, "click"));
+                    }
                 })
                 .on("drag", function () {
                     var x, y;
+                    if (that.drag_group) {
+                        that.drag_offset[0] += d3.event.dx;
+                        that.drag_offset[1] += d3.event.dy;
+                        $.each(that.drag_group, function (k, model) {
+                            model.set({
+                                _x: model.get("_x") + d3.event.dx,
+                                _y: model.get("_y") + d3.event.dy
+                            });
+                        });
+                        return;
+                    }
                     x = that.model.get("_x") + d3.event.dx;
                     y = that.model.get("_y") + d3.event.dy;
                     that.svg.attr("transform", String.format("translate({0},{1})", x, y));
@@ -239,6 +492,19 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                     that.model.set("_y", y);
                 })
                 .on("dragend", function (name) {
+                    if (that.drag_group) {
+                        // one message for all moved instances instead of one sync per instance
+                        that.send({
+                            type: "move",
+                            ids: $.map(that.drag_group, function (model) {
+                                return model.id;
+                            }),
+                            dx: that.drag_offset[0],
+                            dy: that.drag_offset[1]
+                        });
+                        that.drag_group = null;
+                        return;
+                    }
                     that.model.save();
                 }));
 
@@ -264,6 +530,18 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
             this.update();
         },
 
+        // The component instances of the circuit's selection if it includes this one, otherwise null
+        selected_group: function () {
+            var circuit = this.model.get("_circuit"),
+                selection = circuit ? circuit.get("selection") : [];
+            if (!selection || $.inArray(this.model, selection) < 0) {
+                return null;
+            }
+            return $.grep(selection, function (model) {
+                return model.get("ctype") !== undefined;
+            });
+        },
+
         update_selected: function (cmodel, smodel) {
             // update colors if selected
             var selected = this.model === smodel,
@@ -288,7 +566,9 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 label_color = this.model.get("_label_color"),
                 name = this.model.get("name"),
                 inner_svg = this.model.get("_inner_svg"),
-                ctype_name = this.model.get("ctype").get("name");
+                ctype_name = this.model.get("ctype").get("name"),
+                size = this.model.get("size"),
+                k;
 
 
             this.svg.attr("transform", "translate(" + x + ", " + y + ")");
@@ -318,6 +598,30 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 this.svg_inner.html(inner_svg);
             }
 
+            // instance arrays are drawn as a stack, or with one marker per element when expanded
+            if (size !== undefined) {
+                name = name + "[" + size + "]";
+                if (this.model.get("collapsed")) {
+                    for (k = 2; k > 0; k--) {
+                        this.svg_inner.insert("circle", ":first-child")
+                            .attr("cx", 6 * k)
+                            .attr("cy", 6 * k)
+                            .attr("r", r)
+                            .attr("fill", "none")
+                            .attr("stroke", color)
+                            .attr("stroke-width", "2");
+                    }
+                } else {
+                    for (k = 0; k < Math.min(size, 16); k++) {
+                        this.svg_inner.append("circle")
+                            .attr("cx", -r + k * r / 8)
+                            .attr("cy", r + 12)
+                            .attr("r", r / 20 + 1)
+                            .attr("fill", color);
+                    }
+                }
+            }
+
             // add tooltip giving the component type
             this.svg_inner
                 .append("title")
@@ -360,7 +664,7 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 .style("cursor", "crosshair")
                 .on("click", function () {
                     // transmit click events to backend
-                    that.send("click");
+                    that.send(view_message(that, "click"));
                 });
 
             // listen for coordinate changes for both the source and target ports/components
@@ -373,6 +677,7 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 this.stopListening(ps.get("_parent"));
                 this.stopListening(ps);
                 this.init_listener(value);
+                tag_element(this, value.get("domain"));
             }, this);
             this.model.on("change:target", function (model, value) {
                 var ps = model.previous("target");
@@ -381,37 +686,21 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 this.init_listener(value);
             }, this);
 
-            // register event listener for the selected element of the overall circuit
-            var circuit = this.model.get("_circuit");
-
-            // handle both the case where the _circuit trait is already set and where it still needs to be set
-            if (circuit !== null) {
-                this.listenTo(this.model.get("_circuit"), "change:selected_element", $.proxy(this.update_selected, this));
-            } else {
-                //noinspection JSLint
-                this.model.on("change:_circuit", function (model, value) {
-                    if (value) {
-                        this.listenTo(value, "change:selected_element", $.proxy(this.update_selected, this));
-                    }
-                }, this);
-            }
-
-
-            var color = this.model.get("_color");
+            // selection is tracked by the circuit view, colors are set by the domain stylesheet
+            tag_element(this, this.model.get("source").get("domain"));
 
             // mouseover paths
             this.svg.append("path")
                 .attr("class", "invis")
-                .attr("stroke", color)
+                .attr("stroke", "black")
                 .attr("stroke-width", "20")
                 .attr("opacity", 0)
                 .attr("fill", "none");
 
-            // visible connection
+            // visible connection, wider for buses
             this.svg.append("path")
                 .attr("class", "vis")
-                .attr("stroke", color)
-                .attr("stroke-width", "4")
+                .attr("stroke-width", this.model.get("source").get("width") > 1 ? "8" : "4")
                 .attr("fill", "none");
 
 
@@ -448,21 +737,6 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
             this.listenTo(pmodel.get("_parent"), "change", $.proxy(this.update, this));
         },
 
-        update_selected: function (cmodel, value) {
-            // check if this connection is the selected element
-            // and if so, change color
-
-            var selected = value === this.model,
-                color;
-
-            if (selected) {
-                color = this.model.get("_color_selected");
-            } else {
-                color = this.model.get("_color");
-            }
-            this.svg.select("path.vis").attr("stroke", color);
-        },
-
         update: function () {
 
             var cs = this.get_coords(this.model.get("source")),
@@ -495,6 +769,22 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
             var container = d3.select(this.el),
                 that = this;
 
+            // each view of the circuit has its own selection and receives the changes of all views as deltas
+            this.view_key = "view-" + Math.random().toString(36).slice(2);
+            this.version = null;
+            this.selected_id = null;
+            container.attr("data-cirq-view", this.view_key);
+            // lists received in full from the backend invalidate the version of the model's lists
+            this.listenTo(this.model, "change:component_instances change:ports change:connections", function (model) {
+                if (!model.cirq_applying) {
+                    model.cirq_version = null;
+                }
+            });
+            if (this.model.cirq_version === undefined) {
+                this.model.cirq_version = null;
+            }
+            this.send({type: "attach_view", view: this.view_key, version: this.model.cirq_version});
+
             this.svg = container.append("svg")
                 .attr("width", this.model.get("width"))
                 .attr("height", this.model.get("height"))
@@ -532,7 +822,7 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 .attr("pointer-events", "all")
                 .on("click.deselect", function () {
                     // also capture single click events for element deselection
-                    that.send("click");
+                    that.send(view_message(that, "click"));
                 })
                 .call(this.zoom);
 
@@ -596,11 +886,111 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
                 this.update_children(model.previous("connections"), value, this.$el.find("g.connections"));
             }, this);
 
+            // move the selection class of ports and connections, instead of notifying every element
+            this.model.on("change:selected_element", function (model, value) {
+                set_element_class(this.el, model.previous("selected_element"), "selected", false);
+                set_element_class(this.el, value, "selected", true);
+            }, this);
+            this.model.on("change:selection", function (model, value) {
+                this.mark_selection(model.previous("selection") || [], false);
+                this.mark_selection(value || [], true);
+            }, this);
+
+            // shift-drag selects all elements within a box, in front of panning and dragging
+            ensure_base_style();
+            this.svg.node().addEventListener("mousedown", function (event) {
+                if (event.shiftKey && event.button === 0) {
+                    event.stopPropagation();
+                    event.preventDefault();
+                    that.box_select(event);
+                }
+            }, true);
+
             this.update();
 
         },
 
 
+        mark_selection: function (models, value) {
+            var root = this.el;
+            $.each(models, function (k, model) {
+                set_element_class(root, model, "selected", value);
+            });
+        },
+
+        // Index component instances and external ports by position, in circuit coordinates
+        build_index: function () {
+            var index = new GridIndex(this.model.get("_layout_dx"));
+            $.each(this.model.get("component_instances"), function (k, model) {
+                index.insert(model.get("_x"), model.get("_y"), model);
+            });
+            $.each(this.model.get("ports"), function (k, model) {
+                index.insert(model.get("_x"), model.get("_y"), model);
+            });
+            return index;
+        },
+
+        // position of a mouse event within the zoomed main group
+        to_circuit_coords: function (event) {
+            var node = this.svg_main.node(),
+                pt = this.svg.node().createSVGPoint();
+            pt.x = event.clientX;
+            pt.y = event.clientY;
+            return pt.matrixTransform(node.getScreenCTM().inverse());
+        },
+
+        box_select: function (event) {
+            var that = this,
+                index = this.build_index(),
+                start = this.to_circuit_coords(event),
+                box = this.svg_main.append("rect")
+                    .attr("class", "selection_box")
+                    .attr("pointer-events", "none"),
+                hits = [],
+                bounds = function (e) {
+                    var pt = that.to_circuit_coords(e);
+                    return [Math.min(start.x, pt.x), Math.min(start.y, pt.y),
+                        Math.max(start.x, pt.x), Math.max(start.y, pt.y)];
+                },
+                on_move = function (e) {
+                    var b = bounds(e);
+                    box.attr("x", b[0]).attr("y", b[1]).attr("width", b[2] - b[0]).attr("height", b[3] - b[1]);
+                    // preview the selection
+                    that.mark_selection(hits, false);
+                    hits = index.query(b[0], b[1], b[2], b[3]);
+                    that.mark_selection(hits, true);
+                },
+                on_up = function (e) {
+                    var b = bounds(e),
+                        owners = {},
+                        ids;
+                    window.removeEventListener("mousemove", on_move, true);
+                    window.removeEventListener("mouseup", on_up, true);
+                    box.remove();
+                    that.mark_selection(hits, false);
+                    hits = index.query(b[0], b[1], b[2], b[3]);
+                    $.each(hits, function (k, model) {
+                        owners[model.id] = true;
+                    });
+                    // connections are selected along with both of their ends
+                    var owner = function (port) {
+                        var parent = port.get("_parent");
+                        return parent === that.model ? port : parent;
+                    };
+                    $.each(that.model.get("connections"), function (k, model) {
+                        if (owners[owner(model.get("source")).id] && owners[owner(model.get("target")).id]) {
+                            hits.push(model);
+                        }
+                    });
+                    ids = $.map(hits, function (model) {
+                        return model.id;
+                    });
+                    that.send({type: "select", ids: ids});
+                };
+            window.addEventListener("mousemove", on_move, true);
+            window.addEventListener("mouseup", on_up, true);
+        },
+
         update: function () {
 
             // update pan/zoom
@@ -625,12 +1015,59 @@ require(["//cdnjs.cloudflare.com/ajax/libs/d3/3.4.9/d3.min.js", "widgets/js/widg
             }
         },
 
+        remove: function () {
+            this.send({type: "detach_view", view: this.view_key});
+            return SVGCircuitView.__super__.remove.apply(this, arguments);
+        },
+
         on_msg: function (content) {
+            // messages addressed to other views of the circuit
+            if (content.view !== undefined && content.view !== this.view_key) {
+                return;
+            }
+            if (content.type === "attached" || content.type === "caught_up") {
+                // the backend has sent the lists in full or the deltas that were missing
+                if (this.model.cirq_version !== content.version) {
+                    this.model.cirq_index = index_circuit(this.model);
+                    this.model.cirq_version = content.version;
+                }
+                this.model.cirq_catching_up = false;
+                this.version = content.version;
+            } else if (content.type === "delta") {
+                if (apply_delta(this.model, content)) {
+                    this.version = content.version;
+                    this.trigger("delta", content);
+                } else if (!this.model.cirq_catching_up) {
+                    this.model.cirq_catching_up = true;
+                    this.send({type: "catch_up", view: this.view_key, version: this.model.cirq_version});
+                }
+            } else if (content.type === "select_view") {
+                if (this.selected_id !== null) {
+                    d3.select(this.el).selectAll("[data-cirq-id=\"" + this.selected_id + "\"]").classed("selected", false);
+                }
+                this.selected_id = content.id;
+                if (content.id !== null) {
+                    d3.select(this.el).selectAll("[data-cirq-id=\"" + content.id + "\"]").classed("selected", true);
+                }
+            }
             // handle request for capturing current svg
             if (content === "capture_svg") {
+                // embed the domain stylesheets, which live in the page, into the image
+                var svg = this.svg.node().cloneNode(true),
+                    style = document.createElementNS("http://www.w3.org/2000/svg", "style"),
+                    wrapper = document.createElement("div");
+                style.textContent = all_domain_css();
+                svg.insertBefore(style, svg.firstChild);
+                wrapper.appendChild(svg);
                 this.send({
                     type: "captured_svg",
-                    data: this.$el.html()
+                    data: wrapper.innerHTML
+                });
+            } else if (content.type === "highlight") {
+                var root = d3.select(this.el);
+                root.selectAll(".highlighted").classed("highlighted", false);
+                $.each(content.ids, function (i, id) {
+                    root.selectAll("[data-cirq-id=\"" + id + "\"]").classed("highlighted", true);
                 });
             }
         }
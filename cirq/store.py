@@ -0,0 +1,302 @@
+# coding=utf-8
+"""
+An indexed store of many circuits in a single SQLite database.
+
+Each circuit is kept as its JSON representation (see `Circuit.to_jsonifiable`), together with tables derived
+from it: its domains, external ports, component types, component instances and connections. The tables are
+indexed by the names used in typical queries, such that questions like "which circuits use more than 20
+Phase components" or "which circuits connect domain X to port Y" are answered by SQLite without parsing
+any JSON or creating widgets. Queries return lightweight `CircuitRecord` tuples, and `materialize` creates
+the full `Circuit` of a record on demand.
+
+The store only needs the standard library; IPython is imported by `materialize`.
+It complements `cirq.server.CircuitStore`, which serves the JSON files of a directory over HTTP.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import json
+import sqlite3
+from collections import namedtuple
+
+from cirq.canonical import canonical_hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS circuits (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    path TEXT UNIQUE,
+    canonical_hash TEXT NOT NULL,
+    n_instances INTEGER NOT NULL,
+    n_connections INTEGER NOT NULL,
+    json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS domains (
+    circuit_id INTEGER NOT NULL REFERENCES circuits(id),
+    name TEXT NOT NULL,
+    causal INTEGER NOT NULL,
+    one2one INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ports (
+    circuit_id INTEGER NOT NULL REFERENCES circuits(id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    width INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS types (
+    circuit_id INTEGER NOT NULL REFERENCES circuits(id),
+    name TEXT NOT NULL,
+    n_ports INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instances (
+    circuit_id INTEGER NOT NULL REFERENCES circuits(id),
+    name TEXT NOT NULL,
+    ctype TEXT NOT NULL,
+    size INTEGER
+);
+CREATE TABLE IF NOT EXISTS connections (
+    circuit_id INTEGER NOT NULL REFERENCES circuits(id),
+    domain TEXT NOT NULL,
+    source_parent TEXT,
+    source_port TEXT NOT NULL,
+    target_parent TEXT,
+    target_port TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS circuits_name ON circuits(name);
+CREATE INDEX IF NOT EXISTS circuits_hash ON circuits(canonical_hash);
+CREATE INDEX IF NOT EXISTS domains_circuit ON domains(circuit_id);
+CREATE INDEX IF NOT EXISTS ports_circuit ON ports(circuit_id);
+CREATE INDEX IF NOT EXISTS ports_name ON ports(name, domain);
+CREATE INDEX IF NOT EXISTS types_circuit ON types(circuit_id);
+CREATE INDEX IF NOT EXISTS instances_circuit ON instances(circuit_id);
+CREATE INDEX IF NOT EXISTS instances_ctype ON instances(ctype, circuit_id);
+CREATE INDEX IF NOT EXISTS connections_circuit ON connections(circuit_id);
+CREATE INDEX IF NOT EXISTS connections_source ON connections(domain, source_port);
+CREATE INDEX IF NOT EXISTS connections_target ON connections(domain, target_port);
+"""
+
+_TABLES = ["domains", "ports", "types", "instances", "connections"]
+
+CircuitRecord = namedtuple("CircuitRecord", ["id", "name", "path", "n_instances", "n_connections"])
+
+_RECORD_COLUMNS = "circuits.id, circuits.name, circuits.path, circuits.n_instances, circuits.n_connections"
+
+
+def _rows(obj):
+    # rows of the derived tables of a circuit, without the circuit id
+    name = obj["name"]
+    domains = obj.get("domains", {})
+    ctypes = obj.get("component_types", {})
+    instances = obj.get("component_instances", {})
+    arrays = obj.get("arrays", {})
+
+    port_domains = {(None, p["name"]): p["domain"] for p in obj.get("ports", [])}
+    for ci_name, ctype_name in instances.items():
+        for p in ctypes[ctype_name]["ports"]:
+            port_domains[ci_name, p["name"]] = p["domain"]
+
+    connections = []
+    for sn, spn, tn, tpn in obj.get("connections", []):
+        sn = None if sn == name else sn
+        tn = None if tn == name else tn
+        connections.append((port_domains[sn, spn], sn, spn, tn, tpn))
+
+    return {
+        "domains": [(d, info.get("causal", False), info.get("one2one", False)) for d, info in domains.items()],
+        "ports": [(k, p["name"], p["domain"], p["direction"], p.get("width", 1))
+                  for k, p in enumerate(obj.get("ports", []))],
+        "types": [(t, len(info["ports"])) for t, info in ctypes.items()],
+        "instances": [(ci_name, ctype_name, arrays.get(ci_name)) for ci_name, ctype_name in instances.items()],
+        "connections": connections,
+    }
+
+
+class CircuitDatabase(object):
+    """
+    SQLite database of circuits with indexed queries. See the module documentation.
+
+    :param path: Database file, default `":memory:"` for a temporary in-memory store.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM circuits").fetchone()[0]
+
+    def _delete(self, circuit_ids):
+        ids = [(circuit_id,) for circuit_id in circuit_ids]
+        for table in _TABLES:
+            self._db.executemany("DELETE FROM {} WHERE circuit_id = ?".format(table), ids)
+        self._db.executemany("DELETE FROM circuits WHERE id = ?", ids)
+
+    def _insert(self, obj, path=None, text=None):
+        if path is not None:
+            old = self._db.execute("SELECT id FROM circuits WHERE path = ?", (path,)).fetchone()
+            if old is not None:
+                self._delete([old[0]])
+        if text is None:
+            text = json.dumps(obj)
+        cursor = self._db.execute(
+            "INSERT INTO circuits (name, path, canonical_hash, n_instances, n_connections, json) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (obj["name"], path, "{:016x}".format(canonical_hash(obj)),
+             len(obj.get("component_instances", {})), len(obj.get("connections", [])), text))
+        circuit_id = cursor.lastrowid
+        for table, rows in _rows(obj).items():
+            if rows:
+                placeholders = ", ".join("?" * (len(rows[0]) + 1))
+                self._db.executemany("INSERT INTO {} VALUES ({})".format(table, placeholders),
+                                     [(circuit_id,) + row for row in rows])
+        return circuit_id
+
+    def add(self, circuit, path=None):
+        """
+        Add a circuit to the store. A circuit previously stored under the same `path` is replaced.
+
+        :param circuit: Circuit object or its `to_jsonifiable` representation
+        :param path: Optional file path of the circuit, unique within the store
+        :return: id of the stored circuit
+        """
+        obj = circuit.to_jsonifiable() if hasattr(circuit, "to_jsonifiable") else circuit
+        with self._db:
+            return self._insert(obj, path)
+
+    def import_files(self, paths):
+        """
+        Add circuits from JSON files written by `Circuit.save_json` in a single transaction.
+        Circuits previously imported from the same paths are replaced.
+
+        :param paths: Sequence of file paths
+        :return: list of the ids of the stored circuits
+        """
+        ids = []
+        with self._db:
+            for path in paths:
+                with open(path, "r") as jsonfile:
+                    text = jsonfile.read()
+                ids.append(self._insert(json.loads(text), path, text))
+        return ids
+
+    def remove(self, circuit_id):
+        """
+        Remove a circuit from the store.
+
+        :param circuit_id: id of the stored circuit
+        """
+        with self._db:
+            self._delete([circuit_id])
+
+    def query(self, sql, params=()):
+        """
+        Run an SQL query on the tables of the store, see `SCHEMA`, and return all rows.
+        """
+        return self._db.execute(sql, params).fetchall()
+
+    def _records(self, sql, params=()):
+        return [CircuitRecord(*row) for row in self._db.execute(sql, params)]
+
+    def records(self, name=None):
+        """
+        Return the records of all stored circuits, or only of those with the given name.
+        """
+        if name is None:
+            return self._records("SELECT {} FROM circuits ORDER BY id".format(_RECORD_COLUMNS))
+        return self._records("SELECT {} FROM circuits WHERE name = ? ORDER BY id".format(_RECORD_COLUMNS), (name,))
+
+    def with_component(self, ctype, min_count=1):
+        """
+        Find circuits with at least `min_count` instances of a ComponentType.
+
+        :param ctype: ComponentType name
+        :param min_count: Minimum number of instances
+        :return: list of tuples `(record, count)`
+        """
+        sql = ("SELECT {}, COUNT(*) FROM instances JOIN circuits ON circuits.id = instances.circuit_id "
+               "WHERE instances.ctype = ? GROUP BY circuits.id HAVING COUNT(*) >= ? "
+               "ORDER BY circuits.id").format(_RECORD_COLUMNS)
+        return [(CircuitRecord(*row[:-1]), row[-1]) for row in self._db.execute(sql, (ctype, min_count))]
+
+    def with_connection(self, domain, port, external=True):
+        """
+        Find circuits with a connection of a domain to a port of the given name.
+
+        :param domain: Domain name
+        :param port: Port name
+        :param external: Whether `port` refers to an external port of the circuits (default) or to
+            a port of their component instances.
+        :return: list of records
+        """
+        parent = "IS NULL" if external else "IS NOT NULL"
+        sql = ("SELECT {0} FROM circuits WHERE circuits.id IN ("
+               "SELECT circuit_id FROM connections WHERE domain = ? AND source_port = ? AND source_parent {1} "
+               "UNION SELECT circuit_id FROM connections WHERE domain = ? AND target_port = ? AND target_parent {1}"
+               ") ORDER BY circuits.id").format(_RECORD_COLUMNS, parent)
+        return self._records(sql, (domain, port, domain, port))
+
+    def with_hash(self, h):
+        """
+        Find circuits with a given canonical hash, e.g., `Circuit.canonical_hash()` of a circuit to look up.
+        Use `cirq.canonical.canonical_form` to rule out collisions.
+
+        :param h: Canonical hash
+        """
+        return self._records("SELECT {} FROM circuits WHERE canonical_hash = ? ORDER BY id".format(_RECORD_COLUMNS),
+                             ("{:016x}".format(h),))
+
+    def duplicates(self):
+        """
+        Return groups of circuits that share their canonical hash, i.e., that are most likely equal up to renaming.
+
+        :return: list of lists of records
+        """
+        groups = {}
+        sql = ("SELECT {0}, circuits.canonical_hash FROM circuits WHERE canonical_hash IN ("
+               "SELECT canonical_hash FROM circuits GROUP BY canonical_hash HAVING COUNT(*) > 1"
+               ") ORDER BY circuits.id").format(_RECORD_COLUMNS)
+        for row in self._db.execute(sql):
+            groups.setdefault(row[-1], []).append(CircuitRecord(*row[:-1]))
+        return sorted(groups.values(), key=lambda records: records[0].id)
+
+    def get_jsonifiable(self, circuit_id):
+        """
+        Return the `to_jsonifiable` representation of a stored circuit.
+
+        :param circuit_id: id of the stored circuit
+        """
+        row = self._db.execute("SELECT json FROM circuits WHERE id = ?", (circuit_id,)).fetchone()
+        if row is None:
+            raise KeyError(circuit_id)
+        return json.loads(row[0])
+
+    def materialize(self, circuit_id, registry=None):
+        """
+        Create the Circuit object of a stored circuit.
+
+        :param circuit_id: id of the stored circuit
+        :param registry: Optional registry of shared Domains and ComponentTypes, see `Circuit.from_jsonifiable`.
+        :return: Circuit object
+        """
+        from cirq.core import Circuit
+
+        return Circuit.from_jsonifiable(self.get_jsonifiable(circuit_id), registry)
@@ -15,6 +15,42 @@ These tests can only be run from within an IPython notebook
 from cirq import *
 
 
+def make_mach_zehnder():
+    """
+    Create the Mach-Zehnder example circuit used throughout the tests.
+
+    :return: tuple `(mz, fm, el, bs_type, phase_type)`
+    """
+    fm = Domain(name="fieldmode", causal=True, one2one=True)
+    el = Domain(name="electrical", causal=False, _color="purple")
+
+    ins = [Port(name="In{}".format(k + 1), domain=fm, direction="in") for k in range(5)]
+    outs = [Port(name="Out{}".format(k + 1), domain=fm, direction="out") for k in range(5)]
+    el_port = Port(name="Control", domain=el, direction="inout")
+
+    bs_type = ComponentType(name="Beamsplitter", ports=clone_ports(ins[:2] + outs[:2]))
+    phase_type = ComponentType(name="Phase", ports=clone_ports(ins[:1] + [el_port] + outs[:1]))
+
+    b1, b2 = map(bs_type.make_instance, ["b1", "b2"])
+    phi = phase_type.make_instance("phi")
+
+    mz = Circuit(name="MachZehnder",
+                 ports=clone_ports(ins[:2] + [el_port] + outs[:2]),
+                 component_instances=[b1, b2, phi])
+
+    for s, t in [(mz.p.In1, b1.p.In1),
+                 (mz.p.In2, b1.p.In2),
+                 (b1.p.Out1, phi.p.In1),
+                 (b1.p.Out2, b2.p.In1),
+                 (phi.p.Out1, b2.p.In2),
+                 (b2.p.Out1, mz.p.Out1),
+                 (b2.p.Out2, mz.p.Out2),
+                 (mz.p.Control, phi.p.Control)]:
+        mz.connect(s, t)
+
+    return mz, fm, el, bs_type, phase_type
+
+
 def test_mach_zehnder():
     """
     Test some simple things, comprehensive tests would be nice, but complicated because of JavaScript.
@@ -0,0 +1,72 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq.core import Domain, Port, ComponentType, Circuit, InstanceArray, Lane, inputs, outputs
+from cirq.buses import expand_buses
+from cirq.history import History, snapshot_operations
+
+
+def test_arrays():
+    """
+    Connect two arrays elementwise, address single elements and expand the arrays for a backend.
+    """
+    fm = Domain(name="fm", causal=True)
+    bs = ComponentType(name="BS", ports=inputs(["In1", "In2"], fm) + outputs(["Out1", "Out2"], fm), params=["theta"])
+    a = bs.make_array("a", 1000)
+    b = bs.make_array("b", 1000)
+    assert isinstance(a, InstanceArray) and len(a) == 1000
+    assert a.p.In1.width == 1000
+
+    c = Circuit(name="c", ports=[Port(name="In", domain=fm, direction="in", width=1000)], component_instances=[a, b])
+    c.connect(c.p.In, a.p.In1)
+    c.connect(a.p.Out1, b.p.In1)
+    assert len(c.connections) == 2
+    assert a[17].p.In1 == Lane(a.p.In1, 17)
+    assert a[-1].name == "a[999]"
+    try:
+        a[1000]
+    except IndexError:
+        pass
+    else:
+        assert False
+
+    a.param_assignments = {"theta": 0.}
+    a.set_column("theta", [k * .001 for k in range(1000)])
+    assert a[17].param_assignments == {"theta": .017}
+    assert b[17].param_assignments == {}
+
+    again = Circuit.from_jsonifiable(c.to_jsonifiable())
+    assert isinstance(again.c.a, InstanceArray) and again.c.a.size == 1000
+    assert again.structural_hash() == c.structural_hash()
+    assert ("add_component", "b", "BS", b._x, b._y, 1000) in snapshot_operations(c)
+
+    history = History(c)
+    c.remove_component(b)
+    history.undo()
+    assert isinstance(c.c.b, InstanceArray) and len(c.c.b) == 1000
+    assert len(c.connections) == 2
+
+    small = Circuit(name="small", component_instances=[bs.make_array("x", 3), bs.make_array("y", 3)])
+    small.connect(small.c.x.p.Out2, small.c.y.p.In2)
+    small.c.x.set_column("theta", [1., 2., 3.])
+    small.c.x.element_y[1] = 30.
+    # the per-element columns and offsets survive saving and loading
+    small = Circuit.from_json(small.to_json())
+    assert small.c.x.param_columns == {"theta": [1., 2., 3.]} and list(small.c.x.element_y) == [0., 30., 0.]
+    expanded = expand_buses(small)
+    assert expanded.c["x[1]"]._y == small.c.x._y + 30.
+    assert sorted(expanded.c) == ["x[0]", "x[1]", "x[2]", "y[0]", "y[1]", "y[2]"]
+    assert expanded.c["x[2]"].param_assignments == {"theta": 3.}
+    assert expanded.c["x[1]"].p.Out2.connections_out[0].target is expanded.c["y[1]"].p.In2
+    assert len(expanded.connections) == 3
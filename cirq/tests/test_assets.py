@@ -0,0 +1,70 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import os
+import shutil
+import tempfile
+
+from cirq.assets import minify, build_bundle, install, init_script, vendor_d3, D3_CDN_URL, D3_VENDOR_PATH, \
+    D3_VERSION
+
+
+def test_assets():
+    """
+    Build the bundle with and without a vendored d3 and load it via an installed notebook extension.
+    """
+    source = "/* header\n comment */\nvar a = \"//not a comment\";\n\n    // comment\n    f(a); /* kept */\n"
+    assert minify(source) == "var a = \"//not a comment\";\nf(a); /* kept */"
+
+    version, script = build_bundle(d3_path=None)
+    assert build_bundle(d3_path=None) == (version, script)
+    assert D3_CDN_URL in script
+    assert "window.cirq_js_version === \"{}\"".format(version) in script
+    assert "cdnjs" not in script.replace(D3_CDN_URL, "")
+
+    tmp = tempfile.mkdtemp()
+    try:
+        download = os.path.join(tmp, "download.min.js")
+        with open(download, "w") as d3file:
+            d3file.write("!function(){{var d3={{version:\"{}\"}};this.d3=d3}}();".format(D3_VERSION))
+        d3_path = vendor_d3(download, os.path.join(tmp, "d3.min.js"))
+        version_d3, script_d3 = build_bundle(d3_path=d3_path)
+        assert version_d3 != version
+        # with a vendored d3 the bundle works offline
+        assert "cdnjs" not in script_d3
+        assert "define(\"cirq/d3\"" in script_d3
+
+        directory = os.path.join(tmp, "nbextensions")
+        assert init_script(directory=directory) == build_bundle()[1]
+        path = install(directory)
+        assert os.path.isfile(path)
+        loader = init_script(directory=directory)
+        assert os.path.basename(path) in loader and len(loader) < 200
+        assert init_script(inline=True, directory=directory) == build_bundle()[1]
+
+        with open(download, "w") as d3file:
+            d3file.write("!function(){var d3={version:\"3.4.9\"};this.d3=d3}();")
+        try:
+            vendor_d3(download, os.path.join(tmp, "other.min.js"))
+            assert False
+        except ValueError:
+            pass
+    finally:
+        shutil.rmtree(tmp)
+
+    # the vendored release ships with the package, so the default bundle never touches a CDN
+    assert os.path.isfile(D3_VENDOR_PATH)
+    script = build_bundle()[1]
+    assert "cdnjs" not in script and D3_CDN_URL not in script
+    assert "require.config" not in script
@@ -0,0 +1,30 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq.benchmarks import BENCHMARKS, KINDS, build_circuit, run_benchmarks, compare
+
+
+def test_benchmarks():
+    """
+    Run the benchmark suite at a tiny size and check the regression detection.
+    """
+    circuit, domain, pairs = build_circuit("mesh", 9)
+    assert len(pairs) == 12
+
+    results = run_benchmarks(sizes=[4], repeat=1)
+    assert len(results) == len(BENCHMARKS) * len(KINDS)
+    assert compare(results, results) == []
+
+    slower = [dict(r, best=r["best"] * 2 + 1.) for r in results]
+    assert len(compare(results, slower)) == len(results)
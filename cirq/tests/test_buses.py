@@ -0,0 +1,69 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq.core import Domain, Port, ComponentType, Circuit, Lane
+from cirq.buses import expand_buses, lane_nets
+from cirq.history import History
+
+
+def test_buses():
+    """
+    Connect 64-lane buses, serialize them and expand them for a backend.
+    """
+    fm = Domain(name="fm", causal=True)
+    wire = Domain(name="wire", causal=False)
+    mesh = ComponentType(name="Mesh", ports=[Port(name="In", domain=fm, direction="in", width=64),
+                                             Port(name="Out", domain=fm, direction="out", width=64),
+                                             Port(name="ctrl", domain=fm, direction="in")])
+    pads = ComponentType(name="Pads", ports=[Port(name="a", domain=wire, width=4), Port(name="b", domain=wire, width=4)])
+    c = Circuit(name="c", ports=[Port(name="In", domain=fm, direction="in", width=64)],
+                component_instances=[mesh.make_instance("m1"), mesh.make_instance("m2"),
+                                     pads.make_instance("p1"), pads.make_instance("p2")])
+    m1, m2 = c.c.m1, c.c.m2
+    assert m1.p.In.is_bus and m1.p.In.width == 64 and not m1.p.ctrl.is_bus
+    assert not Domain.valid_connection(m1.p.Out, m2.p.ctrl)
+
+    c.connect(c.p.In, m1.p.In)
+    c.connect(m1.p.Out, m2.p.In)
+    c.connect(c.c.p1.p.b, c.c.p2.p.a)
+    assert len(c.connections) == 3
+    lanes = c.connections[1].lanes
+    assert len(lanes) == 64 and lanes[17] == (Lane(m1.p.Out, 17), Lane(m2.p.In, 17))
+    assert lanes[17][0].name == "Out[17]"
+    assert len(lane_nets(c, wire)) == 4
+
+    try:
+        m1.p.In.width = 2
+    except ValueError:
+        pass
+    else:
+        assert False
+
+    assert '"width": 64' in c.to_json()
+    again = Circuit.from_jsonifiable(c.to_jsonifiable())
+    assert again.c.m1.p.Out.width == 64 and again.p.In.width == 64
+    assert again.structural_hash() == c.structural_hash()
+
+    expanded = expand_buses(c)
+    assert len(expanded.ports) == 64
+    assert len(expanded.c.m1.ports) == 129
+    assert len(expanded.connections) == 2 * 64 + 4
+    assert expanded.c.m1.p["Out[5]"].connections_out[0].target is expanded.c.m2.p["In[5]"]
+    assert expand_buses(expanded) is expanded
+
+    history = History(c)
+    c.add_port(Port(name="Out", domain=fm, direction="out", width=64))
+    history.undo()
+    history.redo()
+    assert c.p.Out.width == 64
@@ -0,0 +1,60 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq import Circuit
+from cirq.cache import CompileCache
+from cirq.tests import make_mach_zehnder
+
+
+def test_structural_hash():
+    """
+    The structural hash ignores visual properties but follows structural changes.
+    """
+    mz = make_mach_zehnder()[0]
+    h = mz.structural_hash()
+
+    assert Circuit.from_jsonifiable(mz.to_jsonifiable()).structural_hash() == h
+
+    mz.c.b1._x += 100.
+    mz.c.b1.param_assignments = {"theta": 1.}
+    mz.name = "Renamed"
+    assert mz.structural_hash() == h
+
+    c = mz.c.b1.p.Out1.connections_out[0]
+    c.remove()
+    assert mz.structural_hash() != h
+    mz.connect(mz.c.b1.p.Out1, mz.c.phi.p.In1)
+    assert mz.structural_hash() == h
+
+    mz.c.b2.name = "b3"
+    assert mz.structural_hash() != h
+    mz.c.b2.name = "b2"
+    assert mz.structural_hash() == h
+
+
+def test_compile_cache():
+    """
+    Repeated compilation of an unchanged topology hits the cache.
+    """
+    mz = make_mach_zehnder()[0]
+    compiled = []
+    cache = CompileCache(maxsize=1)
+    cache.register("test", lambda c: compiled.append(c.structural_hash()) or len(compiled))
+
+    assert cache.compile(mz, "test") == 1
+    assert cache.compile(mz, "test") == 1
+    mz.c.b1.p.Out1.connections_out[0].remove()
+    assert cache.compile(mz, "test") == 2
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,82 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import random
+
+from cirq.canonical import canonical_hash, canonical_form, deduplicate
+from cirq.tests import make_mach_zehnder
+
+
+def _renamed(obj, seed):
+    # rename and reorder the component instances and connections of a circuit in JSON form
+    rng = random.Random(seed)
+    names = sorted(obj["component_instances"])
+    new_names = ["x{}".format(k) for k in range(len(names))]
+    rng.shuffle(new_names)
+    mapping = dict(zip(names, new_names))
+    mapping[obj["name"]] = obj["name"]
+    connections = [(mapping[sn], spn, mapping[tn], tpn) for sn, spn, tn, tpn in obj["connections"]]
+    rng.shuffle(connections)
+    ret = dict(obj)
+    ret["component_instances"] = {mapping[n]: t for n, t in obj["component_instances"].items()}
+    ret["connections"] = connections
+    return ret
+
+
+def _resistors(pairs, n):
+    # resistors R0..R{n-1}, connecting port n of each first resistor to port p of each second one
+    return {
+        "name": "R",
+        "domains": {"wire": {"causal": False, "one2one": False}},
+        "ports": [],
+        "component_types": {"R": {"ports": [{"name": "p", "domain": "wire", "direction": "inout"},
+                                            {"name": "n", "domain": "wire", "direction": "inout"}]}},
+        "component_instances": {"R{}".format(k): "R" for k in range(n)},
+        "connections": [("R{}".format(a), "n", "R{}".format(b), "p") for a, b in pairs],
+    }
+
+
+def test_canonical_hash():
+    """
+    Renamed circuits share hash and canonical form, edited ones do not, and collisions of the hash are resolved.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    obj = mz.to_jsonifiable()
+    renamed = _renamed(obj, 1)
+    assert canonical_hash(renamed) == mz.canonical_hash()
+    assert canonical_form(renamed) == mz.canonical_form()
+
+    # route the phase shifter into the other arm
+    mz.rename_component(mz.c.phi, "theta")
+    b1, b2, theta = mz.c.b1, mz.c.b2, mz.c.theta
+    b1.p.Out1.connections_out[0].remove()
+    b1.p.Out2.connections_out[0].remove()
+    mz.connect(b1.p.Out2, theta.p.In1)
+    mz.connect(b1.p.Out1, b2.p.In1)
+    assert mz.canonical_hash() != canonical_hash(obj)
+    assert mz.canonical_form() != canonical_form(obj)
+    assert mz.canonical_hash(external_names=True) != mz.canonical_hash()
+
+    # 40 parallel resistors: highly symmetric, but quick thanks to automorphism pruning
+    parallel = _resistors([(0, k) for k in range(1, 40)], 40)
+    assert canonical_form(_renamed(parallel, 2)) == canonical_form(parallel)
+
+    # a hexagon and two triangles are not distinguished by color refinement
+    hexagon = _resistors([(k, (k + 1) % 6) for k in range(6)], 6)
+    triangles = _resistors([(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3)], 6)
+    assert canonical_hash(hexagon) == canonical_hash(triangles)
+    assert canonical_form(hexagon) != canonical_form(triangles)
+
+    corpus = [hexagon, obj, _renamed(triangles, 3), _renamed(hexagon, 4), triangles, renamed]
+    assert deduplicate(corpus) == [[0, 3], [1, 5], [2, 4]]
@@ -0,0 +1,146 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq.collab import ChangeSequencer
+from cirq.tests import make_mach_zehnder
+
+
+def test_concurrent_edits():
+    """
+    Concurrent edits are sequenced, rebased and broadcast to all views.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    seq = ChangeSequencer(mz, log_size=3)
+    received = {1: [], 2: []}
+    v1 = seq.attach(lambda view, delta: received[view.id].append(delta))
+    v2 = seq.attach(lambda view, delta: received[view.id].append(delta))
+    base = v1.version
+
+    # view 1 renames b1, then view 2 (not having seen that) edits b1 and adds a component
+    d1 = v1.submit([("rename_component", "b1", "bs1")])
+    assert d1.version == 1 and d1.origin == v1.id
+    d2 = v2.submit([("disconnect", "b1", "Out1", "phi", "In1"),
+                    ("add_component", "b3", "Beamsplitter", 10., 10.),
+                    ("connect", "b1", "Out1", "b3", "In1")], base_version=base)
+    assert d2.operations == [("disconnect", "bs1", "Out1", "phi", "In1"),
+                             ("add_component", "b3", "Beamsplitter", 10., 10.),
+                             ("connect", "bs1", "Out1", "b3", "In1")]
+    assert mz.c.b3.p.In1.connections_in[0].source is mz.c.bs1.p.Out1
+    assert [d.version for d in received[1]] == [d.version for d in received[2]] == [1, 2]
+
+    # conflicting edits: the first one wins, the second is dropped
+    base = v1.version
+    v1.submit([("remove_component", "b3", "Beamsplitter", 10., 10.)])
+    assert v2.submit([("rename_component", "b3", "b4"), ("add_port", "In3", "fieldmode", "in", 0)],
+                     base_version=base).operations == [("add_port", "In3", "fieldmode", "in", 0)]
+    assert "b4" not in mz.c and mz.ports[0].name == "In3"
+    assert v2.submit([("add_component", "phi", "Phase", 0., 0.)]) is None
+
+    # direct edits are sequenced as well
+    mz.rename("MZ")
+    assert received[2][-1].origin is None and v1.version == v2.version == seq.version == 5
+
+    version, deltas, snapshot = v2.catch_up(4)
+    assert [d.version for d in deltas] == [5] and snapshot is None
+    version, deltas, snapshot = v2.catch_up(0)
+    assert deltas is None and ("add_component", "phi", "Phase", mz.c.phi._x, mz.c.phi._y) in snapshot
+
+    v1.select(mz.c.phi)
+    v2.select(mz.c.bs1)
+    mz.remove_component(mz.c.bs1)
+    assert seq.selections() == {v1.id: mz.c.phi}
+
+
+def test_front_end_views():
+    """
+    Views of the circuit widget keep their own selections, submit their edits through the sequencer
+    and receive all changes as deltas.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    b1, phi = mz.c.b1, mz.c.phi
+    b1.p.Out1.connections_out[0].remove()
+    sent = []
+    mz.send = sent.append
+    mz.handle_element_msg(mz, {"type": "attach_view", "view": "a"})
+    mz.handle_element_msg(mz, {"type": "attach_view", "view": "b"})
+    assert sent == [{"type": "attached", "view": "a", "version": 0}, {"type": "attached", "view": "b", "version": 0}]
+    a, b = mz.front_end_view("a"), mz.front_end_view("b")
+
+    del sent[:]
+    mz.handle_element_msg(b1.p.Out1, {"type": "click", "view": "a"})
+    mz.handle_element_msg(phi, {"type": "click", "view": "b"})
+    assert a.selection is b1.p.Out1 and b.selection is phi
+    assert sent == [{"type": "select_view", "view": "a", "id": b1.p.Out1.model_id},
+                    {"type": "select_view", "view": "b", "id": phi.model_id}]
+    assert mz.selected_element is phi
+
+    # the connection is made by view a and reported to both views
+    del sent[:]
+    mz.handle_element_msg(phi.p.In1, {"type": "click", "view": "a"})
+    c = phi.p.In1.connections_in[0]
+    assert c.source is b1.p.Out1
+    operations = [("connect", "b1", "Out1", "phi", "In1")]
+    assert [m for m in sent if m["type"] == "delta"] == [
+        {"type": "delta", "view": view, "version": 1, "origin": "a", "operations": operations, "ids": [c.model_id]}
+        for view in sorted(["a", "b"], key=lambda k: mz.front_end_view(k).id)]
+
+    # clicking a selected connection deletes it, and view b forgets its removed selection
+    mz.handle_element_msg(c, {"type": "click", "view": "b"})
+    mz.handle_element_msg(c, {"type": "click", "view": "b"})
+    assert phi.p.In1.connections_in == [] and mz.sequencer.version == 2
+    assert b.selection is None and a.selection is b1.p.Out1
+
+    mz.handle_element_msg(mz, {"type": "detach_view", "view": "a"})
+    assert list(mz.sequencer.views) == [b.id]
+
+
+def test_front_end_deltas():
+    """
+    While front-end views are attached, the element lists are not synced in full, deltas refer to added elements
+    by model id and views that are behind catch up.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    sent = []
+    states = []
+    mz.send = sent.append
+    mz._send = states.append
+    mz.handle_element_msg(mz, {"type": "attach_view", "view": "a"})
+    # the front-end's lists are unknown, so they are sent in full
+    assert sorted(states[-1]["state"]) == sorted(mz._delta_traits)
+    assert sent[-1] == {"type": "attached", "view": "a", "version": 0}
+
+    del sent[:], states[:]
+    with mz.changes():
+        mz.add_component(phase_type.make_instance("p2"), 10., 10.)
+        mz.connect(mz.c.b2.p.Out1, mz.c.p2.p.In1, verify=False)
+        mz.rename_component(mz.c.p2, "p3")
+        mz.c.p3.p.In1.connections_in[0].remove()
+        mz.connect(mz.c.b2.p.Out1, mz.c.p3.p.In1, verify=False)
+    mz.selection = [mz.c.b1]
+    assert [m["state"].keys() for m in states] == [["selection"]]
+    delta = sent[-1]
+    assert [op[0] for op in delta["operations"]] == ["add_component", "connect", "rename_component",
+                                                     "disconnect", "connect"]
+    assert delta["ids"] == [mz.c.p3.model_id, None, None, None, mz.c.p3.p.In1.connections_in[0].model_id]
+
+    # a front-end view that has missed a delta is sent it again
+    del sent[:], states[:]
+    mz.handle_element_msg(mz, {"type": "catch_up", "view": "a", "version": 0})
+    assert [m["type"] for m in sent] == ["delta", "caught_up"] and sent[0]["ids"] == delta["ids"]
+    assert sent[-1]["version"] == 1 and not states
+
+    # without attached views, the lists are synced as before
+    mz.handle_element_msg(mz, {"type": "detach_view", "view": "a"})
+    mz.remove_component(mz.c.p3)
+    assert "component_instances" in states[-1]["state"]
@@ -0,0 +1,46 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq.tests import make_mach_zehnder
+
+
+def test_connectivity_index():
+    """
+    Verify that the connectivity index follows connections being added and removed.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    b1, b2, phi = mz.c.b1, mz.c.b2, mz.c.phi
+
+    assert mz.unconnected_ports() == []
+    assert mz.degree_histogram() == {1: 16}
+    assert set(mz.adjacent_instances(b1)) == {mz, phi, b2}
+    assert mz.fan_out(b1.p.Out1) == 1 and mz.fan_in(b1.p.Out1) == 0
+
+    b1.p.Out1.connections_out[0].remove()
+    assert set(mz.unconnected_ports(fm)) == {b1.p.Out1, phi.p.In1}
+    assert mz.unconnected_ports(el) == []
+    assert set(mz.adjacent_instances(b1)) == {mz, b2}
+
+    b3 = bs_type.make_instance("b3")
+    mz.component_instances = mz.component_instances + [b3]
+    assert mz.degree_histogram() == {0: 6, 1: 14}
+
+    mz.connect(b1.p.Out1, b3.p.In1)
+    assert mz.degree(b3.p.In1) == 1
+    assert mz.adjacent_instances(b3) == [b1]
+
+    mz.component_instances = [c for c in mz.component_instances if c is not b3]
+    b3.p.In1.connections_in[0].remove()
+    assert mz.degree_histogram() == {0: 2, 1: 14}
+    assert b3 not in mz.adjacent_instances(b1)
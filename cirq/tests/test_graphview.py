@@ -0,0 +1,64 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq.core import Domain, ComponentType, Circuit, inouts, inputs, outputs
+from cirq.graphview import CircuitGraph
+
+
+def test_graphview():
+    """
+    Check that the graph mappings follow changes of the circuit.
+    """
+    net = Domain(name="net", causal=False)
+    sig = Domain(name="sig", causal=True)
+    part = ComponentType(name="Part", ports=inouts(["a", "b"], net) + inputs(["i"], sig) + outputs(["o"], sig))
+    c = Circuit(name="c", ports=inouts(["GND"], net),
+                component_instances=[part.make_instance(n) for n in ("x", "y", "z")])
+    cx, cy, cz = c.c.x, c.c.y, c.c.z
+    c.connect(cx.p.b, cy.p.a)
+    c.connect(cx.p.o, cy.p.i)
+    c.connect(c.p.GND, cx.p.a)
+
+    ports = CircuitGraph(c)
+    assert len(ports.nodes) == 13
+    assert cx.p.a in ports.nodes and "x" not in ports.nodes
+    assert set(ports.adjacency()[cx.p.a]) == {c.p.GND}
+
+    nets = CircuitGraph(c, domain=net)
+    assert len(nets.nodes) == 7 and cx.p.o not in nets.nodes
+
+    instances = CircuitGraph(c, level="instances")
+    adj = instances.adjacency()
+    assert set(adj[cx]) == {cy} and len(adj[cx][cy]) == 2
+    assert len(adj[cz]) == 0
+    successors = instances.adjacency(incoming=False)
+    assert set(successors[cx]) == {cy} and len(successors[cy]) == 0
+
+    conn = c.connect(cy.p.b, cz.p.a)
+    assert set(adj[cy]) == {cx, cz}
+    assert list(adj[cz][cy]) == [conn]
+    c.remove_component(cx)
+    assert set(adj[cy]) == {cz}
+    assert len(instances.nodes) == 2 and cx not in instances.nodes
+    assert len(ports.nodes) == 9 and cx.p.a not in ports.nodes
+    assert len(ports.adjacency()[c.p.GND]) == 0
+
+    try:
+        import networkx as nx
+    except ImportError:
+        return
+    g = c.graph_view(level="instances")
+    assert nx.number_connected_components(g) == 1
+    c.remove_component(cz)
+    assert nx.number_connected_components(g) == 1 and g.number_of_nodes() == 1
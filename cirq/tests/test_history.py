@@ -0,0 +1,150 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq import Port, CircuitBuilder, ComponentType, Domain, inouts
+from cirq.history import History, OperationLog
+from cirq.tests import make_mach_zehnder
+
+
+def _normalized(mz):
+    # undo restores connections, but not their order in the connections list
+    ret = mz.to_jsonifiable()
+    ret["connections"] = sorted(ret["connections"])
+    return ret
+
+
+def _edit(mz, bs_type, fm):
+    mz.remove_component(mz.c.b2)
+    mz.rename_component(mz.c.phi, "theta")
+    mz.add_component(bs_type.make_instance("b3"), x=10., y=20.)
+    mz.connect(mz.c.theta.p.Out1, mz.c.b3.p.In1)
+    mz.add_port(Port(name="In3", domain=fm, direction="in"), 0)
+    mz.move_port(mz.p.In3, 2)
+    mz.rename_port(mz.p.In3, "Aux")
+    mz.rename("MZ2")
+    mz.c.b1.p.In1.connections_in[0].remove()
+
+
+def test_undo_redo():
+    """
+    Undoing all edits restores the original circuit, redoing them restores the edited one.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    original = _normalized(mz)
+    history = History(mz)
+
+    _edit(mz, bs_type, fm)
+    edited = _normalized(mz)
+    assert edited != original
+
+    while history.undo():
+        pass
+    assert _normalized(mz) == original
+
+    while history.redo():
+        pass
+    assert _normalized(mz) == edited
+    assert mz.c.b3._x == 10.
+
+    history.undo()
+    mz.rename("Other")
+    assert not history.can_redo()
+
+
+def test_operation_log_replay():
+    """
+    Replaying the operation log reconstructs the circuit.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    log = OperationLog(mz)
+    _edit(mz, bs_type, fm)
+
+    mz2 = log.replay()
+    assert _normalized(mz2) == _normalized(mz)
+    assert mz2.structural_hash() == mz.structural_hash()
+
+
+def test_builder_undo():
+    """
+    Deleting a component in the CircuitBuilder can be undone.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    original = _normalized(mz)
+    cb = CircuitBuilder([fm, el], [bs_type, phase_type], mz)
+
+    mz.selected_element = mz.c.phi
+    cb.delete_selected_component()
+    assert "phi" not in mz.c
+    assert len(mz.connections) == 5
+
+    cb.undo()
+    assert _normalized(mz) == original
+    cb.redo()
+    assert "phi" not in mz.c
+
+
+def test_undo_delete_keeps_state():
+    """
+    Undoing the deletion of a component restores its parameters, visual overrides and array data.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    mz.c.phi.param_assignments = {"phi": .5}
+    mz.c.phi._inner_color = "green"
+    a = bs_type.make_array("a", 3)
+    a.set_column("theta", [.1, .2, .3])
+    a.element_y[1] = 25.
+    mz.add_component(a, x=10., y=20.)
+    history = History(mz)
+    log = OperationLog(mz)
+
+    mz.remove_elements([mz.c.phi, mz.c.a])
+    assert "phi" not in mz.c and "a" not in mz.c
+    history.undo()
+    phi, a = mz.c.phi, mz.c.a
+    assert phi.param_assignments == {"phi": .5} and phi._inner_color == "green"
+    assert a.param_columns == {"theta": [.1, .2, .3]} and list(a.element_y) == [0., 25., 0.]
+    assert a[2].param_assignments == {"theta": .3} and (a._x, a._y) == (10., 20.)
+
+    # redo and undo again, then replay the log of all of it
+    history.redo()
+    history.undo()
+    assert mz.c.a.param_columns == {"theta": [.1, .2, .3]}
+    mz2 = log.replay()
+    assert mz2.c.phi.param_assignments == {"phi": .5} and list(mz2.c.a.element_y) == [0., 25., 0.]
+
+
+def test_add_and_rename_in_one_change():
+    """
+    Instances and ports that are added and then renamed or removed within one change are recorded.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    original = _normalized(mz)
+    history = History(mz)
+    log = OperationLog(mz)
+    dc = Domain(name="dc", causal=False)
+    wire = ComponentType(name="Wire", ports=inouts(["p", "n"], dc))
+    with mz.changes():
+        mz.add_component(wire.make_instance("w"))
+        mz.rename_component(mz.c.w, "v")
+        mz.add_component(wire.make_instance("u"))
+        mz.remove_component(mz.c.u)
+        mz.add_port(Port(name="V", domain=dc, direction="inout"))
+        mz.remove_port(mz.p.V)
+    assert history.can_undo()
+    assert "v" in log.replay().c
+
+    history.undo()
+    assert _normalized(mz) == original
+    history.redo()
+    assert mz.c.v.ctype is wire
@@ -0,0 +1,58 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq import Circuit, HandlerStats, instrument
+from cirq.tests import make_mach_zehnder
+
+
+def test_instrument():
+    """
+    Handler statistics are only recorded inside the `instrument` block.
+    """
+    mz = make_mach_zehnder()[0]
+    original = Circuit.__dict__["_connections_changed"]
+
+    with instrument() as stats:
+        assert Circuit.__dict__["_connections_changed"] is not original
+        mz.c.b1.p.Out1.connections_out[0].remove()
+        mz.handle_element_msg(mz.c.b1.p.Out1, "click")
+        mz.handle_element_msg(mz.c.phi.p.In1, "click")
+
+    assert Circuit.__dict__["_connections_changed"] is original
+    assert stats.calls["Circuit._connections_changed"] == 2
+    assert stats.payload["Circuit._connections_changed"] == 7 + 8
+    assert stats.calls["msg:Port:click"] == 2
+    assert stats.calls["sync:Circuit"] > 0
+    assert "msg:Port:click" in repr(stats)
+
+    mz.c.b1.p.Out1.connections_out[0].remove()
+    assert stats.calls["Circuit._connections_changed"] == 2
+
+    # a nested block records into the outer statistics and does not end the outer block
+    with instrument() as outer:
+        with instrument() as inner:
+            mz.connect(mz.c.b1.p.Out1, mz.c.phi.p.In1)
+        assert inner is outer
+        mz.c.b1.p.Out1.connections_out[0].remove()
+        with instrument(outer):
+            pass
+        try:
+            with instrument(HandlerStats()):
+                pass
+            assert False
+        except ValueError:
+            pass
+        assert Circuit.__dict__["_connections_changed"] is not original
+    assert Circuit.__dict__["_connections_changed"] is original
+    assert outer.calls["Circuit._connections_changed"] == 2
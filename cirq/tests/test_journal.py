@@ -0,0 +1,88 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import os
+import shutil
+import tempfile
+
+from cirq import ComponentType, Domain, Port, inouts
+from cirq.journal import Journal, recover
+from cirq.tests import make_mach_zehnder
+
+
+def _normalized(mz):
+    ret = mz.to_jsonifiable()
+    ret["connections"] = sorted(ret["connections"])
+    return ret
+
+
+def test_journal_recover():
+    """
+    A circuit can be recovered from its snapshot and journal, also after compaction.
+    """
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, "mz.json")
+        mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+        journal = Journal(mz, path, compact_every=4)
+
+        mz.remove_component(mz.c.b2)
+        mz.rename_component(mz.c.phi, "theta")
+        mz.add_component(bs_type.make_instance("b2"))
+        mz.connect(mz.c.theta.p.Out1, mz.c.b2.p.In2)
+        assert journal.generation == 2
+
+        dc = Domain(name="dc", causal=False)
+        resistor = ComponentType(name="Resistor", ports=inouts(["p", "n"], dc))
+        mz.add_component(resistor.make_instance("r1"))
+        mz.add_port(Port(name="V", domain=dc, direction="inout"))
+        mz.connect(mz.p.V, mz.c.r1.p.p)
+        assert _normalized(recover(path)) == _normalized(mz)
+
+        # simulate a torn write
+        with open(path + ".journal", "a") as journal_file:
+            journal_file.write('{"operations": [["rename_circ')
+        assert _normalized(recover(path)) == _normalized(mz)
+
+        journal.close()
+        assert _normalized(recover(path)) == _normalized(mz)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_journal_add_and_remove_in_one_change():
+    """
+    New types of instances that are renamed or removed within the change that added them are journaled.
+    """
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, "mz.json")
+        mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+        journal = Journal(mz, path)
+        dc = Domain(name="dc", causal=False)
+        resistor = ComponentType(name="Resistor", ports=inouts(["p", "n"], dc))
+        coil = ComponentType(name="Coil", ports=inouts(["p", "n"], dc))
+        with mz.changes():
+            mz.add_component(resistor.make_instance("r1"))
+            mz.rename_component(mz.c.r1, "r2")
+            mz.add_component(coil.make_instance("l1"))
+            mz.remove_component(mz.c.l1)
+            mz.add_port(Port(name="V", domain=dc, direction="inout"))
+            mz.rename_port(mz.p.V, "W")
+        recovered = recover(path)
+        assert recovered.c.r2.ctype.name == "Resistor" and recovered.p.W.domain.name == "dc"
+        assert _normalized(recovered) == _normalized(mz)
+        journal.close()
+    finally:
+        shutil.rmtree(tmpdir)
@@ -0,0 +1,57 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import os
+import subprocess
+import sys
+
+import cirq
+from cirq import jsonmodel
+from cirq.benchmarks import build_circuit, run_startup_benchmarks
+
+
+def _refs(circuit, nets):
+    # noinspection PyProtectedMember
+    return sorted(sorted(circuit._port_ref(p) for p in net) for net in nets)
+
+
+def test_jsonmodel():
+    """
+    Compare the nets computed on the JSON representation with those of the Circuit.
+    """
+    circuit, domain, pairs = build_circuit("resistors", 20)
+    for s, t in pairs:
+        circuit.connect(s, t, verify=False)
+    obj = circuit.to_jsonifiable()
+
+    nets = jsonmodel.get_nets(obj, "net")
+    assert sorted(sorted(net) for net in nets) == _refs(circuit, circuit.get_nets(domain))
+    assert len(jsonmodel.ports(obj)) == 40
+    assert jsonmodel.ports(obj, "other") == []
+
+
+def test_lazy_import():
+    """
+    Check that importing cirq does not import IPython and that public names resolve on access.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(cirq.__file__)))
+    out = subprocess.check_output([sys.executable, "-c",
+                                   "import sys, cirq; sys.stdout.write(str('IPython' in sys.modules))"], env=env)
+    assert out == "False"
+    assert cirq.Circuit.__name__ == "Circuit"
+    assert "Circuit" in dir(cirq)
+
+    results = run_startup_benchmarks(size=4, names=["startup_import", "startup_json_nets"], repeat=1)
+    assert [r["benchmark"] for r in results] == ["startup_import", "startup_json_nets"]
@@ -0,0 +1,75 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import os
+import shutil
+import tempfile
+
+from cirq import ComponentType, CircuitBuilder
+from cirq.library import ComponentLibrary, save_library
+from cirq.workspace import Workspace
+from cirq.tests import make_mach_zehnder
+
+
+def _square_layout(ct, ports):
+    for k, p in enumerate(ports):
+        p._x, p._y, p._phi = 10. * k, -5., 0.
+
+
+def test_library():
+    """
+    Component types are loaded lazily from the index and keep their visual options.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    bs_type.params = ["theta"]
+    bs_type._inner_svg = "<rect/>"
+    bs_type._layout_ports = _square_layout
+    bs_type.layout_ports(bs_type.ports)
+    extra = [ComponentType(name="Part{}".format(k), ports=[p.clone() for p in phase_type.ports])
+             for k in range(50)]
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, "optics.cirqlib")
+        save_library(path, [bs_type, phase_type] + extra)
+
+        lib = ComponentLibrary(path)
+        assert len(lib) == 52 and "Phase" in lib
+        assert lib.index["Beamsplitter"]["params"] == ["theta"]
+        assert not any(lib.is_loaded(n) for n in lib.names())
+        assert lib.domains["electrical"]._color == "purple"
+
+        bs = lib["Beamsplitter"]
+        assert lib.is_loaded("Beamsplitter") and not lib.is_loaded("Phase")
+        assert bs is lib["Beamsplitter"]
+        assert bs._inner_svg == "<rect/>" and bs.params == ["theta"]
+        assert [(p.name, p.direction, p._x) for p in bs.ports] == [(p.name, p.direction, p._x) for p in bs_type.ports]
+        assert bs.ports[0].domain is lib.domains["fieldmode"]
+
+        assert [ct.name for ct in lib.load_all()] == lib.names()
+
+        ws = Workspace()
+        ws.add(mz)
+        shared = ComponentLibrary(path, registry=ws)
+        assert shared["Phase"] is phase_type
+        assert shared.domains["fieldmode"] is fm
+
+        builder = CircuitBuilder([fm, el], ComponentLibrary(path), "Test")
+        builder._add_comp_search.value = "Part7"
+        builder._add_comp_name.value = "x"
+        builder._add_component()
+        assert builder.circuit.c.x.ctype.name == "Part7"
+        assert not builder.library.is_loaded("Part8")
+    finally:
+        shutil.rmtree(tmpdir)
@@ -0,0 +1,57 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq import ComponentType, CircuitBuilder
+from cirq.palette import ComponentIndex
+from cirq.tests import make_mach_zehnder
+
+
+def test_palette():
+    """
+    Search ranks exact, prefix, parameter and fuzzy matches and the builder only offers the top matches.
+    """
+    index = ComponentIndex([("Beamsplitter", ["theta"]),
+                            ("Beam", []),
+                            ("Phase", ["phi"]),
+                            ("PolarizingBeamsplitter", ["angle"]),
+                            ("Thermometer", [])])
+    assert index.search("beam") == ["Beam", "Beamsplitter", "PolarizingBeamsplitter"]
+    assert index.search("the") == ["Thermometer", "Beamsplitter"]
+    assert index.search("splitter") == ["Beamsplitter", "PolarizingBeamsplitter"]
+    assert index.search("") == index.names
+    assert index.search("b", limit=1) == ["Beam"]
+
+    index.add("Attenuator", ["loss"])
+    assert index.search("")[0] == "Attenuator"
+    assert index.search("los") == ["Attenuator"]
+
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    parts = [ComponentType(name="Part{:04d}".format(k), ports=[p.clone() for p in phase_type.ports])
+             for k in range(200)]
+    builder = CircuitBuilder([fm, el], [bs_type, phase_type] + parts, "Test", palette_size=10)
+    assert len(builder._add_comp_type.values) == 10
+    builder._add_comp_search.value = "part0123"
+    assert builder._add_comp_type.value_name == "Part0123"
+    builder._add_comp_search.value = "phas"
+    assert builder._add_comp_type.values.keys() == ["Phase"]
+    # the dropdown keeps the ranking of the search
+    builder._add_comp_search.value = "part01"
+    ranked = builder._palette.search("part01", 10)
+    assert builder._add_comp_type.values.keys() == builder._add_comp_type.value_names == ranked
+    assert builder._add_comp_type.value_name == ranked[0]
+
+    # without any components the search field still works
+    empty = CircuitBuilder([fm, el], [], "Empty")
+    empty._add_comp_search.value = "phas"
+    assert empty._add_comp_type.values == {}
@@ -0,0 +1,47 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq.params import ParameterStore, sweep
+from cirq.tests import make_mach_zehnder
+
+
+def _total_phase(compiled, store):
+    return compiled, store.column("Phase", "phi").sum() + store.get("b1", "theta")
+
+
+def test_parameter_sweep():
+    """
+    Sweep the parameters of the Mach-Zehnder circuit, serially and with a process pool.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    phase_type.params = ["phi"]
+    mz.c.b1.param_assignments = {"theta": .5}
+
+    store = ParameterStore.from_circuit(mz)
+    assert store.rows["Phase"] == ["phi"]
+    assert store.get("b1", "theta") == .5
+    assert store.assignments("b2") == {}
+
+    store.assign(("Beamsplitter", "theta"), 2.)
+    store.write_back(mz)
+    assert mz.c.b2.param_assignments == {"theta": 2.}
+
+    axes = [(("phi", "phi"), [0., 1.]), (("b1", "theta"), [10., 20., 30.])]
+    compiled = []
+    serial = sweep(mz, lambda c: compiled.append(c) or "netlist", _total_phase, axes)
+    assert len(compiled) == 1
+    assert [r for _, r in serial] == [("netlist", v) for v in [10., 20., 30., 11., 21., 31.]]
+
+    parallel = sweep(mz, lambda c: "netlist", _total_phase, axes, processes=2)
+    assert parallel == serial
@@ -0,0 +1,91 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq import Circuit, ComponentType, Domain, inouts, outputs, inputs
+from cirq.partition import simulate_partitions
+
+
+def _count_ports(circuit):
+    return {p.name: len(p.connections_in) + len(p.connections_out) for p in circuit.ports}
+
+
+def test_partition():
+    """
+    Loosely coupled blocks end up in separate partitions connected by matching boundary ports.
+    """
+    net = Domain(name="net", causal=False)
+    fm = Domain(name="fieldmode", causal=True, one2one=True)
+    res = ComponentType(name="Resistor", ports=inouts(["p", "n"], net))
+    amp = ComponentType(name="Amp", ports=inputs(["In1"], fm) + outputs(["Out1"], fm))
+
+    # four rings of eight resistors, consecutive rings joined by a single connection
+    rings = [[res.make_instance("r{}_{}".format(b, k)) for k in range(8)] for b in range(4)]
+    a1, a2 = amp.make_instance("a1"), amp.make_instance("a2")
+    circuit = Circuit(name="Rings", ports=inputs(["In1"], fm),
+                      component_instances=sum(rings, []) + [a1, a2])
+    for ring in rings:
+        for k, r in enumerate(ring):
+            circuit.connect(r.p.n, ring[(k + 1) % len(ring)].p.p)
+    for b in range(3):
+        circuit.connect(rings[b][4].p.p, rings[b + 1][0].p.n)
+    circuit.connect(circuit.p.In1, a1.p.In1)
+    circuit.connect(a1.p.Out1, a2.p.In1)
+
+    parts = circuit.partition(2)
+    sizes = sorted(len(p.component_instances) for p in parts)
+    assert sum(sizes) == 34 and sizes[1] - sizes[0] <= 2
+    cut = [p for p in parts[0].ports if p.name != "In1"]
+    assert len(cut) <= 2
+    for p in cut:
+        assert p.name in parts[1].p
+
+    parts = circuit.partition(4)
+    sizes = sorted(len(p.component_instances) for p in parts)
+    assert sum(sizes) == 34 and sizes[-1] - sizes[0] <= 2
+    n_cut = sum(len(p.ports) for p in parts) - 1
+    assert n_cut <= 2 * 4
+
+    # the copies are independent of the original circuit
+    assert all(p.validate() == [] for p in parts)
+    assert parts[0].component_instances[0] not in circuit.component_instances
+
+    stitched = simulate_partitions(parts, _count_ports, dict, processes=2)
+    assert [k for k, _ in stitched["In1"]] == [k for k, p in enumerate(parts) if "In1" in p.p]
+    assert all(len(v) == 2 for name, v in stitched.items() if name != "In1")
+
+
+def test_partition_arrays():
+    """
+    Instance arrays are copied with their size and state, ports synthesized at the boundary have the width
+    of the bus ports they stand in for.
+    """
+    fm = Domain(name="fieldmode", causal=True, one2one=True)
+    amp = ComponentType(name="Amp", ports=inputs(["In1"], fm) + outputs(["Out1"], fm))
+    arrays = [amp.make_array("arr{}".format(k), 3) for k in range(4)]
+    arrays[0].collapsed = False
+    arrays[3]._inner_color = "#000000"
+    circuit = Circuit(name="Arrays", ports=inputs(["Bus"], fm), component_instances=arrays)
+    circuit.p.Bus.width = 3
+    circuit.connect(circuit.p.Bus, arrays[0].p.In1)
+    for a, b in zip(arrays, arrays[1:]):
+        circuit.connect(a.p.Out1, b.p.In1)
+
+    parts = circuit.partition(2)
+    copies = {ci.name: ci for part in parts for ci in part.component_instances}
+    assert sorted(copies) == ["arr0", "arr1", "arr2", "arr3"] and all(ci.size == 3 for ci in copies.values())
+    assert not copies["arr0"].collapsed and copies["arr3"]._inner_color == "#000000"
+    assert sum(len(part.ports) for part in parts) == 3
+    assert all(p.width == 3 for part in parts for p in part.ports)
+    assert all(part.validate() == [] for part in parts)
+    assert sum(len(part.connections) for part in parts) == 5
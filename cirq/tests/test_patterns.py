@@ -0,0 +1,94 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq import Circuit, ComponentType, Domain, clone_ports, inouts
+from cirq.patterns import find_matches, rewrite
+from cirq.tests import make_mach_zehnder
+
+
+def _two_stage(bs_type, phase_type, ports):
+    b1, b2, b3, b4 = [bs_type.make_instance("b{}".format(k)) for k in range(1, 5)]
+    phi1, phi2 = [phase_type.make_instance("phi{}".format(k)) for k in range(1, 3)]
+    host = Circuit(name="TwoStage", ports=clone_ports(ports), component_instances=[b1, b2, b3, b4, phi1, phi2])
+    for s, t in [(host.p.In1, b1.p.In1), (host.p.In2, b1.p.In2),
+                 (b1.p.Out1, phi1.p.In1), (b1.p.Out2, b2.p.In1), (phi1.p.Out1, b2.p.In2),
+                 (b2.p.Out1, b3.p.In1), (b2.p.Out2, b3.p.In2),
+                 (b3.p.Out1, phi2.p.In1), (b3.p.Out2, b4.p.In1), (phi2.p.Out1, b4.p.In2),
+                 (b4.p.Out1, host.p.Out1), (b4.p.Out2, host.p.Out2),
+                 (host.p.Control, phi1.p.Control), (host.p.Control, phi2.p.Control)]:
+        host.connect(s, t)
+    return host
+
+
+def test_match_and_rewrite():
+    """
+    Two Mach-Zehnder stages are found and replaced by compiled blocks.
+    """
+    pattern, fm, el, bs_type, phase_type = make_mach_zehnder()
+    host = _two_stage(bs_type, phase_type, pattern.ports)
+
+    matches = find_matches(host, pattern)
+    assert sorted(sorted((k, ci.name) for k, ci in m.items()) for m in matches) == [
+        [("b1", "b1"), ("b2", "b2"), ("phi", "phi1")],
+        [("b1", "b3"), ("b2", "b4"), ("phi", "phi2")]]
+    assert len(find_matches(host, pattern, overlapping=True)) == 2
+    assert len(find_matches(host, pattern, limit=1)) == 1
+
+    # a missing internal connection prevents a match
+    host.c.b3.p.Out2.connections_out[0].remove()
+    assert len(find_matches(host, pattern)) == 1
+    host.connect(host.c.b3.p.Out2, host.c.b4.p.In1)
+
+    changes = []
+    updates = []
+    host.on_operations(lambda c, ops: changes.append(ops))
+    host.on_trait_change(lambda name, new: updates.append(name), "component_instances")
+    host.on_trait_change(lambda name, new: updates.append(name), "connections")
+    mz1, mz2 = rewrite(host, pattern)
+    assert len(changes) == 1
+    # each list is updated once by the removal and once by the addition, regardless of the number of matches
+    assert sorted(updates) == ["component_instances", "component_instances", "connections", "connections"]
+    assert sorted(host.c.keys()) == ["machzehnder1", "machzehnder2"]
+    assert mz1.ctype.name == "MachZehnder"
+    assert {(c.source, c.target) for c in host.connections} == {
+        (host.p.In1, mz1.p.In1), (host.p.In2, mz1.p.In2),
+        (mz1.p.Out1, mz2.p.In1), (mz1.p.Out2, mz2.p.In2),
+        (mz2.p.Out1, host.p.Out1), (mz2.p.Out2, host.p.Out2),
+        (host.p.Control, mz1.p.Control), (host.p.Control, mz2.p.Control)}
+    assert host.validate(allow_unconnected=False) == []
+
+
+def test_match_acausal_orientation():
+    """
+    Connections in non-causal domains match regardless of their orientation in the host.
+    """
+    el = Domain(name="electrical", causal=False)
+    res = ComponentType(name="Resistor", ports=inouts(["p", "n"], el))
+    r1, r2 = res.make_instance("r1"), res.make_instance("r2")
+    pattern = Circuit(name="Series", ports=inouts(["A", "B"], el), component_instances=[r1, r2])
+    for s, t in [(pattern.p.A, r1.p.p), (r1.p.n, r2.p.p), (r2.p.n, pattern.p.B)]:
+        pattern.connect(s, t)
+
+    h1, h2, h3 = [res.make_instance("h{}".format(k)) for k in range(1, 4)]
+    host = Circuit(name="Host", ports=inouts(["A", "B"], el), component_instances=[h1, h2, h3])
+    # h2.p -> h1.n is the reverse of the pattern's orientation
+    for s, t in [(host.p.A, h1.p.p), (h2.p.p, h1.p.n), (h2.p.n, h3.p.p), (h3.p.n, host.p.B)]:
+        host.connect(s, t)
+    assert sorted((m["r1"].name, m["r2"].name) for m in find_matches(host, pattern, overlapping=True)) == [
+        ("h1", "h2"), ("h2", "h3")]
+
+    # the connected ports still have to agree
+    host.c.h2.p.p.connections_out[0].remove()
+    host.connect(host.c.h1.p.n, host.c.h2.p.n)
+    assert find_matches(host, pattern, overlapping=True) == []
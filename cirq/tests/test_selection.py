@@ -0,0 +1,86 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq import CircuitBuilder
+from cirq.tests import make_mach_zehnder
+
+
+def test_selection():
+    """
+    Select a region, then move, copy, paste and delete it in single batched updates, and undo the deletion.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    cb = CircuitBuilder([fm, el], [bs_type, phase_type], mz)
+    b1, b2, phi = mz.c.b1, mz.c.b2, mz.c.phi
+    inner = [c for c in mz.connections if c.source._parent in (b1, phi) and c.target._parent in (b1, phi)]
+    assert len(inner) == 1
+
+    # box selection as sent by the front-end, foreign ids are ignored
+    mz.handle_element_msg(mz, {"type": "select", "ids": [b1.model_id, phi.model_id, inner[0].model_id,
+                                                         cb.model_id]})
+    assert mz.selection == [b1, phi, inner[0]]
+
+    x, y = b1._x, b1._y
+    cb.move_selection(5., -5.)
+    assert (b1._x, b1._y) == (x + 5., y - 5.)
+    mz.handle_element_msg(b1, {"type": "move", "ids": [b1.model_id, phi.model_id], "dx": 1., "dy": 1.})
+    assert (b1._x, b1._y) == (x + 6., y - 4.)
+
+    cb.copy_selection()
+    cb.paste()
+    assert sorted(mz.c) == ["b1", "b1_1", "b2", "phi", "phi_1"]
+    assert mz.c.b1_1._x == b1._x + 40.
+    assert [c.target for c in mz.c.b1_1.p.Out1.connections_out] == [mz.c.phi_1.p.In1]
+    assert set(mz.selection) == set([mz.c.b1_1, mz.c.phi_1] + mz.c.phi_1.p.In1.connections_in)
+
+    n_connections = len(mz.connections)
+    before = mz.to_jsonifiable()
+    mz.selection = [b2, mz.p.In1, mz.p.Out2]
+    cb.delete_selection()
+    assert "b2" not in mz.c and "In1" not in mz.p and "Out2" not in mz.p
+    assert len(mz.connections) == n_connections - 5
+    assert not b1.p.Out2.connections_out and not mz.selection
+    assert all(c.source._parent is not b2 for c in phi.p.Out1.connections_out)
+
+    cb.history.undo()
+    after = mz.to_jsonifiable()
+    assert sorted(after["connections"]) == sorted(before["connections"])
+    assert [p["name"] for p in after["ports"]] == [p["name"] for p in before["ports"]]
+
+    # clicking an element ends the multi-selection
+    mz.selection = [b1]
+    mz.handle_element_msg(phi, "click")
+    assert mz.selection == [] and mz.selected_element is phi
+
+
+def test_copy_arrays():
+    """
+    Copies of instance arrays keep their per-element parameters and offsets.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    a = bs_type.make_array("a", 3)
+    a.param_assignments = {"theta": 0.}
+    a.set_column("theta", [.1, .2, .3])
+    a.element_y[2] = 15.
+    mz.add_component(a, x=100., y=100.)
+
+    copied = mz.copy_elements([a])
+    a.param_columns["theta"][0] = 1.
+    new, = mz.paste_elements(copied)
+    new2, = mz.paste_elements(copied)
+    assert new.name == "a_1" and new.size == 3 and (new._x, new._y) == (140., 140.)
+    assert new.param_assignments == {"theta": 0.} and new.param_columns == {"theta": [.1, .2, .3]}
+    assert list(new.element_y) == [0., 0., 15.] and new[2].position == (140. + new.element_x[2], 155.)
+    new.element_y[0] = 5.
+    assert list(new2.element_y) == [0., 0., 15.]
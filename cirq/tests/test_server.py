@@ -0,0 +1,93 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import json
+import shutil
+import tempfile
+import threading
+import urllib2
+
+from cirq.server import CircuitServer, CircuitStore
+from cirq.tests import make_mach_zehnder
+
+
+def _request(base, method, path, body=None):
+    data = json.dumps(body) if body is not None else None
+    request = urllib2.Request(base + path, data=data)
+    request.get_method = lambda: method
+    try:
+        response = urllib2.urlopen(request)
+    except urllib2.HTTPError as e:
+        return e.code, json.loads(e.read())
+    return response.getcode(), json.loads(response.read())
+
+
+def test_server():
+    """
+    Circuits can be stored, queried and edited over HTTP on localhost.
+    """
+    tmpdir = tempfile.mkdtemp()
+    store = CircuitStore(tmpdir, maxsize=1)
+    server = CircuitServer(("127.0.0.1", 0), store)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    base = "http://127.0.0.1:{}".format(server.server_address[1])
+    try:
+        mz = make_mach_zehnder()[0]
+        assert _request(base, "PUT", "/circuits/MachZehnder", mz.to_jsonifiable()) == (201, {"name": "MachZehnder"})
+        assert _request(base, "GET", "/circuits") == (200, ["MachZehnder"])
+        assert _request(base, "GET", "/circuits/MachZehnder/validate") == (200, {"problems": []})
+
+        status, nets = _request(base, "GET", "/circuits/MachZehnder/nets?domain=electrical")
+        assert status == 200 and nets == [[[None, "Control"], ["phi", "Control"]]]
+        assert _request(base, "GET", "/circuits/MachZehnder/nets?domain=foo")[0] == 404
+
+        ref = {"source": ["b1", "Out1"], "target": ["phi", "In1"]}
+        assert _request(base, "POST", "/circuits/MachZehnder/disconnect", ref) == (200, {"connections": 7})
+        assert _request(base, "POST", "/circuits/MachZehnder/disconnect", ref)[0] == 404
+        status, problems = _request(base, "GET", "/circuits/MachZehnder/validate?allow_unconnected=0")
+        assert len(problems["problems"]) == 2
+        assert _request(base, "POST", "/circuits/MachZehnder/connect", ref) == (200, {"connections": 8})
+        assert _request(base, "POST", "/circuits/MachZehnder/connect", ref)[0] == 409
+
+        ops = {"operations": [["rename_component", "phi", "phase"], ["rename_circuit", "MachZehnder", "MZ"]]}
+        assert _request(base, "POST", "/circuits/MachZehnder/operations", ops)[0] == 200
+
+        # the name in the body has to match the URL
+        assert _request(base, "PUT", "/circuits/Other", mz.to_jsonifiable())[0] == 400
+        assert "Other" not in store
+
+        # evict the parsed circuit, the edits were saved
+        mz.rename("Other")
+        assert _request(base, "PUT", "/circuits/Other", mz.to_jsonifiable())[0] == 201
+        misses = store.misses
+        status, obj = _request(base, "GET", "/circuits/MachZehnder/export")
+        assert status == 200 and obj["name"] == "MZ" and "phase" in obj["component_instances"]
+        assert store.misses == misses + 1
+        _request(base, "GET", "/circuits/MachZehnder")
+        assert store.hits >= 1
+
+        assert _request(base, "DELETE", "/circuits/Other") == (200, {"name": "Other"})
+        assert _request(base, "GET", "/circuits/Other")[0] == 404
+        assert _request(base, "GET", "/circuits/..%2Fetc")[0] == 400
+
+        # unexpected errors are reported as JSON
+        store.names = lambda: 1 / 0
+        status, obj = _request(base, "GET", "/circuits")
+        assert status == 500 and "ZeroDivisionError" in obj["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(tmpdir)
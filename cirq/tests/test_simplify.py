@@ -0,0 +1,97 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from cirq import Circuit, ComponentType, Domain, Connection, inputs, outputs, inouts
+from cirq.simplify import simplify, RemoveIdentities, CollapseSeriesChains, MergeParallelConnections
+
+
+def test_simplify():
+    """
+    Identities are removed, series chains collapsed and parallel connections merged.
+    """
+    fm = Domain(name="fieldmode", causal=True, one2one=True)
+    el = Domain(name="electrical", causal=False)
+    phase = ComponentType(name="Phase", ports=inputs(["In1"], fm) + outputs(["Out1"], fm))
+    wire = ComponentType(name="Wire", ports=inputs(["In1"], fm) + outputs(["Out1"], fm))
+    bs = ComponentType(name="Beamsplitter", ports=inputs(["In1", "In2"], fm) + outputs(["Out1", "Out2"], fm))
+    res = ComponentType(name="Resistor", ports=inouts(["p", "n"], el))
+
+    p1, p2, p3, p4 = [phase.make_instance("p{}".format(k)) for k in range(1, 5)]
+    w = wire.make_instance("w")
+    b = bs.make_instance("b")
+    r1, r2 = res.make_instance("r1"), res.make_instance("r2")
+    circuit = Circuit(name="Chain", ports=inputs(["In1", "In2"], fm) + outputs(["Out1", "Out2"], fm),
+                      component_instances=[p1, w, p2, p3, b, p4, r1, r2])
+    for s, t in [(circuit.p.In1, p1.p.In1), (p1.p.Out1, w.p.In1), (w.p.Out1, p2.p.In1), (p2.p.Out1, p3.p.In1),
+                 (p3.p.Out1, b.p.In1), (circuit.p.In2, b.p.In2), (b.p.Out1, p4.p.In1),
+                 (p4.p.Out1, circuit.p.Out1), (b.p.Out2, circuit.p.Out2), (r1.p.n, r2.p.p)]:
+        circuit.connect(s, t)
+    circuit.connections = circuit.connections + [Connection(source=r2.p.p, target=r1.p.n)]
+    assert len(circuit.connections) == 11
+
+    changes = []
+    circuit.on_operations(lambda c, ops: changes.append(ops))
+    series = CollapseSeriesChains()
+    mapping = simplify(circuit, [MergeParallelConnections(), RemoveIdentities(["Wire"]), series])
+    assert len(changes) == 1
+    assert len([c for c in circuit.connections if c.source.domain is el]) == 1
+
+    new = mapping["p1"]
+    assert mapping == {"w": None, "p1": new, "p2": new, "p3": new}
+    chain = circuit.c[new]
+    assert chain.ctype.name == "Series(Phase,Phase,Phase)"
+    assert series.series == {new: ["p1", "p2", "p3"]}
+    assert chain.param_assignments == {}
+    assert circuit.p.In1.connections_out[0].target is chain.p.In1
+    assert chain.p.Out1.connections_out[0].target is b.p.In1
+    # p4 stands alone between the beamsplitter and the output
+    assert "p4" in circuit.c
+    assert circuit.validate() == []
+
+    # chains of the same types share their ComponentType
+    collapse = CollapseSeriesChains()
+    q1, q2, q3, q4 = [phase.make_instance("q{}".format(k)) for k in range(1, 5)]
+    c2 = Circuit(name="Two", component_instances=[q1, q2, q3, q4])
+    c2.connect(q1.p.Out1, q2.p.In1)
+    c2.connect(q3.p.Out1, q4.p.In1)
+    m2 = simplify(c2, [collapse])
+    assert c2.c[m2["q1"]].ctype is c2.c[m2["q3"]].ctype
+
+
+def test_remove_identity_chains():
+    """
+    Chains of identities are bridged by a single connection.
+    """
+    fm = Domain(name="fieldmode", causal=True, one2one=True)
+    el = Domain(name="electrical", causal=False)
+    wire = ComponentType(name="Wire", ports=inputs(["In1"], fm) + outputs(["Out1"], fm))
+    short = ComponentType(name="Short", ports=inouts(["p", "n"], el))
+    res = ComponentType(name="Resistor", ports=inouts(["p", "n"], el))
+    w1, w2, w3 = [wire.make_instance("w{}".format(k)) for k in range(1, 4)]
+    s1, s2 = short.make_instance("s1"), short.make_instance("s2")
+    r1, r2, r3 = [res.make_instance("r{}".format(k)) for k in range(1, 4)]
+    circuit = Circuit(name="Identities", ports=inputs(["In"], fm) + outputs(["Out"], fm),
+                      component_instances=[w1, w2, w3, s1, s2, r1, r2, r3])
+    for s, t in [(circuit.p.In, w1.p.In1), (w1.p.Out1, w2.p.In1), (w2.p.Out1, w3.p.In1), (w3.p.Out1, circuit.p.Out),
+                 (r1.p.n, s1.p.p), (s1.p.n, s2.p.p), (s2.p.n, r2.p.p), (r3.p.p, s2.p.n)]:
+        circuit.connect(s, t)
+
+    mapping = simplify(circuit, [RemoveIdentities(["Wire", "Short"])])
+    assert mapping == {"w1": None, "w2": None, "w3": None, "s1": None, "s2": None}
+    assert [c.target for c in circuit.p.In.connections_out] == [circuit.p.Out]
+    # the three resistors share one net
+    net = set([r1.p.n, r2.p.p, r3.p.p])
+    assert len(circuit.connections) == 3
+    assert all(set([c.source, c.target]) <= net for c in circuit.connections if c.source.domain is el)
+    assert set(p for c in circuit.connections for p in (c.source, c.target)) >= net
@@ -0,0 +1,87 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+from StringIO import StringIO
+
+from cirq.core import Domain, ComponentType, Circuit, inouts
+from cirq.spice import parse_value, read_spice, write_spice, spice_lines
+
+
+def _nets(circuit):
+    return sorted(sorted(circuit._port_ref(p) for p in net) for net in circuit.get_nets(circuit.ports[0].domain))
+
+
+def test_spice():
+    """
+    Import a small netlist, export it and import the result again.
+    """
+    assert parse_value("4.7k") == 4700.
+    assert parse_value("10uF") == 10e-6
+    assert parse_value("2MEG") == 2e6
+    assert parse_value("1e-3k") == 1.
+    assert parse_value("DMOD") == "DMOD"
+
+    netlist = StringIO("lowpass filter\n"
+                       "* a comment\n"
+                       "V1 n1 0 DC 0 AC 1\n"
+                       "R1 n1 OUT 1k ; inline comment\n"
+                       "C1 OUT 0\n"
+                       "+ 1u\n"
+                       "D1 OUT 0 DMOD\n"
+                       "X1 OUT n5 amp gain=2\n"
+                       ".end\n"
+                       "R2 ignored 0 1\n")
+    circuit = read_spice(netlist, ports=["OUT"])
+    assert circuit.name == "lowpass filter"
+    assert [p.name for p in circuit.ports] == ["GND", "OUT"]
+    assert [ci.name for ci in circuit.component_instances] == ["V1", "R1", "C1", "D1", "X1"]
+    assert circuit.c.V1.param_assignments == {"dc_value": 0., "ac_value": 1.}
+    assert circuit.c.C1.param_assignments == {"value": 1e-6}
+    assert circuit.c.D1.param_assignments == {"args": ["DMOD"]}
+    assert circuit.c.X1.ctype.name == "amp" and circuit.c.X1.param_assignments == {"gain": 2.}
+    assert len(set((ci._x, ci._y) for ci in circuit.component_instances)) == 5
+
+    lines = list(spice_lines(circuit))
+    assert lines[0] == "lowpass filter" and lines[-1] == ".end"
+    assert lines[2] == "R1 n1 OUT 1000.0"
+    assert lines[5] == "X1 OUT n2 amp gain=2.0"
+
+    out = StringIO()
+    write_spice(circuit, out)
+    again = read_spice(StringIO(out.getvalue()), ports=["OUT"])
+    assert _nets(again) == _nets(circuit)
+    assert [ci.param_assignments for ci in again.component_instances] == \
+           [ci.param_assignments for ci in circuit.component_instances]
+
+    # listing the ground port among the ports does not shift the others
+    grounded = read_spice(StringIO(out.getvalue()), ports=["GND", "OUT"])
+    assert [p.name for p in grounded.ports] == ["GND", "OUT"]
+    assert _nets(grounded) == _nets(circuit)
+
+    # existing ComponentTypes and names that do not start with the element letter
+    net = Domain(name="net", causal=False)
+    resistor = ComponentType(name="Resistor", ports=inouts(["p", "n"], net))
+    c = Circuit(name="c", ports=inouts(["GND"], net), component_instances=[resistor.make_instance("load")])
+    c.connect(c.p.GND, c.c.load.p.n)
+    assert list(spice_lines(c))[1] == "R_load n1 0"
+    c2 = read_spice(spice_lines(c), domain=net, ctypes={"R": resistor})
+    assert c2.c.R_load.ctype is resistor
+
+    for bad in ["t\nZ1 a b\n", "t\nR1 a\n", "t\n.subckt amp a b\n", "t\nR1 a b 1\nR1 a b 2\n"]:
+        try:
+            read_spice(StringIO(bad))
+        except ValueError:
+            pass
+        else:
+            assert False, bad
@@ -0,0 +1,71 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import os
+import shutil
+import tempfile
+
+from cirq.store import CircuitDatabase
+from cirq.tests import make_mach_zehnder
+
+
+def test_store():
+    """
+    Import circuits into a store, query them and materialize one.
+    """
+    mz, fm, el, bs_type, phase_type = make_mach_zehnder()
+    for k in range(3):
+        mz.add_component(phase_type.make_instance("extra{}".format(k)))
+    plain, _, _, _, _ = make_mach_zehnder()
+    renamed, _, _, _, _ = make_mach_zehnder()
+    renamed.rename_component(renamed.c.phi, "theta")
+
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        for k, circuit in enumerate([mz, plain, renamed]):
+            paths.append(os.path.join(directory, "c{}.json".format(k)))
+            circuit.save_json(paths[-1])
+
+        db_path = os.path.join(directory, "circuits.db")
+        with CircuitDatabase(db_path) as store:
+            ids = store.import_files(paths)
+            assert len(store) == 3
+            # importing again replaces the stored circuits
+            ids = store.import_files(paths)
+            assert len(store) == 3
+            assert len(store.query("SELECT * FROM instances")) == 6 + 3 + 3
+
+            found = store.with_component("Phase", min_count=2)
+            assert [(r.id, count) for r, count in found] == [(ids[0], 4)]
+            assert len(store.with_component("Beamsplitter")) == 3
+
+            assert len(store.with_connection("electrical", "Control")) == 3
+            assert len(store.with_connection("electrical", "Control", external=False)) == 3
+            assert store.with_connection("fieldmode", "Control") == []
+            store.remove(ids[2])
+            assert len(store.with_connection("fieldmode", "In1", external=False)) == 2
+
+            new_id = store.add(renamed)
+            assert [[r.id for r in group] for group in store.duplicates()] == [[ids[1], new_id]]
+            assert [r.id for r in store.with_hash(plain.canonical_hash())] == [ids[1], new_id]
+
+        with CircuitDatabase(db_path) as store:
+            record = store.records(name="MachZehnder")[0]
+            assert record.n_instances == 6
+            circuit = store.materialize(record.id)
+            assert sorted(circuit.c) == sorted(mz.c)
+            assert circuit.canonical_form(external_names=True) == mz.canonical_form(external_names=True)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,41 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import os
+
+from cirq.core import Domain, Connection, Circuit, inouts
+from cirq.assets import STATIC_DIR
+
+
+def test_domain_styles():
+    """
+    Connections do not sync colors of their own, ports and connections are styled by domain class.
+    """
+    assert "_color" not in Connection.class_trait_names(sync=True)
+    assert "_color_selected" not in Connection.class_trait_names(sync=True)
+
+    el = Domain(name="electrical", causal=False, _color="purple")
+    fm = Domain(name="fm", causal=False)
+    assert el.css_class.startswith("cirq-domain-")
+    assert el.css_class != fm.css_class
+
+    c = Circuit(name="c", ports=inouts(["a", "b"], el))
+    c.connect(c.p.a, c.p.b)
+    assert "_color" not in c.connections[0].get_state()
+    c.highlight([c.p.a, c.p.b] + c.connections)
+    c.highlight()
+
+    with open(os.path.join(STATIC_DIR, "cirq.js")) as jsfile:
+        script = jsfile.read()
+    assert "domain_css" in script and 'this.model.get("_color")' not in script
@@ -0,0 +1,70 @@
+# coding=utf-8
+__author__ = 'nikolas'
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+"""
+These tests can only be run from within an IPython notebook
+"""
+
+import shutil
+import tempfile
+
+from cirq import ComponentType, Domain, inouts
+from cirq.workspace import Workspace
+from cirq.tests import make_mach_zehnder
+
+
+def test_workspace():
+    """
+    Circuits loaded into a workspace share their domains and component types.
+    """
+    mz = make_mach_zehnder()[0]
+    obj = mz.to_jsonifiable()
+
+    ws = Workspace()
+    mz1 = ws.load_jsonifiable(obj)
+    obj["name"] = "MZ2"
+    obj["connections"] = [[("MZ2" if n == mz.name else n) for n in c] for c in obj["connections"]]
+    mz2 = ws.load_jsonifiable(obj)
+
+    assert mz1.c.b1.ctype is mz2.c.b2.ctype
+    assert mz1.p.In1.domain is mz2.p.In1.domain
+    assert mz1.c.b1.p.Out1.domain is mz2.c.b2.p.In2.domain
+    assert len(ws.component_types) == 2 and len(ws.domains) == 2
+
+    assert ws.search(ctype="Phase") == [mz1, mz2]
+    mz2.remove_component(mz2.c.phi)
+    assert ws.search(ctype="Phase") == [mz1]
+    assert ws.search(name="MZ*") == [mz2]
+    assert ws.search(domain="electrical") == [mz1, mz2]
+
+    assert ws.validate() == {}
+    assert ws.validate(allow_unconnected=False).keys() == ["MZ2"]
+
+    mz2.rename("MZ3")
+    assert ws["MZ3"] is mz2
+
+    # types of instances renamed within the change that added them are interned as well
+    dc = Domain(name="dc", causal=False)
+    wire = ComponentType(name="Wire", ports=inouts(["p", "n"], dc))
+    with mz2.changes():
+        mz2.add_component(wire.make_instance("w"))
+        mz2.rename_component(mz2.c.w, "v")
+    assert wire in ws.component_types.values() and dc in ws.domains.values()
+    assert ws.search(ctype="Wire") == [mz2]
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        ws.export(tmpdir)
+        ws2 = Workspace()
+        loaded = ws2.load_directory(tmpdir)
+        assert sorted(c.name for c in loaded) == ["MZ3", "MachZehnder"]
+        assert loaded[0].p.In1.domain is loaded[1].p.In1.domain
+    finally:
+        shutil.rmtree(tmpdir)
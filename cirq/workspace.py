@@ -0,0 +1,280 @@
+# coding=utf-8
+"""
+Workspaces holding many circuits that share their Domain and ComponentType objects.
+
+Loading circuits via `Circuit.from_jsonifiable` creates new domains and component types for each circuit.
+A `Workspace` instead interns these by their signature, so circuits loaded into the same workspace
+share identical objects (and thus `p1.domain is p2.domain` holds across circuits),
+and it supports bulk operations over all its circuits.
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014, Nikolas Tezak <Nikolas.Tezak@gmail.com>
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+__author__ = 'Nikolas Tezak'
+
+import json
+import os
+from collections import OrderedDict
+from fnmatch import fnmatch
+
+from cirq.cache import CompileCache
+from cirq.core import Circuit, ComponentType, Domain, port_info, make_port
+
+
+def domain_signature(name, causal, one2one):
+    """
+    Return the key by which a Domain is interned.
+
+    :param name: Domain name
+    :param causal: Whether the domain is causal
+    :param one2one: Whether the domain is one-to-one
+    """
+    return name, bool(causal), bool(one2one)
+
+
+def ctype_signature(name, port_infos):
+    """
+    Return the key by which a ComponentType is interned.
+
+    :param name: ComponentType name
+    :param port_infos: list of dicts with keys `name`, `domain`, `direction` and optionally `width`,
+        see `Circuit.to_jsonifiable`.
+    """
+    return name, tuple((pi["name"], pi["domain"], pi["direction"], pi.get("width", 1)) for pi in port_infos)
+
+
+def _port_infos(ports):
+    return map(port_info, ports)
+
+
+class Workspace(object):
+    """
+    Collection of uniquely named circuits with shared registries of domains and component types.
+
+    Domains are interned by `(name, causal, one2one)` and component types by their name and port
+    signature. Two definitions that agree in these are represented by a single object.
+
+    Attributes
+    ----------
+
+    1. circuits: OrderedDict of circuits by name
+    2. domains: dict of interned Domains by signature
+    3. component_types: dict of interned ComponentTypes by signature
+    4. compile_cache: CompileCache shared by all circuits of the workspace
+    """
+
+    def __init__(self, compile_cache=None):
+        self.circuits = OrderedDict()
+        self.domains = {}
+        self.component_types = {}
+        self.compile_cache = compile_cache or CompileCache()
+        self._usage = {}
+
+    def domain(self, name, causal=False, one2one=False):
+        """
+        Return the interned Domain for the given signature, creating it if necessary.
+
+        :param name: Domain name
+        :param causal: Whether the domain is causal
+        :param one2one: Whether the domain is one-to-one
+        """
+        key = domain_signature(name, causal, one2one)
+        if key not in self.domains:
+            self.domains[key] = Domain(name=name, causal=causal, one2one=one2one)
+        return self.domains[key]
+
+    def component_type(self, name, port_infos, domains):
+        """
+        Return the interned ComponentType for the given signature, creating it if necessary.
+
+        :param name: ComponentType name
+        :param port_infos: list of dicts with keys `name`, `domain`, `direction` and optionally `width`
+        :param domains: dict of (interned) Domains by name to resolve the port domains
+        """
+        key = ctype_signature(name, port_infos)
+        if key not in self.component_types:
+            self.component_types[key] = ComponentType(
+                name=name, ports=[make_port(pi, domains) for pi in port_infos])
+        return self.component_types[key]
+
+    def register_domain(self, domain):
+        """
+        Intern an existing Domain, unless one with the same signature is already known.
+
+        :param domain: Domain object
+        :return: The interned Domain
+        """
+        return self.domains.setdefault(domain_signature(domain.name, domain.causal, domain.one2one), domain)
+
+    def register_component_type(self, ctype):
+        """
+        Intern an existing ComponentType, unless one with the same signature is already known.
+
+        :param ctype: ComponentType object
+        :return: The interned ComponentType
+        """
+        for p in ctype.ports:
+            self.register_domain(p.domain)
+        return self.component_types.setdefault(ctype_signature(ctype.name, _port_infos(ctype.ports)), ctype)
+
+    def add(self, circuit):
+        """
+        Add a circuit to the workspace and register its domains and component types.
+
+        :param circuit: Circuit object with a name not yet used in the workspace
+        :return: The circuit
+        """
+        if circuit.name in self.circuits:
+            raise ValueError("A circuit named {} already exists in the workspace.".format(circuit.name))
+        for p in circuit.ports:
+            self.register_domain(p.domain)
+        for ci in circuit.component_instances:
+            self.register_component_type(ci.ctype)
+            self._count_usage(ci.ctype.name, circuit, 1)
+        self.circuits[circuit.name] = circuit
+        circuit.on_operations(self._track)
+        return circuit
+
+    def _count_usage(self, ctype_name, circuit, delta):
+        counts = self._usage.setdefault(ctype_name, {})
+        n = counts.get(circuit, 0) + delta
+        if n > 0:
+            counts[circuit] = n
+        else:
+            counts.pop(circuit, None)
+
+    def _track(self, circuit, operations):
+        # keep the type usage index and the circuit names up to date
+        for op in operations:
+            if op[0] == "add_component":
+                self.register_component_type(circuit.known_component_type(op[2]))
+                self._count_usage(op[2], circuit, 1)
+            elif op[0] == "remove_component":
+                self._count_usage(op[2], circuit, -1)
+            elif op[0] == "add_port":
+                self.register_domain(circuit.known_domain(op[2]))
+            elif op[0] == "rename_circuit" and self.circuits.get(op[1]) is circuit:
+                del self.circuits[op[1]]
+                self.circuits[op[2]] = circuit
+
+    def remove(self, name):
+        """
+        Remove a circuit from the workspace. Interned domains and types are kept.
+
+        :param name: Circuit name
+        :return: The removed circuit
+        """
+        circuit = self.circuits.pop(name)
+        circuit.on_operations(self._track, remove=True)
+        for counts in self._usage.values():
+            counts.pop(circuit, None)
+        return circuit
+
+    def load_jsonifiable(self, obj):
+        """
+        Create a circuit from its `to_jsonifiable` representation using the shared registries and add it.
+
+        :param obj: dicts and lists describing the circuit.
+        :return: Circuit object
+        """
+        return self.add(Circuit.from_jsonifiable(obj, registry=self))
+
+    def load_json(self, json_path):
+        """
+        Load a circuit from a JSON file and add it to the workspace.
+
+        :param json_path: JSON file containing the circuit representation
+        :return: Circuit object
+        """
+        with open(json_path, "r") as jsonfile:
+            return self.load_jsonifiable(json.load(jsonfile))
+
+    def load_directory(self, directory, pattern="*.json"):
+        """
+        Load all circuit JSON files in a directory whose names match `pattern`.
+
+        :param directory: Directory path
+        :param pattern: Shell-style file name pattern, default `"*.json"`.
+        :return: list of loaded circuits
+        """
+        return [self.load_json(os.path.join(directory, f))
+                for f in sorted(os.listdir(directory)) if fnmatch(f, pattern)]
+
+    def __getitem__(self, name):
+        return self.circuits[name]
+
+    def __contains__(self, name):
+        return name in self.circuits
+
+    def __iter__(self):
+        return iter(self.circuits.values())
+
+    def __len__(self):
+        return len(self.circuits)
+
+    def search(self, name=None, ctype=None, domain=None):
+        """
+        Find circuits matching all given criteria.
+
+        :param name: Shell-style pattern the circuit name must match
+        :param ctype: Name of a ComponentType the circuit must contain an instance of.
+            This is answered from an index that is kept up to date as the circuits are edited.
+        :param domain: Name of a Domain that an external port of the circuit must belong to
+        :return: list of circuits
+        """
+        if ctype is not None:
+            using = self._usage.get(ctype, {})
+            candidates = [c for c in self.circuits.values() if c in using]
+        else:
+            candidates = self.circuits.values()
+        ret = []
+        for circuit in candidates:
+            if name is not None and not fnmatch(circuit.name, name):
+                continue
+            if domain is not None and not any(p.domain.name == domain for p in circuit.ports):
+                continue
+            ret.append(circuit)
+        return ret
+
+    def validate(self, allow_unconnected=True):
+        """
+        Validate all circuits, see `Circuit.validate`.
+
+        :param allow_unconnected: Whether unconnected ports are acceptable, default `True`.
+        :return: dict mapping the names of invalid circuits to their list of problems.
+        """
+        ret = {}
+        for name, circuit in self.circuits.items():
+            problems = circuit.validate(allow_unconnected)
+            if problems:
+                ret[name] = problems
+        return ret
+
+    def export(self, directory):
+        """
+        Save all circuits as `<name>.json` files into `directory`.
+
+        :param directory: Existing directory path
+        :return: list of written file paths
+        """
+        paths = []
+        for name, circuit in self.circuits.items():
+            path = os.path.join(directory, name + ".json")
+            circuit.save_json(path)
+            paths.append(path)
+        return paths
+
+    def compile(self, name, backend):
+        """
+        Compile a circuit of the workspace for a backend registered with the workspace's `compile_cache`.
+
+        :param name: Circuit name
+        :param backend: Backend name
+        :return: compiled backend model
+        """
+        return self.compile_cache.compile(self.circuits[name], backend)